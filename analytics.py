@@ -0,0 +1,98 @@
+import re
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import func, case
+from extensions import db
+from models import Interaction
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_VALUES = ['positive', 'negative', 'neutral']
+MAX_QUERY_LENGTH = 80
+#contact details and long numbers (phones, ids) are masked before a query leaves the database
+REDACTIONS = [
+    (re.compile(r'[\w.+-]+@[\w-]+(\.[\w-]+)+'), '[email]'),
+    (re.compile(r'(https?://|www\.)\S+'), '[url]'),
+    (re.compile(r'\+?\d[\d\s().-]{5,}\d'), '[number]'),
+]
+
+
+def redact_query(text):
+    for pattern, replacement in REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text if len(text) <= MAX_QUERY_LENGTH else text[:MAX_QUERY_LENGTH] + '...'
+
+
+def pseudonymize_session_id(session_id):
+    #stable per session so rows can still be grouped, but not the id a cookie carries
+    return hashlib.blake2b((session_id or '').encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _since(days):
+    return datetime.now() - timedelta(days=days)
+
+
+def get_session_summaries(days=7, limit=50, offset=0):
+    #one grouped scan over idx_interaction_timestamp, newest sessions first
+    last_seen = func.max(Interaction.timestamp)
+    rows = db.session.query(
+        Interaction.session_id,
+        func.count(Interaction.id),
+        func.min(Interaction.timestamp),
+        last_seen,
+        func.count(Interaction.feedback)
+    ).filter(
+        Interaction.timestamp >= _since(days)
+    ).group_by(
+        Interaction.session_id
+    ).order_by(
+        last_seen.desc()
+    ).limit(limit).offset(offset).all()
+
+    return [{
+        'session': pseudonymize_session_id(session_id),
+        'interactions': interactions,
+        'first_seen': first_seen.isoformat() if first_seen else None,
+        'last_seen': last_seen_at.isoformat() if last_seen_at else None,
+        'feedback_count': feedback_count
+    } for session_id, interactions, first_seen, last_seen_at, feedback_count in rows]
+
+
+def get_feedback_ratios(days=30):
+    day = func.date(Interaction.timestamp)
+    counts = [func.sum(case((Interaction.feedback == value, 1), else_=0)) for value in FEEDBACK_VALUES]
+    rows = db.session.query(
+        day,
+        func.count(Interaction.id),
+        *counts
+    ).filter(
+        Interaction.timestamp >= _since(days)
+    ).group_by(day).order_by(day).all()
+
+    ratios = []
+    for row in rows:
+        record_date, total = row[0], row[1]
+        per_value = dict(zip(FEEDBACK_VALUES, (int(count or 0) for count in row[2:])))
+        rated = sum(per_value.values())
+        ratios.append({
+            'date': str(record_date),
+            'interactions': total,
+            'rated': rated,
+            'counts': per_value,
+            'ratios': {value: (count / rated if rated else 0.0) for value, count in per_value.items()}
+        })
+    return ratios
+
+
+def get_top_queries(days=7, limit=10):
+    normalized = func.lower(func.trim(Interaction.user_message))
+    hits = func.count(Interaction.id)
+    rows = db.session.query(
+        normalized,
+        hits
+    ).filter(
+        Interaction.timestamp >= _since(days)
+    ).group_by(normalized).order_by(hits.desc()).limit(limit).all()
+
+    return [{'query': redact_query(query or ''), 'count': count} for query, count in rows]
@@ -1,4 +1,6 @@
 import os 
+import hmac
+from functools import wraps
 from datetime import timedelta, datetime
 from flask import Flask, render_template, request, jsonify, session
 import uuid
@@ -6,13 +8,22 @@ from chatbot import process_user_message
 from knowledge_base import load_all_knowledge
 from session_manager import initialize_session, get_session_context, update_session_context
 from helpers import log_interaction
-from bias_detector import detect_bias
+from bias_detector import detect_bias, BIAS_TYPES
 import logging
 from extensions import db
-from models import Interaction, BiasDetection, MetricsTracker
+from models import Interaction, ensure_indexes
+from persistence import write_behind
+from records import as_dict
 from scraper import create_jobs_file, create_events_file
-from rag import process_signup_trigger, generate_response, semantic_search
-from events import filter_events, load_events
+from rag import (process_signup_trigger, generate_response, semantic_search, contextual_query,
+                 load_knowledge_snapshots, mark_knowledge_current, reload_changed_knowledge, apply_file_delta)
+from events import filter_events, load_events, events_version
+from response_cache import response_cache
+from scheduler import register_job_update_listener, start_scheduler
+from intent import classify_intent
+from entity_extractor import configure_entity_extractor
+import instrumentation
+from instrumentation import stage_timer
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -36,23 +47,56 @@ app.config['SECRET_KEY'] = os.environ.get('FLASK_SECRET_KEY', 'your_secret_key')
 app.config["SQLALCHEMY_DATABASE_URI"] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=1)
+#the /api/analytics endpoints are off unless a token is set, callers send it as "Authorization: Bearer <token>"
+app.config['ANALYTICS_API_TOKEN'] = os.environ.get('ANALYTICS_API_TOKEN', '')
 db.init_app(app)
+instrumentation.init_app(app)
+write_behind.init_app(app)
 
 # ensuring the tables are created
 with app.app_context():
     try:
         db.create_all()
+        ensure_indexes()
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
 
+#taken before loading, so a write that lands during the load is picked up on the next request
+mark_knowledge_current()
 try:
-    knowledge_base = load_all_knowledge()
+    if os.environ.get("KNOWLEDGE_SNAPSHOT", "False").lower() == "true":
+        knowledge_base = load_knowledge_snapshots()
+    else:
+        knowledge_base = load_all_knowledge()
     logger.info("Knowledge base loaded successfully")
 except Exception as e:
     logger.error(f"Error loading knowledge base: {e}")
     knowledge_base = {}
 
+#entity gazetteers include the companies, locations and skills found in the catalogue
+configure_entity_extractor(knowledge_base)
+
+
+def reload_knowledge():
+    #workers without the scheduler follow the knowledge files on disk through the logged deltas
+    if reload_changed_knowledge(knowledge_base):
+        configure_entity_extractor(knowledge_base)
+
+
+def apply_job_updates(delta, jobs):
+    #the scheduler's own process patches its index with the delta it just wrote
+    if apply_file_delta(knowledge_base, 'jobs', jobs, delta):
+        configure_entity_extractor(knowledge_base)
+    else:
+        reload_knowledge()
+
+
+register_job_update_listener(apply_job_updates)
+#only the worker that wins the scheduler lock starts it
+if os.environ.get("ENABLE_SCHEDULER", "False").lower() == "true":
+    start_scheduler()
+
 if not os.path.exists(os.path.join("data", "job_listings.json")):
     try:
         create_jobs_file("https://www.herkey.com/jobs")
@@ -68,6 +112,14 @@ if not os.path.exists(os.path.join("data", "events.json")):
         logger.error(f"Error generating event data: {e}")
 
 
+@app.before_request
+def check_knowledge_files():
+    try:
+        reload_knowledge()
+    except Exception as e:
+        logger.error(f"Error reloading knowledge base: {e}")
+
+
 @app.route('/')
 def index():
     session.clear()
@@ -85,37 +137,21 @@ def chat():
             if not user_message:
                 return jsonify({'error': 'Message cannot be empty'}), 400
 
-            is_biased, bias_score, bias_explanation = detect_bias(user_message)
+            with stage_timer('bias_check'):
+                is_biased, bias_score, bias_explanation = detect_bias(user_message)
             if is_biased:
                 interaction_id = str(uuid.uuid4())
                 timestamp = datetime.now()
 
-                bias_detection = BiasDetection(
-                    id=interaction_id,
-                    session_id=session.get('id', 'unknown'),
-                    user_message=user_message,
-                    bias_score=bias_score,
-                    bias_explanation=bias_explanation,
-                    timestamp=timestamp
-                )
-                db.session.add(bias_detection)
-                db.session.commit()
-
-                today = datetime.now().strftime('%Y-%m-%d')
-                metric = MetricsTracker.query.filter_by(record_date=today).first()
-                if metric:
-                    metric.bias_detections += 1
-                else:
-                    db.session.add(MetricsTracker(
-                        record_date=today,
-                        total_interactions=0,
-                        job_searches=0,
-                        filtered_job_searches=0,
-                        event_searches=0,
-                        mentorship_searches=0,
-                        bias_detections=1
-                    ))
-                db.session.commit()
+                with stage_timer('db_write'):
+                    write_behind.record_bias_detection(
+                        interaction_id=interaction_id,
+                        message=user_message,
+                        bias_score=bias_score,
+                        bias_type=BIAS_TYPES.get(bias_explanation, 'unknown'),
+                        timestamp=timestamp
+                    )
+                    write_behind.increment_metrics(timestamp.strftime('%Y-%m-%d'), bias_detections=1)
 
                 return jsonify({
                     'message': 'I apologize, but I detected potentially biased language in your message. Please rephrase your request to ensure it is inclusive and respectful.',
@@ -124,8 +160,12 @@ def chat():
                     'timestamp': timestamp.isoformat()
                 })
 
+            #one keyword pass over the message, shared by every step below
+            with stage_timer('intent'):
+                intent = classify_intent(user_message)
+
             #check if the user is trying to sign up
-            if process_signup_trigger(user_message):
+            if process_signup_trigger(user_message, intent):
                 response_data = {
                     "message": "Great! Let's get you registered with HerKey. Please fill out the form below:",
                     "form_html": render_template('form.html'),
@@ -134,87 +174,82 @@ def chat():
                 return jsonify(response_data)
 
             #detect response type based on keywords in user message
-            response_type = None
-            if any(word in user_message.lower() for word in ['job', 'career', 'position', 'work']):
-                response_type = 'job'
-            elif any(word in user_message.lower() for word in ['event', 'workshop', 'seminar']):
-                response_type = 'event'
-            elif any(word in user_message.lower() for word in ['bye', 'goodbye', 'exit', 'quit']):
-                response_type = 'bye'
-
-            context = get_session_context(session)
-            response, updated_context = process_user_message(
-                user_message,
-                context,
-                knowledge_base
-            )
-            update_session_context(session, updated_context)
+            response_type = intent['response_type']
 
             #create a combined knowledge base with events if needed
             combined_knowledge_base = knowledge_base.copy()
 
             #for event-related queries, load and add events to the knowledge base
-            if response_type == 'event' or 'event' in user_message.lower():
-                events = load_events()
-                event_results, _ = filter_events(
-                    events=events,
-                    query=user_message,
-                    event_type=None,
-                    location=None if 'location' not in user_message.lower() else user_message.split('in ')[-1].strip(),
-                    limit=10
+            if response_type == 'event' or 'event' in intent['keywords']:
+                with stage_timer('event_lookup'):
+                    events = load_events()
+                    event_results, _ = filter_events(
+                        events=events,
+                        query=user_message,
+                        event_type=None,
+                        location=None if 'location' not in intent['keywords'] else user_message.split('in ')[-1].strip(),
+                        limit=10
+                    )
+
+                    if event_results:
+                        logger.info(f"Adding {len(event_results)} events to knowledge base")
+                        combined_knowledge_base['events'] = event_results
+
+            #every turn goes into the session history, built once and searched once below
+            search_query = contextual_query(user_message, session.get('id'))
+            rebuilds_reply = response_type in ['job', 'event', 'bye']
+
+            retrieval = {}
+            context = get_session_context(session)
+            with stage_timer('chatbot'):
+                #job, event and bye replies are rebuilt from the results, so only those searches see the history
+                response, updated_context = process_user_message(
+                    user_message,
+                    context,
+                    combined_knowledge_base if rebuilds_reply else knowledge_base,
+                    intent,
+                    retrieval=retrieval,
+                    search_query=search_query if rebuilds_reply else None
                 )
+            update_session_context(session, updated_context)
 
-                if event_results:
-                    logger.info(f"Adding {len(event_results)} events to knowledge base")
-                    combined_knowledge_base['events'] = event_results
-
-            #get search results using the combined knowledge base
-            results = semantic_search(user_message, combined_knowledge_base, session.get('id'))
+            if not rebuilds_reply:
+                results = []
+            elif 'results' in retrieval:
+                results = retrieval['results']
+            else:
+                #the chatbot answered before searching (guardrails, event listings)
+                with stage_timer('retrieval'):
+                    results = semantic_search(search_query, combined_knowledge_base)
 
             #generate response with sign-up encouragement if applicable
             if response_type in ['job', 'event', 'bye']:
-                response = generate_response(user_message, results, response_type)
+                with stage_timer('response_build'):
+                    response = generate_response(user_message, results, response_type)
 
             interaction_id = str(uuid.uuid4())
             timestamp = datetime.now()
 
-            interaction_record = Interaction(
-                id=interaction_id,
-                session_id=session.get('id', 'unknown'),
-                user_message=user_message,
-                bot_response=response,
-                timestamp=timestamp
-            )
-            db.session.add(interaction_record)
-
-            today = datetime.now().strftime('%Y-%m-%d')
-            metric = MetricsTracker.query.filter_by(record_date=today).first()
-            if metric:
-                metric.total_interactions += 1
-                if "job" in user_message.lower():
-                    metric.job_searches += 1
-                    if any(term in user_message.lower() for term in
-                           ["remote", "wfh", "hybrid", "in-office", "full-time", "part-time"]):
-                        metric.filtered_job_searches += 1
-                elif "event" in user_message.lower():
-                    metric.event_searches += 1
-                elif "mentor" in user_message.lower():
-                    metric.mentorship_searches += 1
-            else:
-                metric_data = {'record_date': today, 'total_interactions': 1, 'job_searches': 0,
-                               'filtered_job_searches': 0, 'event_searches': 0, 'mentorship_searches': 0,
-                               'bias_detections': 0}
-                if "job" in user_message.lower():
-                    metric_data['job_searches'] += 1
-                    if any(term in user_message.lower() for term in
-                           ["remote", "wfh", "hybrid", "in-office", "full-time", "part-time"]):
-                        metric_data['filtered_job_searches'] += 1
-                elif "event" in user_message.lower():
-                    metric_data['event_searches'] += 1
-                elif "mentor" in user_message.lower():
-                    metric_data['mentorship_searches'] += 1
-                db.session.add(MetricsTracker(**metric_data))
-            db.session.commit()
+            #rows are queued and written in batches by the write-behind flusher
+            with stage_timer('db_write'):
+                write_behind.record_interaction(
+                    id=interaction_id,
+                    session_id=session.get('id', 'unknown'),
+                    user_message=user_message,
+                    bot_response=response,
+                    timestamp=timestamp
+                )
+
+                metric_counts = {'total_interactions': 1}
+                if "job" in intent['keywords']:
+                    metric_counts['job_searches'] = 1
+                    if intent['has_job_filter_terms']:
+                        metric_counts['filtered_job_searches'] = 1
+                elif "event" in intent['keywords']:
+                    metric_counts['event_searches'] = 1
+                elif "mentor" in intent['keywords']:
+                    metric_counts['mentorship_searches'] = 1
+                write_behind.increment_metrics(timestamp.strftime('%Y-%m-%d'), **metric_counts)
 
             response_data = {
                 'id': interaction_id,
@@ -259,7 +294,11 @@ def feedback():
             if feedback_value.lower() not in allowed_feedback:
                 return jsonify({'error': 'Invalid feedback value'}), 400
 
-            interaction_record = Interaction.query.get(interaction_id)
+            interaction_record = db.session.get(Interaction, interaction_id)
+            if interaction_record is None:
+                #the interaction may still be waiting in the write-behind queue
+                write_behind.flush()
+                interaction_record = db.session.get(Interaction, interaction_id)
             if interaction_record:
                 interaction_record.feedback = feedback_value.lower()
                 db.session.commit()
@@ -279,30 +318,47 @@ def feedback():
 @app.route('/api/events', methods=['GET'])
 def get_events():
     try:
-        from events import filter_events, load_events
+        from events import query_events, load_events
 
         query = request.args.get('q', '')
         event_type = request.args.get('type', '')
         location = request.args.get('location', '')
-        limit = int(request.args.get('limit', 10))
+        organizer = request.args.get('organizer', '')
+        cursor = request.args.get('cursor')
+        try:
+            limit = int(request.args.get('limit', 10))
+            offset = int(request.args.get('offset', 0))
+            if cursor is not None:
+                int(cursor)
+        except ValueError:
+            return jsonify({'error': 'limit, offset and cursor must be integers'}), 400
 
         events = load_events()
-        filtered_events, security_message = filter_events(
-            events=events,
-            query=query,
-            event_type=event_type,
-            location=location,
-            limit=limit
-        )
-
-        if security_message:
+        page_key = ('events_page', query, event_type, location, organizer, limit, offset, cursor, events_version())
+        page = response_cache.get(page_key)
+        if page is None:
+            page = query_events(
+                events=events,
+                query=query,
+                event_type=event_type,
+                location=location,
+                organizer=organizer,
+                limit=limit,
+                offset=offset,
+                cursor=cursor
+            )
+            response_cache.set(page_key, page)
+
+        if page['security_message']:
             return jsonify({
-                'error': security_message
+                'error': page['security_message']
             }), 400
 
         return jsonify({
-            'events': filtered_events,
-            'count': len(filtered_events),
+            'events': [as_dict(event) for event in page['events']],
+            'count': len(page['events']),
+            'total': page['total'],
+            'next_cursor': page['next_cursor'],
             'source': 'events.herkey.com'
         })
 
@@ -314,6 +370,113 @@ def get_events():
         }), 500
 
 
+@app.route('/api/events/upcoming', methods=['GET'])
+def get_upcoming():
+    try:
+        from events import get_events_between
+
+        try:
+            days = int(request.args.get('days', 30))
+            limit = int(request.args.get('limit', 10))
+            start = request.args.get('from')
+            start = datetime.strptime(start, '%Y-%m-%d').date() if start else datetime.now().date()
+            end = request.args.get('to')
+            end = datetime.strptime(end, '%Y-%m-%d').date() if end else start + timedelta(days=days)
+        except ValueError:
+            return jsonify({'error': 'days and limit must be integers, from and to must be YYYY-MM-DD'}), 400
+
+        upcoming = get_events_between(start, end, limit)
+
+        return jsonify({
+            'events': upcoming,
+            'count': len(upcoming),
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'source': 'events.herkey.com'
+        })
+
+    except Exception as e:
+        logger.error(f"Error fetching upcoming events: {e}")
+        return jsonify({
+            'error': 'Failed to fetch upcoming events',
+            'message': str(e)
+        }), 500
+
+
+def analytics_token_required(view):
+    @wraps(view)
+    def guarded(*args, **kwargs):
+        token = app.config.get('ANALYTICS_API_TOKEN')
+        if not token:
+            return jsonify({'error': 'Not found'}), 404
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return view(*args, **kwargs)
+    return guarded
+
+
+@app.route('/api/analytics/sessions', methods=['GET'])
+@analytics_token_required
+def analytics_sessions():
+    try:
+        from analytics import get_session_summaries
+
+        try:
+            days = int(request.args.get('days', 7))
+            limit = min(int(request.args.get('limit', 50)), 500)
+            offset = int(request.args.get('offset', 0))
+        except ValueError:
+            return jsonify({'error': 'days, limit and offset must be integers'}), 400
+
+        write_behind.flush()
+        sessions = get_session_summaries(days=days, limit=limit, offset=offset)
+        return jsonify({'sessions': sessions, 'count': len(sessions), 'days': days})
+
+    except Exception as e:
+        logger.error(f"Error fetching session analytics: {e}")
+        return jsonify({'error': 'Failed to fetch session analytics', 'message': str(e)}), 500
+
+
+@app.route('/api/analytics/feedback', methods=['GET'])
+@analytics_token_required
+def analytics_feedback():
+    try:
+        from analytics import get_feedback_ratios
+
+        try:
+            days = int(request.args.get('days', 30))
+        except ValueError:
+            return jsonify({'error': 'days must be an integer'}), 400
+
+        write_behind.flush()
+        return jsonify({'days': get_feedback_ratios(days=days)})
+
+    except Exception as e:
+        logger.error(f"Error fetching feedback analytics: {e}")
+        return jsonify({'error': 'Failed to fetch feedback analytics', 'message': str(e)}), 500
+
+
+@app.route('/api/analytics/top-queries', methods=['GET'])
+@analytics_token_required
+def analytics_top_queries():
+    try:
+        from analytics import get_top_queries
+
+        try:
+            days = int(request.args.get('days', 7))
+            limit = min(int(request.args.get('limit', 10)), 100)
+        except ValueError:
+            return jsonify({'error': 'days and limit must be integers'}), 400
+
+        write_behind.flush()
+        return jsonify({'queries': get_top_queries(days=days, limit=limit), 'days': days})
+
+    except Exception as e:
+        logger.error(f"Error fetching top queries: {e}")
+        return jsonify({'error': 'Failed to fetch top queries', 'message': str(e)}), 500
+
+
 @app.route('/render_form', methods=['GET'])
 def render_form():
     return render_template('form.html')
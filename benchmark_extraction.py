@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from extraction import SITE_SELECTORS, ListingExtractor, HTML_PARSER
+
+FIXTURE_DIR = os.path.join('data', 'fixtures')
+FIXTURES = {'jobs': 'jobs_listing.html', 'events': 'events_listing.html'}
+FIXTURE_URL = 'https://www.herkey.com/listing'
+
+
+def baseline_extract(html, url, config):
+    #the previous path: full html.parser tree, then one select_one per field lookup, links looked up twice
+    soup = BeautifulSoup(html, "html.parser")
+    cards = []
+    for card in soup.select(config['cards']):
+        values = {}
+        for field, (selector, attribute) in config['fields'].items():
+            if attribute is None:
+                values[field] = card.select_one(selector).text.strip() if card.select_one(selector) else None
+            else:
+                values[field] = urljoin(url, card.select_one(selector)[attribute]) if card.select_one(selector) else None
+        cards.append(values)
+    return cards
+
+
+def run(label, extract, html, rounds, baseline_rate=None):
+    cards = extract(html)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        extract(html)
+    elapsed = time.perf_counter() - start
+    rate = len(cards) * rounds / elapsed
+    speedup = f"{rate / baseline_rate:>6.1f}x" if baseline_rate else ''
+    print(f"  {label:<28} {rate:>10.0f} cards/sec {speedup}")
+    return cards, rate
+
+
+def main(rounds=20):
+    print(f"parser: {HTML_PARSER}, {rounds} rounds per fixture")
+    for kind, file_name in FIXTURES.items():
+        with open(os.path.join(FIXTURE_DIR, file_name), 'r', encoding='utf-8') as f:
+            html = f.read()
+        config = SITE_SELECTORS[kind]['default']
+        print(f"{kind} ({file_name}, {len(html) // 1024} KB)")
+
+        baseline_cards, baseline_rate = run('html.parser + select_one', lambda page: baseline_extract(page, FIXTURE_URL, config), html, rounds)
+        strained = ListingExtractor(config, parser="html.parser")
+        paths = [('html.parser + strainer', strained)]
+        if HTML_PARSER == "lxml":
+            paths.append(('lxml + compiled xpath', ListingExtractor(config)))
+
+        for label, extractor in paths:
+            cards, _ = run(label, lambda page: extractor.extract(page, FIXTURE_URL)[0], html, rounds, baseline_rate)
+            if cards != baseline_cards:
+                print(f"  {label} extracted different cards from the baseline for {kind}")
+                return 1
+        print(f"  {len(baseline_cards)} cards per page, identical output on every path")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
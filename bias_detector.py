@@ -40,21 +40,35 @@ TOXICITY_PATTERNS = [r'\b(hate|despise|detest)\s+(women|men|girls|boys|females?|
     r'\bmen jobs\b',]
 
 
-def check_pattern_bias(text):
-    for pattern in GENDER_BIASED_TERMS:
-        if re.search(pattern, text.lower()):
-            return "Your message contains a gender-biased statement that reinforces stereotypes. At JobsForHer, we believe in equal opportunities regardless of gender."
+PATTERN_BIAS_SCORE = 0.9
+
+GENDER_BIAS_MESSAGE = "Your message contains a gender-biased statement that reinforces stereotypes. At JobsForHer, we believe in equal opportunities regardless of gender."
+TOXICITY_MESSAGE = "Your message contains content that could be considered offensive or discriminatory. Please rephrase your request in a more respectful way."
+
+BIAS_TYPES = {GENDER_BIAS_MESSAGE: 'gender_bias', TOXICITY_MESSAGE: 'toxicity'}
+
+#compiled once, each list folded into a single alternation
+GENDER_BIASED_REGEX = re.compile('|'.join(f'(?:{pattern})' for pattern in GENDER_BIASED_TERMS))
+TOXICITY_REGEX = re.compile('|'.join(f'(?:{pattern})' for pattern in TOXICITY_PATTERNS))
+
 
-    for pattern in TOXICITY_PATTERNS:
-        if re.search(pattern, text.lower()):
-            return "Your message contains content that could be considered offensive or discriminatory. Please rephrase your request in a more respectful way."
+def match_bias_patterns(lower_text):
+    if GENDER_BIASED_REGEX.search(lower_text):
+        return GENDER_BIAS_MESSAGE
+
+    if TOXICITY_REGEX.search(lower_text):
+        return TOXICITY_MESSAGE
 
     return None
 
 
+def check_pattern_bias(text):
+    return match_bias_patterns(text.lower())
+
+
 def detect_bias(text):
     pattern_bias = check_pattern_bias(text)
     if pattern_bias:
         logger.info(f"Pattern-based bias detected in: '{text}'")
-        return True, 0.9, pattern_bias
+        return True, PATTERN_BIAS_SCORE, pattern_bias
     return False, 0, "" #works
\ No newline at end of file
@@ -4,6 +4,9 @@ import random
 from bias_detector import detect_bias
 
 from rag import semantic_search
+from search_index import tokenize
+from response_cache import response_cache, knowledge_version
+from entity_extractor import entity_extractor_version
 from guardrails import (
     check_and_handle_bias,
     check_for_off_topic,
@@ -20,10 +23,29 @@ from job_filter import (
     format_filter_summary
 )
 
-from events import search_events, format_event_response
+from events import search_events, format_event_response, events_version
+from intent import classify_intent
+from instrumentation import stage_timer
 
 logger = logging.getLogger(__name__)
 
+#structural patterns that keyword matching can't express, compiled once
+EVENT_LOCATION_PATTERN = re.compile(r"in\s+([a-zA-Z\s]+)")
+EVENT_PHRASE_PATTERNS = [
+    re.compile(r'\b(upcoming|scheduled) (events|webinars|workshops|conferences|meetups)\b'),
+    re.compile(r'\b(events|webinars) (in|at|near|on|for) ([a-zA-Z\s]+)\b')
+]
+JOB_FILTER_PATTERNS = [
+    re.compile(r'\b(jobs|positions|opportunities) (in|at|near|for|with)\b'),
+    re.compile(r'\b(remote|wfh|work from home|hybrid|on-site|in-office) (jobs|positions|work)\b'),
+    re.compile(r'\b(full-time|part-time|contract|freelance|internship) (jobs|positions|work)\b'),
+    re.compile(r'\b(entry-level|junior|mid-level|senior|lead) (jobs|positions|roles)\b')
+]
+LOCATION_JOB_PATTERN = re.compile(r'\b(jobs|positions|opportunities|work) (in|at|near) ([a-zA-Z\s]+)\b')
+SKILL_JOB_PATTERN = re.compile(r'\b([a-zA-Z\s]+) (jobs|positions|opportunities|roles)\b')
+GENERIC_REQUEST_PATTERN = re.compile(r'\b(all|any|some|more|find|get|show|list)\b')
+
+
 def process_user_input(user_input):
     is_biased, confidence, bias_message = detect_bias(user_input)
     if is_biased:
@@ -35,18 +57,33 @@ def process_user_input(user_input):
 def process_user_message(
         user_message: str,
         context: dict,
-        knowledge_base: dict
+        knowledge_base: dict,
+        intent: dict = None,
+        retrieval: dict = None,
+        search_query: str = None
 ) -> tuple:
     try:
-        guardrail_response = apply_all_guardrails(user_message)
+        if intent is None:
+            intent = classify_intent(user_message)
+
+        with stage_timer('guardrails'):
+            guardrail_response = apply_all_guardrails(user_message)
         if guardrail_response:
             return guardrail_response, context
 
-        event_response = _check_for_event_query(user_message, context)
+        with stage_timer('event_query'):
+            event_response = _check_for_event_query(user_message, context, intent)
         if event_response:
             return event_response, context
 
-        entities = extract_entities(user_message)
+        with stage_timer('entities'):
+            entities_key = ('entities', intent['lower_message'], entity_extractor_version())
+            cached_entities = response_cache.get(entities_key)
+            if cached_entities is None:
+                cached_entities = {entity_type: tuple(values)
+                                   for entity_type, values in extract_entities(user_message).items()}
+                response_cache.set(entities_key, cached_entities)
+            entities = {entity_type: list(values) for entity_type, values in cached_entities.items()}
 
         updated_context = context.copy()
         for entity_type, entity_values in entities.items():
@@ -62,10 +99,28 @@ def process_user_message(
 
         updated_context['last_message'] = user_message
 
-        search_query = _build_search_query(user_message, updated_context)
-        search_results = semantic_search(search_query, knowledge_base)
-
-        response = _generate_response(user_message, updated_context, search_results)
+        #without a search_query from the caller the reply is built from this turn alone, app.chat passes its
+        #history-enhanced query only for the turns whose reply it rebuilds from these results
+        if search_query is None:
+            search_query = _build_search_query(user_message, updated_context)
+
+        #retrieval and query typing are deterministic for a given query and knowledge base version,
+        #the random greetings and care reminders are added afterwards in _generate_response
+        plan_key = ('plan', tuple(tokenize(search_query)), intent['lower_message'], tuple(sorted(knowledge_base)),
+                    knowledge_version(), events_version())
+        plan = response_cache.get(plan_key)
+        if plan is None:
+            with stage_timer('chatbot_retrieval'):
+                search_results = semantic_search(search_query, knowledge_base)
+            plan = (search_results, _identify_query_type(user_message, search_results[:3], intent))
+            response_cache.set(plan_key, plan)
+        search_results, query_type = plan
+        #callers pass a retrieval dict to reuse these results instead of searching again
+        if retrieval is not None:
+            retrieval['query'] = search_query
+            retrieval['results'] = search_results
+
+        response = _generate_response(user_message, updated_context, search_results, intent, query_type)
 
         updated_context['history'].append({'role': 'assistant', 'content': response})
 
@@ -79,43 +134,35 @@ def process_user_message(
         return "I'm sorry, I encountered an issue processing your request. Please try again.", context
 
 
-def _check_for_event_query(user_message: str, context: dict) -> str:
-    message_lower = user_message.lower()
-
-    event_keywords = ["event", "webinar", "workshop", "conference", "meetup", "seminar",
-                      "session", "talk", "panel", "discussion", "networking"]
-
-    if any(keyword in message_lower for keyword in event_keywords):
+def _check_for_event_query(user_message: str, context: dict, intent: dict) -> str:
+    if intent['is_event_query']:
         try:
-            event_type = None
+            event_type = intent['event_type']
             location = None
 
-            for possible_type in ["webinar", "workshop", "conference", "meetup", "networking", "panel"]:
-                if possible_type in message_lower:
-                    event_type = possible_type
-                    break
-
-            location_match = re.search(r"in\s+([a-zA-Z\s]+)", message_lower)
+            location_match = EVENT_LOCATION_PATTERN.search(intent['lower_message'])
             if location_match:
                 location = location_match.group(1).strip()
 
-            for possible_location in ["virtual", "online", "in-person", "remote", "hybrid"]:
-                if possible_location in message_lower:
-                    location = possible_location
-                    break
-
-            events = search_events(
-                query=user_message,
-                event_type=event_type,
-                location=location
-            )
-
-            response = format_event_response(events)
+            if intent['event_location']:
+                location = intent['event_location']
+
+            event_key = ('event_query', intent['lower_message'], events_version())
+            cached = response_cache.get(event_key)
+            if cached is None:
+                events = search_events(
+                    query=user_message,
+                    event_type=event_type,
+                    location=location
+                )
+                cached = (format_event_response(events), tuple(e["id"] for e in events[:5]), len(events))
+                response_cache.set(event_key, cached)
+            response, shown_ids, event_count = cached
 
             context["last_topic"] = "events"
-            context["events_shown"] = [e["id"] for e in events[:5]] if events else []
+            context["events_shown"] = list(shown_ids)
 
-            logger.info(f"Found {len(events)} events matching query: '{user_message}'")
+            logger.info(f"Found {event_count} events matching query: '{user_message}'")
 
             if 'history' not in context:
                 context['history'] = []
@@ -154,14 +201,13 @@ def _build_search_query(user_message: str, context: dict) -> str:
 def _generate_response(
         user_message: str,
         context: dict,
-        search_results: list
+        search_results: list,
+        intent: dict,
+        query_type: str = None
 ) -> str:
     is_new_conversation = 'history' not in context or len(context.get('history', [])) <= 1
 
-    farewell_patterns = [
-        r'\b(goodbye|bye|farewell|see you|talk later|have a good day|thank you|thanks)\b'
-    ]
-    is_farewell = any(re.search(pattern, user_message.lower()) for pattern in farewell_patterns)
+    is_farewell = intent['is_farewell']
 
     if is_new_conversation:
         import random
@@ -216,7 +262,8 @@ def _generate_response(
     else:
         top_results = search_results[:3]
 
-        query_type = _identify_query_type(user_message, top_results)
+        if query_type is None:
+            query_type = _identify_query_type(user_message, top_results, intent)
 
         main_response = format_response(query_type, top_results, context)
 
@@ -234,44 +281,30 @@ def _generate_response(
     return main_response
 
 
-def _identify_query_type(user_message: str, search_results: list) -> str:
-    event_patterns = [
-        r'\b(event|webinar|workshop|conference|meetup|seminar|talk)\b',
-        r'\b(upcoming|scheduled) (events|webinars|workshops|conferences|meetups)\b',
-        r'\b(events|webinars) (in|at|near|on|for) ([a-zA-Z\s]+)\b'
-    ]
+def _identify_query_type(user_message: str, search_results: list, intent: dict = None) -> str:
+    if intent is None:
+        intent = classify_intent(user_message)
+    message_lower = intent['lower_message']
 
-    for pattern in event_patterns:
-        if re.search(pattern, user_message.lower()):
-            return 'event'
+    if intent['mentions_event_word'] or any(pattern.search(message_lower) for pattern in EVENT_PHRASE_PATTERNS):
+        return 'event'
 
-    job_filter_patterns = [
-        r'\b(jobs|positions|opportunities) (in|at|near|for|with)\b',
-        r'\b(remote|wfh|work from home|hybrid|on-site|in-office) (jobs|positions|work)\b',
-        r'\b(full-time|part-time|contract|freelance|internship) (jobs|positions|work)\b',
-        r'\b(entry-level|junior|mid-level|senior|lead) (jobs|positions|roles)\b'
-    ]
-
-    for pattern in job_filter_patterns:
-        if re.search(pattern, user_message.lower()):
+    for pattern in JOB_FILTER_PATTERNS:
+        if pattern.search(message_lower):
             filters = detect_job_filters(user_message)
             if filters.get("has_filters", False):
                 logger.info(f"Detected job filters: {filters}")
                 return 'filtered_job'
 
-    job_patterns = r'\b(job|career|position|opening|vacancy|work|employment|hiring|opportunity)\b'
-
-    location_job_pattern = r'\b(jobs|positions|opportunities|work) (in|at|near) ([a-zA-Z\s]+)\b'
-    location_match = re.search(location_job_pattern, user_message.lower())
+    location_match = LOCATION_JOB_PATTERN.search(message_lower)
     if location_match:
         return 'filtered_job'
 
-    skill_job_pattern = r'\b([a-zA-Z\s]+) (jobs|positions|opportunities|roles)\b'
-    skill_match = re.search(skill_job_pattern, user_message.lower())
-    if skill_match and not re.search(r'\b(all|any|some|more|find|get|show|list)\b', skill_match.group(1).lower()):
+    skill_match = SKILL_JOB_PATTERN.search(message_lower)
+    if skill_match and not GENERIC_REQUEST_PATTERN.search(skill_match.group(1).lower()):
         return 'filtered_job'
 
-    if re.search(job_patterns, user_message.lower()):
+    if intent['mentions_job_word']:
         filters = detect_job_filters(user_message)
         if filters.get("has_filters", False):
             return 'filtered_job'
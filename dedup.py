@@ -0,0 +1,119 @@
+import os
+import re
+import random
+import hashlib
+import logging
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', 0.8))
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+SHINGLE_SIZE = 3
+
+TRACKING_PARAM_PREFIXES = ('utm_',)
+TRACKING_PARAMS = {'ref', 'fbclid', 'gclid', 'trk'}
+_MERSENNE_PRIME = (1 << 61) - 1
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def normalize_url(url):
+    #same listing, same string: lower-case host, no fragment, trailing slash or tracking parameters
+    parts = urlsplit(url.strip())
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES))
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ''))
+
+
+def _normalize_text(value):
+    return ' '.join(_WORD_RE.findall((value or '').lower()))
+
+
+def stable_job_id(url=None, title=None, company=None, location=None):
+    #content-derived, so the same listing gets the same id on every scrape
+    if url:
+        key = normalize_url(url)
+    else:
+        key = '|'.join(_normalize_text(value) for value in (title, company, location))
+    return 'job-' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def job_text(job):
+    return ' '.join(str(job.get(field) or '') for field in ('title', 'company', 'location', 'description'))
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    words = _normalize_text(text).split()
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHashIndex:
+    #MinHash signatures banded for LSH, candidates are confirmed with the exact shingle Jaccard
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD, permutations=MINHASH_PERMUTATIONS, bands=MINHASH_BANDS):
+        self.threshold = threshold
+        self.rows = permutations // bands
+        self.bands = bands
+        rng = random.Random(1)
+        self.coefficients = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                             for _ in range(self.rows * bands)]
+        self.buckets = {}
+        self.shingle_sets = {}
+
+    def signature(self, shingle_set):
+        hashes = [_hash64(shingle) for shingle in shingle_set]
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self.coefficients]
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def find(self, shingle_set, signature=None):
+        #key of the most similar indexed item at or above the threshold, or None
+        if not shingle_set:
+            return None
+        candidates = set()
+        for band_key in self._band_keys(signature or self.signature(shingle_set)):
+            candidates.update(self.buckets.get(band_key, ()))
+
+        best_key, best_similarity = None, self.threshold
+        for key in candidates:
+            other = self.shingle_sets[key]
+            similarity = len(shingle_set & other) / len(shingle_set | other)
+            if similarity >= best_similarity:
+                best_key, best_similarity = key, similarity
+        return best_key
+
+    def add(self, key, shingle_set, signature=None):
+        if not shingle_set:
+            return
+        self.shingle_sets[key] = shingle_set
+        for band_key in self._band_keys(signature or self.signature(shingle_set)):
+            self.buckets.setdefault(band_key, []).append(key)
+
+
+def remove_near_duplicates(items, threshold=NEAR_DUPLICATE_THRESHOLD):
+    #keeps the first of every group of near-identical listings, returns (kept, {dropped id: kept id})
+    index = MinHashIndex(threshold)
+    kept = []
+    duplicate_of = {}
+    for item in items:
+        shingle_set = shingles(job_text(item))
+        signature = index.signature(shingle_set) if shingle_set else None
+        original = index.find(shingle_set, signature)
+        if original is not None:
+            duplicate_of[item.get('id')] = original
+            continue
+        index.add(item.get('id'), shingle_set, signature)
+        kept.append(item)
+
+    if duplicate_of:
+        logger.info(f"Dropped {len(duplicate_of)} near-duplicate listings")
+    return kept, duplicate_of
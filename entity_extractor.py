@@ -0,0 +1,157 @@
+import re
+import logging
+import threading
+from keyword_matcher import KeywordAutomaton, on_word_boundaries
+
+logger = logging.getLogger(__name__)
+
+#whole-word gazetteers, reported by extract() in message order
+BASE_GAZETTEERS = {
+    'job_role': ['developer', 'engineer', 'designer', 'manager', 'analyst', 'consultant', 'director', 'specialist',
+                 'coordinator', 'administrator', 'assistant', 'technician', 'officer'],
+    'location': ['bangalore', 'mumbai', 'delhi', 'hyderabad', 'chennai', 'kolkata', 'pune', 'ahmedabad', 'jaipur',
+                 'lucknow', 'remote', 'work from home', 'wfh'],
+    'skill': ['python', 'java', 'javascript', 'html', 'css', 'react', 'angular', 'node', 'sql', 'database',
+              'communication', 'leadership', 'project management', 'marketing', 'sales', 'design', 'analytics', 'ai',
+              'machine learning', 'cloud'],
+    'industry': ['technology', 'finance', 'healthcare', 'education', 'retail', 'manufacturing', 'media',
+                 'hospitality', 'government', 'non-profit', 'consulting', 'engineering', 'pharmaceutical',
+                 'telecommunications', 'energy'],
+    'event_type': ['workshop', 'seminar', 'conference', 'webinar', 'meetup', 'hackathon', 'training', 'course',
+                   'bootcamp', 'career fair', 'networking'],
+}
+
+#substring gazetteers for job filters, ordered by priority, first listed entry that appears wins
+FILTER_GAZETTEERS = {
+    'location': ["Mumbai", "Delhi", "Bangalore", "Bengaluru", "Hyderabad", "Chennai",
+                 "Kolkata", "Pune", "Ahmedabad", "Jaipur", "Gurgaon", "Noida"],
+    'company': ["TechCorp", "ServiceFirst", "DataInsights", "CloudSystems", "DigitalEdge"],
+    'position': ["developer", "manager", "analyst", "engineer", "designer"],
+}
+
+
+#what the scraper fills in for missing card fields, never real entities
+PLACEHOLDER_VALUES = {'position', 'company', 'various locations', 'no description provided.'}
+#a lone capitalised word (Research, Excel, Express) reads as an everyday word in a message, so only catalogue skills
+#of two or more tokens, or with the shape of a technical term (SQL, JavaScript, Node.js, CI/CD), become entities
+_PLAIN_WORD_RE = re.compile(r'^[A-Za-z][a-z]*$')
+
+
+def _catalogue_term(value, excluded=PLACEHOLDER_VALUES):
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    if not value or value.lower() in excluded:
+        return None
+    return value
+
+
+def _distinctive_skill(skill):
+    return skill is not None and (len(skill.split()) > 1 or not _PLAIN_WORD_RE.match(skill))
+
+
+def gazetteers_from_knowledge(knowledge_base):
+    #companies, locations and skills present in the catalogue, so new listings are recognised without code changes
+    entities = {'company': [], 'location': [], 'skill': []}
+    for item in knowledge_base.get('jobs', []):
+        entities['company'].append(_catalogue_term(item.get('company')))
+        location = item.get('location')
+        if isinstance(location, str):
+            entities['location'].extend(_catalogue_term(part) for part in location.split(','))
+        skills = item.get('skills', [])
+        if isinstance(skills, str):
+            skills = skills.split(',')
+        entities['skill'].extend(skill for skill in map(_catalogue_term, skills) if _distinctive_skill(skill))
+    return {entity_type: list(dict.fromkeys(value for value in values if value))
+            for entity_type, values in entities.items()}
+
+
+class EntityExtractor:
+    #filter terms in whole_word_filters only count on word boundaries, the built-in filter lists stay substring matches
+    def __init__(self, gazetteers=None, filter_gazetteers=None, whole_word_filters=()):
+        self.gazetteers = {entity_type: list(dict.fromkeys(term.lower() for term in terms))
+                           for entity_type, terms in (gazetteers or BASE_GAZETTEERS).items()}
+        self.filter_gazetteers = {filter_type: list(dict.fromkeys(terms))
+                                  for filter_type, terms in (filter_gazetteers or FILTER_GAZETTEERS).items()}
+
+        self.entity_types = {}
+        for entity_type, terms in self.gazetteers.items():
+            for term in terms:
+                self.entity_types.setdefault(term, []).append(entity_type)
+        filter_terms = {term.lower() for terms in self.filter_gazetteers.values() for term in terms}
+        self.whole_word_filters = {term.lower() for term in whole_word_filters}
+
+        #one automaton over every gazetteer, so a message is scanned once however many entries there are
+        self.automaton = KeywordAutomaton(sorted(set(self.entity_types) | filter_terms))
+        logger.info(f"Entity extractor built with {len(self.entity_types)} entity terms, {len(filter_terms)} filter terms")
+
+    def extract(self, text):
+        lower_text = text.lower()
+        spans = {}
+        for start, end, term in self.automaton.iter_matches(lower_text):
+            if term not in self.entity_types or not on_word_boundaries(lower_text, start, end):
+                continue
+            for entity_type in self.entity_types[term]:
+                spans.setdefault(entity_type, []).append((start, -end, term))
+
+        entities = {}
+        for entity_type in self.gazetteers:
+            if entity_type not in spans:
+                continue
+            #leftmost-longest, non-overlapping, like a regex findall over the alternation
+            found = []
+            covered = 0
+            for start, neg_end, term in sorted(spans[entity_type]):
+                if start >= covered:
+                    found.append(term)
+                    covered = -neg_end
+            entities[entity_type] = found
+        return entities
+
+    def detect_filters(self, text):
+        lower_text = text.lower()
+        present = {term for start, end, term in self.automaton.iter_matches(lower_text)
+                   if term not in self.whole_word_filters or on_word_boundaries(lower_text, start, end)}
+        detected = {}
+        for filter_type, terms in self.filter_gazetteers.items():
+            detected[filter_type] = next((term for term in terms if term.lower() in present), None)
+        return detected
+
+
+_extractor_lock = threading.Lock()
+#version increments on every rebuild, caches of extraction results key on it
+_extractor = {'current': None, 'version': 0}
+
+
+def get_entity_extractor():
+    extractor = _extractor['current']
+    if extractor is None:
+        with _extractor_lock:
+            if _extractor['current'] is None:
+                _extractor['current'] = EntityExtractor()
+            extractor = _extractor['current']
+    return extractor
+
+
+def entity_extractor_version():
+    return _extractor['version']
+
+
+def configure_entity_extractor(knowledge_base):
+    #base gazetteers extended with the knowledge base, rebuilt whenever the catalogue changes
+    knowledge_terms = gazetteers_from_knowledge(knowledge_base)
+    gazetteers = {entity_type: list(terms) for entity_type, terms in BASE_GAZETTEERS.items()}
+    filter_gazetteers = {filter_type: list(terms) for filter_type, terms in FILTER_GAZETTEERS.items()}
+    base_filter_terms = {term.lower() for terms in FILTER_GAZETTEERS.values() for term in terms}
+    whole_word_filters = set()
+    for entity_type, terms in knowledge_terms.items():
+        gazetteers.setdefault(entity_type, []).extend(terms)
+        if entity_type in ('company', 'location'):
+            filter_gazetteers[entity_type].extend(terms)
+            whole_word_filters.update(term.lower() for term in terms if term.lower() not in base_filter_terms)
+
+    extractor = EntityExtractor(gazetteers, filter_gazetteers, whole_word_filters)
+    with _extractor_lock:
+        _extractor['current'] = extractor
+        _extractor['version'] += 1
+    return extractor
@@ -2,25 +2,183 @@ import os
 import re
 import json
 import logging
-from datetime import datetime
+import bisect
+import threading
+from datetime import datetime, date, timedelta
 from security import detect_sql_injection, detect_xss, sanitize_input, sanitize_html
+from records import Event, to_record
 
 logger = logging.getLogger(__name__)
 
+EVENTS_PATH = os.path.join('data', 'events.json')
+EVENT_DATE_FORMATS = ["%b %d, %Y", "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y"]
+#distinct filter values remembered per event index before the lookup cache starts over
+MAX_LOOKUP_CACHE = 1024
+
+_events_lock = threading.Lock()
+_events_cache = {'signature': None, 'events': ()}
+
+
+def parse_event_date(value):
+    if not isinstance(value, str):
+        return None
+    for fmt in EVENT_DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _normalize_event_dates(events):
+    #strptime runs once per event at load time; date_iso is None for dates we can't parse
+    unparsed = 0
+    for event in events:
+        if not isinstance(event, dict):
+            continue
+        event_date = parse_event_date(event.get('date'))
+        event['date_iso'] = event_date.isoformat() if event_date else None
+        if event_date is None:
+            unparsed += 1
+    if unparsed:
+        logger.warning(f"{unparsed} events have unparseable dates and are excluded from date queries")
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
 def load_events():
+    #parsed once and shared as immutable Event records
     try:
-        events_path = os.path.join('data', 'events.json')
-        if os.path.exists(events_path):
-            with open(events_path, 'r') as file:
-                events = json.load(file)
+        if not os.path.exists(EVENTS_PATH):
+            logger.warning(f"Events file not found at {EVENTS_PATH}")
+            return ()
+
+        signature = _file_signature(EVENTS_PATH)
+        if signature == _events_cache['signature']:
+            return _events_cache['events']
+
+        with _events_lock:
+            if signature != _events_cache['signature']:
+                with open(EVENTS_PATH, 'r') as file:
+                    events = json.load(file)
+                _normalize_event_dates(events)
+                _events_cache['events'] = tuple(to_record('events', event) for event in events)
+                _events_cache['signature'] = signature
                 logger.info(f"Loaded {len(events)} event records")
-                return events
-        else:
-            logger.warning(f"Events file not found at {events_path}")
-            return []
+            return _events_cache['events']
+
     except Exception as e:
         logger.error(f"Error loading events: {e}")
-        return []
+        return _events_cache['events']
+
+
+def events_version():
+    #the file signature doubles as a version for caches derived from the events
+    load_events()
+    return _events_cache['signature']
+
+
+def reload_events():
+    with _events_lock:
+        _events_cache['signature'] = None
+    return load_events()
+
+
+class EventIndex:
+    def __init__(self, events):
+        self.events = events
+        self.positions = []
+        self.title_lower = {}
+        self.description_lower = {}
+        self.by_type = {}
+        self.by_location = {}
+        self.by_organizer = {}
+        self.undated_positions = []
+        #value -> matching positions, per filter index, the index is rebuilt whenever the events change
+        self.lookup_cache = {}
+
+        dated = []
+        for position, event in enumerate(events):
+            if not isinstance(event, (dict, Event)):
+                continue
+            self.positions.append(position)
+
+            if 'date_iso' in event:
+                event_date = date.fromisoformat(event['date_iso']) if event['date_iso'] else None
+            else:
+                event_date = parse_event_date(event.get('date'))
+            if event_date is None:
+                self.undated_positions.append(position)
+            else:
+                dated.append((event_date, position))
+
+            self.title_lower[position] = event.get('title', '').lower()
+            self.description_lower[position] = event.get('description', '').lower()
+            self.by_type.setdefault(event.get('type', '').lower(), []).append(position)
+            self.by_location.setdefault(event.get('location', '').lower(), []).append(position)
+            self.by_organizer.setdefault(event.get('organizer', '').lower(), []).append(position)
+
+        dated.sort()
+        self.dates = [event_date for event_date, _ in dated]
+        self.date_positions = [position for _, position in dated]
+
+    def between(self, start, end):
+        #(date, position) pairs for start <= date <= end, in date order
+        lo = bisect.bisect_left(self.dates, start)
+        hi = bisect.bisect_right(self.dates, end)
+        return list(zip(self.dates[lo:hi], self.date_positions[lo:hi]))
+
+    def _lookup(self, index, value):
+        #filters are substring matches over every distinct key, the scan runs once per value and is cached
+        cache = self.lookup_cache.setdefault(id(index), {})
+        positions = cache.get(value)
+        if positions is None:
+            positions = frozenset(position for key, key_positions in index.items()
+                                  if key and value in key for position in key_positions)
+            if len(cache) >= MAX_LOOKUP_CACHE:
+                cache.clear()
+            cache[value] = positions
+        return positions
+
+    def match(self, query='', event_type='', location='', organizer='', joined_text=False):
+        candidates = None
+        for index, value in ((self.by_type, event_type), (self.by_location, location),
+                             (self.by_organizer, organizer)):
+            if not value:
+                continue
+            matched = self._lookup(index, value)
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return []
+
+        positions = self.positions if candidates is None else sorted(candidates)
+
+        if query:
+            if joined_text:
+                positions = [p for p in positions
+                             if query in f"{self.title_lower[p]} {self.description_lower[p]}"]
+            else:
+                positions = [p for p in positions
+                             if query in self.title_lower[p] or query in self.description_lower[p]]
+
+        return positions
+
+
+_event_index_cache = {'events': None, 'index': None}
+
+
+def get_event_index(events):
+    #the index is tied to the exact events sequence it was built from, normally the load_events() tuple
+    cached = _event_index_cache
+    if cached['events'] is not events:
+        index = EventIndex(events)
+        cached['events'], cached['index'] = events, index
+        return index
+    return cached['index']
+
 
 def search_events(query=None, event_type=None, location=None):
     events = load_events()
@@ -44,29 +202,13 @@ def search_events(query=None, event_type=None, location=None):
     if events and len(events) > 0:
         logger.debug(f"Sample event data structure: {events[0]}")
 
-    results = []
-    for event in events:
-        if not isinstance(event, dict):
-            continue
-        match = True
-
-        if query and query.strip():
-            event_text = f"{event.get('title', '')} {event.get('description', '')}".lower()
-            if query.lower() not in event_text:
-                match = False
-
-        if event_type and event_type.strip():
-            event_type_value = event.get('type', '').lower()
-            if not event_type_value or event_type.lower() not in event_type_value:
-                match = False
-
-        if location and location.strip():
-            event_location = event.get('location', '').lower()
-            if not event_location or location.lower() not in event_location:
-                match = False
-
-        if match:
-            results.append(event)
+    positions = get_event_index(events).match(
+        query=(query or '').strip().lower(),
+        event_type=(event_type or '').strip().lower(),
+        location=(location or '').strip().lower(),
+        joined_text=True
+    )
+    results = [events[p] for p in positions]
 
     logger.info(f"Found {len(results)} matching events")
     return results
@@ -128,42 +270,44 @@ def parse_event_query(message):
     return query_params
 
 
-def filter_events(events, query='', event_type='', location='', limit=10):
-    security_message = None
-    filtered_events = events
+def query_events(events, query='', event_type='', location='', organizer='', limit=10, offset=0, cursor=None):
+    page = {'events': [], 'total': 0, 'next_cursor': None, 'security_message': None}
 
-    if not query and not event_type and not location:
-        logger.info(f"No search criteria provided, returning all {len(events)} events")
-        return events[:limit], security_message
+    raw_criteria = str(query or '') + str(event_type or '') + str(location or '') + str(organizer or '')
+    if any(char in raw_criteria for char in ['<', '>', ';', '--']):
+        page['security_message'] = "Invalid characters detected in search query"
+        return page
 
-    if any(char in str(query or '') + str(event_type or '') + str(location or '') for char in ['<', '>', ';', '--']):
-        security_message = "Invalid characters detected in search query"
-        return [], security_message
+    positions = get_event_index(events).match(
+        query=(query or '').lower().strip(),
+        event_type=(event_type or '').lower().strip(),
+        location=(location or '').lower().strip(),
+        organizer=(organizer or '').lower().strip()
+    )
 
-    query = query.lower().strip()
-    event_type = event_type.lower().strip()
-    location = location.lower().strip()
+    #the cursor is the position of the first event on the next page, stable while events.json is unchanged
+    if cursor:
+        start = bisect.bisect_left(positions, int(cursor))
+    else:
+        start = max(offset, 0)
+    end = start + limit
 
-    if query:
-        filtered_events = [
-            event for event in filtered_events
-            if query in event.get('title', '').lower() or
-               query in event.get('description', '').lower()
-        ]
+    page['events'] = [events[p] for p in positions[start:end]]
+    page['total'] = len(positions)
+    if end < len(positions):
+        page['next_cursor'] = str(positions[end])
+    return page
 
-    if event_type:
-        filtered_events = [
-            event for event in filtered_events
-            if event_type in event.get('type', '').lower()
-        ]
 
-    if location:
-        filtered_events = [
-            event for event in filtered_events
-            if location in event.get('location', '').lower()
-        ]
+def filter_events(events, query='', event_type='', location='', limit=10, offset=0):
+    if not query and not event_type and not location:
+        logger.info(f"No search criteria provided, returning all {len(events)} events")
+        return events[offset:offset + limit], None
+
+    page = query_events(events, query=query, event_type=event_type, location=location,
+                        limit=limit, offset=offset)
+    return page['events'], page['security_message']
 
-    return filtered_events[:limit], security_message
 
 def _text_contains(text, substring): #helper funcn
     if not text or not substring:
@@ -202,51 +346,31 @@ def format_event_response(events, security_message=None):
     return response
 
 
-def get_upcoming_events(days=30, limit=5):
+def get_events_between(start, end, limit=None):
     events = load_events()
     if not events:
         return []
 
-    today = datetime.now()
+    today = date.today()
     upcoming = []
+    for event_date, position in get_event_index(events).between(start, end)[:limit]:
+        upcoming.append(dict(events[position], days_until=(event_date - today).days))
+    return upcoming
 
-    for event in events:
-        try:
-            date_formats = ["%b %d, %Y", "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y"]
-            event_date = None
-
-            for fmt in date_formats:
-                try:
-                    event_date = datetime.strptime(event['date'], fmt)
-                    break
-                except ValueError:
-                    continue
-
-            if event_date is None:
-                continue
 
-            days_until = (event_date - today).days
-
-            if 0 <= days_until <= days:
-                event['days_until'] = days_until
-                upcoming.append(event)
-        except Exception as e:
-            logger.error(f"Error processing event date: {e}")
-            continue
-
-
-    upcoming.sort(key=lambda x: x.get('days_until', 0))
-
-    return upcoming[:limit]
+def get_upcoming_events(days=30, limit=5):
+    today = date.today()
+    return get_events_between(today, today + timedelta(days=days), limit)
 
 
 def get_popular_event_topics():
     events = load_events()
     topics = {}
 
-    for event in events:
-        title = event.get('title', '').lower()
-        desc = event.get('description', '').lower()
+    index = get_event_index(events)
+    for position in index.positions:
+        title = index.title_lower[position]
+        desc = index.description_lower[position]
 
         for topic in ["leadership", "tech", "career", "networking", "mentorship",
                       "development", "skills", "women", "diversity", "inclusion",
@@ -263,5 +387,5 @@ def get_events_by_organizer(organizer, limit=5):
     if not events:
         return []
 
-    filtered = [event for event in events if organizer.lower() in event.get('organizer', '').lower()]
-    return filtered[:limit] #worksyey
+    page = query_events(events, organizer=organizer, limit=limit)
+    return page['events'] #worksyey
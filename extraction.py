@@ -0,0 +1,256 @@
+import re
+import logging
+from urllib.parse import urljoin, urlsplit
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml.html
+    from lxml import etree
+    HTML_PARSER = "lxml"
+except ImportError:
+    lxml = None
+    HTML_PARSER = "html.parser"
+
+#declarative selectors per kind of listing, keyed by host with a 'default' fallback
+#each field is (selector, attribute), attribute None means the stripped text of the first match
+SITE_SELECTORS = {
+    'jobs': {
+        'default': {
+            'cards': ".job-card, .job-listing, .job-item, article.job",
+            'next_page': "a[rel~=next], .pagination .next a, a.next-page",
+            'fields': {
+                'title': (".job-title, h2, h3", None),
+                'company': (".company-name, .company", None),
+                'location': (".location, .job-location", None),
+                'description': (".description, .job-description, .summary", None),
+                'link': ("a", "href"),
+            },
+        },
+    },
+    'events': {
+        'default': {
+            'cards': ".event-card, .event-listing, .event-item, article.event",
+            'next_page': "a[rel~=next], .pagination .next a, a.next-page",
+            'fields': {
+                'title': (".event-title, .title, h2, h3", None),
+                'date': (".event-date, .date", None),
+                'location': (".event-location, .location", None),
+                'description': (".event-description, .description, .summary", None),
+                'organizer': (".organizer, .host", None),
+                'link': ("a", "href"),
+                'image': ("img", "src"),
+                'registration': (".register, .signup", "href"),
+            },
+        },
+    },
+}
+
+#a compound selector, e.g. "article.job", ".pagination" or "a[rel~=next]"
+_COMPOUND_RE = re.compile(r'^([a-zA-Z][\w-]*)?((?:[.#][\w-]+|\[[^\]]+\])*)')
+_FULL_COMPOUND_RE = re.compile(r'^([a-zA-Z][\w-]*)?((?:[.#][\w-]+|\[[^\]]+\])*)$')
+_PART_RE = re.compile(r'([.#])([\w-]+)|\[([\w-]+)(?:([~^$*|]?=)["\']?([^"\'\]]*)["\']?)?\]')
+
+
+def _compile_compound(selector):
+    match = _COMPOUND_RE.match(selector.strip())
+    tag, parts = match.group(1), match.group(2)
+    if not tag and not parts:
+        return None
+    conditions = []
+    for prefix, name, attr, op, value in _PART_RE.findall(parts):
+        if prefix == '.':
+            conditions.append(('class', '~=', name))
+        elif prefix == '#':
+            conditions.append(('id', '=', name))
+        else:
+            conditions.append((attr, op, value))
+    return tag.lower() if tag else None, conditions
+
+
+def _xpath_condition(attr, op, value):
+    if "'" in value:
+        return None
+    if not op:
+        return f"@{attr}"
+    if op == '~=':
+        return f"contains(concat(' ', normalize-space(@{attr}), ' '), ' {value} ')"
+    if op == '=':
+        return f"@{attr}='{value}'"
+    if op == '^=':
+        return f"starts-with(@{attr}, '{value}')"
+    if op == '$=':
+        return f"substring(@{attr}, string-length(@{attr}) - {len(value) - 1})='{value}'"
+    if op == '*=':
+        return f"contains(@{attr}, '{value}')"
+    return f"(@{attr}='{value}' or starts-with(@{attr}, '{value}-'))"
+
+
+def css_to_xpath(selector_group):
+    #tag / .class / #id / [attr op value] compounds joined by descendant combinators, None for anything else
+    paths = []
+    for selector in selector_group.split(','):
+        steps = []
+        for compound in selector.split():
+            if not _FULL_COMPOUND_RE.match(compound):
+                return None
+            tag, conditions = _compile_compound(compound)
+            step = f"descendant::{tag or '*'}"
+            for attr, op, value in conditions:
+                condition = _xpath_condition(attr, op, value)
+                if condition is None:
+                    return None
+                step += f"[{condition}]"
+            steps.append(step)
+        if not steps:
+            return None
+        paths.append('/'.join(steps))
+    return ' | '.join(paths)
+
+
+def _attribute_matches(attrs, attr, op, value):
+    actual = attrs.get(attr)
+    if actual is None:
+        return False
+    if not op:
+        return True
+    words = actual if isinstance(actual, list) else actual.split()
+    text = ' '.join(actual) if isinstance(actual, list) else actual
+    if op == '~=':
+        return value in words
+    if op == '=':
+        return text == value
+    if op == '^=':
+        return text.startswith(value)
+    if op == '$=':
+        return text.endswith(value)
+    if op == '*=':
+        return value in text
+    return text == value or text.startswith(value + '-')
+
+
+def build_strainer(*selectors):
+    #keeps only the elements a selector can start from, everything else on the page is never built
+    compounds = []
+    for selector_group in selectors:
+        for selector in selector_group.split(','):
+            compound = _compile_compound(selector)
+            if compound is None:
+                return None
+            compounds.append(compound)
+
+    def keep(name, attrs):
+        for tag, conditions in compounds:
+            if tag and tag != name:
+                continue
+            if all(_attribute_matches(attrs, attr, op, value) for attr, op, value in conditions):
+                return True
+        return False
+
+    return SoupStrainer(keep)
+
+
+class ListingExtractor:
+    #parses one listing page down to {field: value} per card, each selector evaluated once per card
+    #with lxml every selector is compiled to XPath up front, otherwise BeautifulSoup only builds the strained subtrees
+    def __init__(self, config, parser=HTML_PARSER):
+        self.config = config
+        self.fields = list(config['fields'].items())
+        self.xpaths = None
+        if parser == "lxml" and lxml is not None:
+            self.xpaths = self._compile_xpaths()
+            if self.xpaths is None:
+                logger.info(f"Selectors for {config['cards']} are not XPath-compatible, using BeautifulSoup")
+        self.parser = parser
+        self.strainer = build_strainer(*[selector for selector in (config['cards'], config.get('next_page')) if selector])
+
+    def _compile_xpaths(self):
+        selectors = [('cards', self.config['cards'])] + [(field, selector) for field, (selector, _) in self.fields]
+        if self.config.get('next_page'):
+            selectors.append(('next_page', self.config['next_page']))
+        xpaths = {}
+        for name, selector in selectors:
+            xpath = css_to_xpath(selector)
+            if xpath is None:
+                return None
+            xpaths[name] = etree.XPath(xpath)
+        return xpaths
+
+    def parse(self, html):
+        return BeautifulSoup(html, self.parser, parse_only=self.strainer)
+
+    def _field_value(self, element, attribute, url, text):
+        if element is None:
+            return None
+        if attribute is None:
+            return text(element).strip()
+        value = element.get(attribute)
+        return urljoin(url, value) if value and attribute in ('href', 'src') else value
+
+    def extract(self, html, url):
+        if self.xpaths is not None:
+            return self._extract_lxml(html, url)
+        return self._extract_soup(html, url)
+
+    def _extract_soup(self, html, url):
+        soup = self.parse(html)
+        cards = []
+        for card in soup.select(self.config['cards']):
+            cards.append({field: self._field_value(card.select_one(selector), attribute, url, _soup_text)
+                          for field, (selector, attribute) in self.fields})
+
+        next_url = None
+        if self.config.get('next_page'):
+            next_url = self._field_value(soup.select_one(self.config['next_page']), 'href', url, _soup_text)
+        return cards, next_url
+
+    def _extract_lxml(self, html, url):
+        try:
+            try:
+                root = lxml.html.fromstring(html)
+            except ValueError:
+                #documents with an encoding declaration have to be handed to lxml as bytes
+                root = lxml.html.fromstring(html.encode('utf-8'))
+        except (ValueError, etree.ParserError) as e:
+            #anything lxml refuses (empty or broken documents) goes through BeautifulSoup instead
+            logger.debug(f"lxml could not parse {url}, using BeautifulSoup: {e}")
+            return self._extract_soup(html, url)
+
+        cards = []
+        for card in self.xpaths['cards'](root):
+            values = {}
+            for field, (_, attribute) in self.fields:
+                matches = self.xpaths[field](card)
+                values[field] = self._field_value(matches[0] if matches else None, attribute, url, _lxml_text)
+            cards.append(values)
+
+        next_url = None
+        if 'next_page' in self.xpaths:
+            matches = self.xpaths['next_page'](root)
+            next_url = self._field_value(matches[0] if matches else None, 'href', url, _lxml_text)
+        return cards, next_url
+
+
+def _soup_text(element):
+    return element.get_text()
+
+
+_string_value = etree.XPath('string()') if lxml is not None else None
+
+
+def _lxml_text(element):
+    return _string_value(element)
+
+
+_extractors = {}
+
+
+def get_extractor(kind, url):
+    host = urlsplit(url).netloc.lower()
+    site_selectors = SITE_SELECTORS[kind]
+    key = (kind, host if host in site_selectors else 'default')
+    extractor = _extractors.get(key)
+    if extractor is None:
+        extractor = _extractors[key] = ListingExtractor(site_selectors[key[1]])
+    return extractor
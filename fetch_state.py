@@ -0,0 +1,84 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+SCRAPER_STATE_FILE = os.environ.get('SCRAPER_STATE_FILE', os.path.join('data', 'scraper_state.json'))
+SCRAPER_CONDITIONAL = os.environ.get('SCRAPER_CONDITIONAL', 'True').lower() == 'true'
+
+
+def content_hash(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+class FetchState:
+    #per-url validators (ETag / Last-Modified), page hash and the items extracted from that page
+    def __init__(self, path=SCRAPER_STATE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.pages = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.pages = json.load(f)
+                logger.debug(f"Loaded scraper state for {len(self.pages)} pages from {self.path}")
+        except (OSError, ValueError) as e:
+            #the state is only an optimisation, a bad file means refetching everything once
+            logger.error(f"Error loading scraper state from {self.path}: {e}")
+            self.pages = {}
+
+    def get(self, url):
+        with self.lock:
+            return self.pages.get(url)
+
+    def request_headers(self, url):
+        entry = self.get(url)
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def update(self, url, response, page_hash, items, next_url):
+        with self.lock:
+            self.pages[url] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'content_hash': page_hash,
+                'items': items,
+                'next_url': next_url,
+            }
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            pages = dict(self.pages)
+            self.dirty = False
+
+        temp_path = None
+        try:
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.scraper-state-')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(pages, f, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+            logger.info(f"Saved scraper state for {len(pages)} pages to {self.path}")
+        except Exception as e:
+            logger.error(f"Error saving scraper state to {self.path}: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
@@ -0,0 +1,185 @@
+import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from fetch_state import content_hash
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+DEFAULT_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+SCRAPER_MAX_WORKERS = int(os.environ.get('SCRAPER_MAX_WORKERS', 16))
+SCRAPER_PER_HOST_CONCURRENCY = int(os.environ.get('SCRAPER_PER_HOST_CONCURRENCY', 2))
+SCRAPER_MIN_INTERVAL = float(os.environ.get('SCRAPER_MIN_INTERVAL', 0.5))
+SCRAPER_TIMEOUT = float(os.environ.get('SCRAPER_TIMEOUT', 15))
+SCRAPER_RETRIES = int(os.environ.get('SCRAPER_RETRIES', 3))
+SCRAPER_BACKOFF = float(os.environ.get('SCRAPER_BACKOFF', 1.0))
+SCRAPER_MAX_PAGES = int(os.environ.get('SCRAPER_MAX_PAGES', 5))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def host_of(url):
+    return urlsplit(url).netloc.lower()
+
+
+class HostLimiter:
+    #caps in-flight requests per host and spaces request starts by a minimum interval
+    def __init__(self, concurrency, min_interval):
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.next_start = 0.0
+
+    def __enter__(self):
+        self.slots.acquire()
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+        return self
+
+    def __exit__(self, *exc):
+        self.slots.release()
+
+    def defer(self, seconds):
+        #a Retry-After from the host pushes back every request to it, not just the retried one
+        with self.lock:
+            self.next_start = max(self.next_start, time.monotonic() + seconds)
+
+
+class Fetcher:
+    #one pooled requests.Session shared by every worker, keep-alive connections are reused per host
+    def __init__(self, max_workers=SCRAPER_MAX_WORKERS, per_host_concurrency=SCRAPER_PER_HOST_CONCURRENCY,
+                 min_interval=SCRAPER_MIN_INTERVAL, timeout=SCRAPER_TIMEOUT, retries=SCRAPER_RETRIES,
+                 backoff=SCRAPER_BACKOFF):
+        self.max_workers = max_workers
+        self.per_host_concurrency = per_host_concurrency
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max(max_workers, per_host_concurrency))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.limiters = {}
+        self.limiters_lock = threading.Lock()
+
+    def limiter(self, url):
+        host = host_of(url)
+        with self.limiters_lock:
+            limiter = self.limiters.get(host)
+            if limiter is None:
+                limiter = self.limiters[host] = HostLimiter(self.per_host_concurrency, self.min_interval)
+            return limiter
+
+    def _retry_delay(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return float(retry_after)
+        #exponential backoff with jitter so retries from parallel workers don't line up
+        return self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    def fetch(self, url, headers=None):
+        #returns the final response, or None once retries are exhausted or the error is not retryable
+        limiter = self.limiter(url)
+        for attempt in range(self.retries + 1):
+            response = None
+            try:
+                with limiter:
+                    response = self.session.get(url, headers=headers, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response
+                logger.warning(f"Got {response.status_code} from {url} (attempt {attempt + 1})")
+
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                logger.warning(f"Error fetching URL {url} (attempt {attempt + 1}): {e}")
+
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Error fetching URL {url}: {e}")
+                return None
+
+            if attempt < self.retries:
+                delay = self._retry_delay(attempt, response)
+                if response is not None and response.status_code == 429:
+                    limiter.defer(delay)
+                time.sleep(delay)
+
+        logger.error(f"Giving up on {url} after {self.retries + 1} attempts")
+        return None
+
+    def map(self, func, urls):
+        #runs func(url) over a bounded pool, results come back in input order, a failing url yields None
+        urls = list(urls)
+        if not urls:
+            return []
+
+        def run(url):
+            try:
+                return func(url)
+            except Exception as e:
+                logger.error(f"Error processing {url}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls)),
+                                thread_name_prefix='scraper') as executor:
+            return list(executor.map(run, urls))
+
+    def fetch_all(self, urls):
+        return self.map(self.fetch, urls)
+
+    def crawl(self, url, parse_page, max_pages=SCRAPER_MAX_PAGES, state=None, failed_urls=None):
+        #follows a paginated listing, parse_page(response, previous_items) returns (items, next_url or None)
+        #with a FetchState, requests are conditional and a 304 or an identical body reuses the stored items unparsed
+        #pages that could not be fetched are added to failed_urls, the items before them are still returned
+        items = []
+        seen = set()
+        while url and url not in seen and len(seen) < max_pages:
+            seen.add(url)
+            entry = state.get(url) if state is not None else None
+            response = self.fetch(url, headers=state.request_headers(url) if state is not None else None)
+            if response is None:
+                if failed_urls is not None:
+                    failed_urls.append(url)
+                break
+
+            if entry is not None and response.status_code == 304:
+                logger.debug(f"{url} not modified")
+                page_items, next_url = entry['items'], entry['next_url']
+            else:
+                page_hash = content_hash(response.content)
+                if entry is not None and entry.get('content_hash') == page_hash:
+                    logger.debug(f"{url} content unchanged")
+                    page_items, next_url = entry['items'], entry['next_url']
+                else:
+                    page_items, next_url = parse_page(response, entry['items'] if entry else [])
+                if state is not None:
+                    state.update(url, response, page_hash, page_items, next_url)
+
+            items.extend(page_items)
+            url = next_url
+        return items
+
+    def close(self):
+        self.session.close()
+
+
+fetcher = Fetcher()
@@ -1,6 +1,7 @@
 import re
+import random
 import logging
-from bias_detector import detect_bias
+from bias_detector import match_bias_patterns, PATTERN_BIAS_SCORE
 
 logger = logging.getLogger(__name__)
 
@@ -68,168 +69,152 @@ PERSONAL_QUESTION_PATTERNS = [
 ]
 
 
-def check_and_handle_bias(user_message):
-    lower_message = user_message.lower()
-
-    for pattern in BIAS_PATTERNS:
-        if re.search(pattern, lower_message):
-            logger.info(f"Bias detected in message: {user_message}")
-
-            response_options = [
-                "I appreciate your question! 🌸 At JobsForHer, we believe in inclusive and equitable language that empowers everyone. Could we reframe your question to use more inclusive terms? I'm here to help you find the right resources for your career journey.",
-
-                "Thank you for reaching out. 🌷 I noticed some wording in your question that we could make more inclusive. JobsForHer is all about empowering careers without limitations. Would you mind rephrasing your question? I'm excited to help you with your career growth!",
+SENSITIVE_TOPIC_PATTERNS = [
+    r'\b(salary negotiation|pay gap|discrimination|harassment|toxic workplace)\b',
+    r'\b(mental health|depression|anxiety|stress|burnout)\b',
+    r'\b(lawsuit|legal action|sue|complaint|grievance)\b'
+]
 
-                "Your career growth matters to me! 🌺 I noticed some language that might unintentionally reinforce stereotypes. Could we rephrase your question with more inclusive terminology? I'd love to provide you with helpful information on jobs, events, and mentorship opportunities.",
+HALLUCINATION_PATTERNS = [
+    r'\b(predict|forecast|future|trend|outlook|projection)\b',
+    r'\b(will i|can i|should i|would i|could i)\b',
+    r'\b(guarantee|promise|ensure|certain|definitely)\b'
+]
 
-                "Let's grow together! 🌹 To ensure we're creating an inclusive environment for all professionals, could we reframe your question with more neutral wording? I'm here to support your career journey with helpful resources and opportunities.",
+BIAS_RESPONSES = [
+    "I appreciate your question! 🌸 At JobsForHer, we believe in inclusive and equitable language that empowers everyone. Could we reframe your question to use more inclusive terms? I'm here to help you find the right resources for your career journey.",
 
-                "I'm so glad you're here! 🌻 At JobsForHer, we value inclusive language that breaks down barriers rather than reinforcing them. Could we rephrase your question to be more inclusive? I'm eager to help you find the perfect resources for your professional growth!"
-            ]
+    "Thank you for reaching out. 🌷 I noticed some wording in your question that we could make more inclusive. JobsForHer is all about empowering careers without limitations. Would you mind rephrasing your question? I'm excited to help you with your career growth!",
 
-            import random
-            return random.choice(response_options)
+    "Your career growth matters to me! 🌺 I noticed some language that might unintentionally reinforce stereotypes. Could we rephrase your question with more inclusive terminology? I'd love to provide you with helpful information on jobs, events, and mentorship opportunities.",
 
-    return None
+    "Let's grow together! 🌹 To ensure we're creating an inclusive environment for all professionals, could we reframe your question with more neutral wording? I'm here to support your career journey with helpful resources and opportunities.",
 
+    "I'm so glad you're here! 🌻 At JobsForHer, we value inclusive language that breaks down barriers rather than reinforcing them. Could we rephrase your question to be more inclusive? I'm eager to help you find the perfect resources for your professional growth!"
+]
 
-def check_for_off_topic(user_message):
-    lower_message = user_message.lower()
-
-    for pattern in OFF_TOPIC_PATTERNS:
-        if re.search(pattern, lower_message):
-            logger.info(f"Off-topic query detected: {user_message}")
+OFF_TOPIC_RESPONSES = [
+    "I appreciate your query! 🌸 However, I'm Asha, a career counselor at JobsForHer Foundation, focused on helping women with their professional growth. I can't assist with shopping or product recommendations, but I'd be happy to help you explore job opportunities, career events, or mentorship programs. How can I support your career journey?",
 
-            response_options = [
-                "I appreciate your query! 🌸 However, I'm Asha, a career counselor at JobsForHer Foundation, focused on helping women with their professional growth. I can't assist with shopping or product recommendations, but I'd be happy to help you explore job opportunities, career events, or mentorship programs. How can I support your career journey?",
+    "Thanks for reaching out! 🌺 Just to clarify - I'm Asha, a career counselor specialized in helping women advance their careers. While I can't help with purchasing products, I'd love to assist you with job searches, professional development, or finding a mentor. What career-related support are you looking for?",
 
-                "Thanks for reaching out! 🌺 Just to clarify - I'm Asha, a career counselor specialized in helping women advance their careers. While I can't help with purchasing products, I'd love to assist you with job searches, professional development, or finding a mentor. What career-related support are you looking for?",
+    "Hello! 🍪 I'm Asha, your dedicated career counselor at JobsForHer. While I can't help with shopping or product recommendations, my expertise lies in career guidance, job opportunities, and professional development. Would you like to explore any of these areas?",
 
-                "Hello! 🍪 I'm Asha, your dedicated career counselor at JobsForHer. While I can't help with shopping or product recommendations, my expertise lies in career guidance, job opportunities, and professional development. Would you like to explore any of these areas?",
+    "Thanks for your message! 🌼 I'm Asha, and I specialize in career support for the JobsForHer community. I'd be delighted to help you find job opportunities, upcoming events, mentorship programs, or professional development resources. What aspect of your career would you like to explore?",
 
-                "Thanks for your message! 🌼 I'm Asha, and I specialize in career support for the JobsForHer community. I'd be delighted to help you find job opportunities, upcoming events, mentorship programs, or professional development resources. What aspect of your career would you like to explore?",
+    "Sending you a virtual cookie! 🍪 I'm Asha, your career growth companion at JobsForHer. While I can't help with that specific topic, I'd be thrilled to assist you with finding job opportunities, career events, mentorship connections, or professional development resources. How can I support your career journey today?",
 
-                "Sending you a virtual cookie! 🍪 I'm Asha, your career growth companion at JobsForHer. While I can't help with that specific topic, I'd be thrilled to assist you with finding job opportunities, career events, mentorship connections, or professional development resources. How can I support your career journey today?",
+    "Hi there! 🌷 I'm Asha from JobsForHer. While that's not my area of expertise, I'd be happy to help you discover exciting job opportunities, connect you with mentors, find career-building events, or explore professional development resources. What are you looking to achieve in your career?",
 
-                "Hi there! 🌷 I'm Asha from JobsForHer. While that's not my area of expertise, I'd be happy to help you discover exciting job opportunities, connect you with mentors, find career-building events, or explore professional development resources. What are you looking to achieve in your career?",
+    "Warm greetings! 🌺 I'm Asha, your dedicated career assistant. I specialize in helping with career-related information like job opportunities, professional events, mentorship programs, and skill development resources. I'd love to help you take your next career step - what are you interested in exploring?"
+]
 
-                "Warm greetings! 🌺 I'm Asha, your dedicated career assistant. I specialize in helping with career-related information like job opportunities, professional events, mentorship programs, and skill development resources. I'd love to help you take your next career step - what are you interested in exploring?"
-            ]
+PERSONAL_QUESTION_RESPONSES = [
+    "I appreciate your curiosity! 🌸 While I don't have personal preferences, I'd love to focus on helping you with factual information about career opportunities through JobsForHer. What kind of career information would be most helpful for your journey right now?",
 
-            import random
-            return random.choice(response_options)
+    "Thanks for asking! 🍪 As your career assistant, I'm here to provide objective information rather than personal opinions. I'd be delighted to help you explore job opportunities, career events, or mentorship programs that match your interests. What would you like to know about?",
 
-    return None
+    "What a thoughtful question! 🌷 Rather than sharing personal views, I'd love to help you with factual information about the amazing opportunities at JobsForHer. Would you like to explore job listings, upcoming events, or mentorship programs tailored to your career goals?",
 
+    "I appreciate your interest! 🌺 While I don't have personal opinions, I'm passionate about helping you with your career journey. I can share information about job opportunities, professional events, mentorship programs, and career resources. How can I support your growth today?",
 
-def check_for_personal_questions(user_message):
-    lower_message = user_message.lower()
+    "That's an interesting question! 🌹 I'm focused on being your helpful career companion by providing factual information rather than personal views. I'd be thrilled to help you discover career opportunities, events, or mentorship programs through JobsForHer. What are you most interested in exploring?"
+]
 
-    for pattern in PERSONAL_QUESTION_PATTERNS:
-        if re.search(pattern, lower_message):
-            logger.info(f"Personal question detected: {user_message}")
+SENSITIVE_TOPIC_RESPONSES = [
+    "Thank you for bringing up this important topic. 🌸 Your wellbeing matters! For sensitive workplace matters like this, connecting with a mentor who can provide personalized guidance might be most helpful. JobsForHer offers wonderful mentorship programs - would you like me to share information about these opportunities?",
 
-            response_options = [
-                "I appreciate your curiosity! 🌸 While I don't have personal preferences, I'd love to focus on helping you with factual information about career opportunities through JobsForHer. What kind of career information would be most helpful for your journey right now?",
+    "I appreciate you trusting me with this topic. 🌷 This deserves thoughtful, personalized guidance from someone who can fully understand your specific situation. JobsForHer connects women with experienced mentors who can provide this kind of support. Would you like to learn more about these mentorship opportunities?",
 
-                "Thanks for asking! 🍪 As your career assistant, I'm here to provide objective information rather than personal opinions. I'd be delighted to help you explore job opportunities, career events, or mentorship programs that match your interests. What would you like to know about?",
+    "This is certainly an important matter. 🌺 While I can offer general information, I believe you deserve specialized support for this topic. JobsForHer has a network of experienced mentors who can provide the nuanced guidance you deserve. Would you like me to share details about connecting with a mentor?",
 
-                "What a thoughtful question! 🌷 Rather than sharing personal views, I'd love to help you with factual information about the amazing opportunities at JobsForHer. Would you like to explore job listings, upcoming events, or mentorship programs tailored to your career goals?",
+    "Your question touches on something significant. 🌹 For matters like this, speaking with a career mentor who can understand your unique circumstances would be most valuable. JobsForHer offers mentorship programs designed to provide this personalized support. Would you like information about these programs?",
 
-                "I appreciate your interest! 🌺 While I don't have personal opinions, I'm passionate about helping you with your career journey. I can share information about job opportunities, professional events, mentorship programs, and career resources. How can I support your growth today?",
+    "I care about your wellbeing! 🍪 For sensitive workplace matters, having a conversation with a mentor who can provide tailored guidance based on your specific situation would be most beneficial. JobsForHer connects women with experienced professionals through our mentorship programs. Would you like to learn more about these opportunities?"
+]
 
-                "That's an interesting question! 🌹 I'm focused on being your helpful career companion by providing factual information rather than personal views. I'd be thrilled to help you discover career opportunities, events, or mentorship programs through JobsForHer. What are you most interested in exploring?"
-            ]
+HALLUCINATION_RESPONSES = [
+    "I'd love to help you make an informed decision! 🌸 While I can't predict the future, I can provide factual information about current opportunities at JobsForHer. Would you like to explore available job listings, upcoming events, or mentorship programs that might help you chart your own path forward?",
 
-            import random
-            return random.choice(response_options)
+    "Great question! 🍪 I focus on providing reliable, current information rather than predictions. I'd be happy to share details about existing job opportunities, scheduled events, or established mentorship programs that could help you make your own well-informed decision. What specific information would be most helpful?",
 
-    return None
+    "That's an excellent consideration! 🌷 Rather than making predictions, I can offer you factual information about current opportunities through JobsForHer. Would you like to explore available jobs, upcoming events, or mentorship programs that align with your interests? These resources might help you form your own perspective.",
 
+    "I appreciate your forward-thinking question! 🌺 While I can't predict outcomes, I'd be delighted to share current information about job opportunities, career events, and mentorship programs at JobsForHer. This factual information might help you make your own decision. What specific area interests you most?",
 
-def check_for_sensitive_topics(user_message):
-    sensitive_patterns = [
-        r'\b(salary negotiation|pay gap|discrimination|harassment|toxic workplace)\b',
-        r'\b(mental health|depression|anxiety|stress|burnout)\b',
-        r'\b(lawsuit|legal action|sue|complaint|grievance)\b'
-    ]
-
-    lower_message = user_message.lower()
-
-    for pattern in sensitive_patterns:
-        if re.search(pattern, lower_message):
-            logger.info(f"Sensitive topic detected: {user_message}")
+    "I'm excited to help you explore possibilities! 🌹 Instead of predictions, I can provide you with current, factual information about opportunities at JobsForHer. Would you like to learn about available job listings, upcoming events, or established mentorship programs? This information might help you chart your own career path."
+]
 
-            response_options = [
-                "Thank you for bringing up this important topic. 🌸 Your wellbeing matters! For sensitive workplace matters like this, connecting with a mentor who can provide personalized guidance might be most helpful. JobsForHer offers wonderful mentorship programs - would you like me to share information about these opportunities?",
 
-                "I appreciate you trusting me with this topic. 🌷 This deserves thoughtful, personalized guidance from someone who can fully understand your specific situation. JobsForHer connects women with experienced mentors who can provide this kind of support. Would you like to learn more about these mentorship opportunities?",
+def _compile_alternation(patterns):
+    #one regex per category, matching iff any of its patterns would match
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
 
-                "This is certainly an important matter. 🌺 While I can offer general information, I believe you deserve specialized support for this topic. JobsForHer has a network of experienced mentors who can provide the nuanced guidance you deserve. Would you like me to share details about connecting with a mentor?",
 
-                "Your question touches on something significant. 🌹 For matters like this, speaking with a career mentor who can understand your unique circumstances would be most valuable. JobsForHer offers mentorship programs designed to provide this personalized support. Would you like information about these programs?",
+BIAS_REGEX = _compile_alternation(BIAS_PATTERNS)
+OFF_TOPIC_REGEX = _compile_alternation(OFF_TOPIC_PATTERNS)
+PERSONAL_QUESTION_REGEX = _compile_alternation(PERSONAL_QUESTION_PATTERNS)
+SENSITIVE_TOPIC_REGEX = _compile_alternation(SENSITIVE_TOPIC_PATTERNS)
+HALLUCINATION_REGEX = _compile_alternation(HALLUCINATION_PATTERNS)
 
-                "I care about your wellbeing! 🍪 For sensitive workplace matters, having a conversation with a mentor who can provide tailored guidance based on your specific situation would be most beneficial. JobsForHer connects women with experienced professionals through our mentorship programs. Would you like to learn more about these opportunities?"
-            ]
+#checked in priority order, the first category that matches answers the message
+GUARDRAIL_CATEGORIES = [
+    (BIAS_REGEX, BIAS_RESPONSES, "Bias detected in message"),
+    (OFF_TOPIC_REGEX, OFF_TOPIC_RESPONSES, "Off-topic query detected"),
+    (PERSONAL_QUESTION_REGEX, PERSONAL_QUESTION_RESPONSES, "Personal question detected"),
+    (SENSITIVE_TOPIC_REGEX, SENSITIVE_TOPIC_RESPONSES, "Sensitive topic detected"),
+    (HALLUCINATION_REGEX, HALLUCINATION_RESPONSES, "Potential hallucination risk detected"),
+]
 
-            import random
-            return random.choice(response_options)
 
+def _check_category(regex, responses, log_message, user_message, lower_message):
+    if regex.search(lower_message):
+        logger.info(f"{log_message}: {user_message}")
+        return random.choice(responses)
     return None
 
 
-def check_for_hallucination_risk(user_message):
-    hallucination_patterns = [
-        r'\b(predict|forecast|future|trend|outlook|projection)\b',
-        r'\b(will i|can i|should i|would i|could i)\b',
-        r'\b(guarantee|promise|ensure|certain|definitely)\b'
-    ]
+def check_and_handle_bias(user_message):
+    return _check_category(*GUARDRAIL_CATEGORIES[0], user_message, user_message.lower())
 
-    lower_message = user_message.lower()
 
-    for pattern in hallucination_patterns:
-        if re.search(pattern, lower_message):
-            logger.info(f"Potential hallucination risk detected: {user_message}")
+def check_for_off_topic(user_message):
+    return _check_category(*GUARDRAIL_CATEGORIES[1], user_message, user_message.lower())
 
-            response_options = [
-                "I'd love to help you make an informed decision! 🌸 While I can't predict the future, I can provide factual information about current opportunities at JobsForHer. Would you like to explore available job listings, upcoming events, or mentorship programs that might help you chart your own path forward?",
 
-                "Great question! 🍪 I focus on providing reliable, current information rather than predictions. I'd be happy to share details about existing job opportunities, scheduled events, or established mentorship programs that could help you make your own well-informed decision. What specific information would be most helpful?",
+def check_for_personal_questions(user_message):
+    return _check_category(*GUARDRAIL_CATEGORIES[2], user_message, user_message.lower())
 
-                "That's an excellent consideration! 🌷 Rather than making predictions, I can offer you factual information about current opportunities through JobsForHer. Would you like to explore available jobs, upcoming events, or mentorship programs that align with your interests? These resources might help you form your own perspective.",
 
-                "I appreciate your forward-thinking question! 🌺 While I can't predict outcomes, I'd be delighted to share current information about job opportunities, career events, and mentorship programs at JobsForHer. This factual information might help you make your own decision. What specific area interests you most?",
+def check_for_sensitive_topics(user_message):
+    return _check_category(*GUARDRAIL_CATEGORIES[3], user_message, user_message.lower())
 
-                "I'm excited to help you explore possibilities! 🌹 Instead of predictions, I can provide you with current, factual information about opportunities at JobsForHer. Would you like to learn about available job listings, upcoming events, or established mentorship programs? This information might help you chart your own career path."
-            ]
 
-            import random
-            return random.choice(response_options)
+def check_for_hallucination_risk(user_message):
+    return _check_category(*GUARDRAIL_CATEGORIES[4], user_message, user_message.lower())
 
-    return None
+
+def _check_ml_bias(user_message, lower_message):
+    explanation = match_bias_patterns(lower_message)
+    if explanation:
+        logger.info(f"ML-detected bias in message: {user_message} (score: {PATTERN_BIAS_SCORE})")
+    return explanation
 
 
 def check_ml_bias(user_message):
-    is_biased, bias_score, explanation = detect_bias(user_message)
-    if is_biased:
-        logger.info(f"ML-detected bias in message: {user_message} (score: {bias_score})")
-        return explanation
-    return None
+    return _check_ml_bias(user_message, user_message.lower())
 
 
 def apply_all_guardrails(user_message):
-    checks = [
-        check_ml_bias,
-        check_and_handle_bias,
-        check_for_off_topic,
-        check_for_personal_questions,
-        check_for_sensitive_topics,
-        check_for_hallucination_risk
-    ]
-
-    for check_function in checks:
-        result = check_function(user_message)
+    lower_message = user_message.lower()
+
+    result = _check_ml_bias(user_message, lower_message)
+    if result:
+        return result
+
+    for regex, responses, log_message in GUARDRAIL_CATEGORIES:
+        result = _check_category(regex, responses, log_message, user_message, lower_message)
         if result:
             return result
 
-    return None #workssuperfine
\ No newline at end of file
+    return None
@@ -1,49 +1,13 @@
-import re 
 import logging
 import sqlite3
+from entity_extractor import get_entity_extractor
 
 logger = logging.getLogger(__name__)
 
 
 def extract_entities(text):
-    entities = {}
-
-    job_roles = re.findall(
-        r'\b(developer|engineer|designer|manager|analyst|consultant|director|specialist|coordinator|administrator|assistant|technician|officer)\b',
-        text.lower()
-    )
-    if job_roles:
-        entities['job_role'] = job_roles
-
-    locations = re.findall(
-        r'\b(bangalore|mumbai|delhi|hyderabad|chennai|kolkata|pune|ahmedabad|jaipur|lucknow|remote|work from home|wfh)\b',
-        text.lower()
-    )
-    if locations:
-        entities['location'] = locations
-
-    skills = re.findall(
-        r'\b(python|java|javascript|html|css|react|angular|node|sql|database|communication|leadership|project management|marketing|sales|design|analytics|ai|machine learning|cloud)\b',
-        text.lower()
-    )
-    if skills:
-        entities['skill'] = skills
-
-    industries = re.findall(
-        r'\b(technology|finance|healthcare|education|retail|manufacturing|media|hospitality|government|non-profit|consulting|engineering|pharmaceutical|telecommunications|energy)\b',
-        text.lower()
-    )
-    if industries:
-        entities['industry'] = industries
-
-    event_types = re.findall(
-        r'\b(workshop|seminar|conference|webinar|meetup|hackathon|training|course|bootcamp|career fair|networking)\b',
-        text.lower()
-    )
-    if event_types:
-        entities['event_type'] = event_types
-
-    return entities
+    #single pass over the message with the shared gazetteer automaton
+    return get_entity_extractor().extract(text)
 
 
 def format_response(query_type, results, context):
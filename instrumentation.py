@@ -0,0 +1,120 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from flask import has_request_context, request, Response
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LATENCY_QUANTILES = (0.5, 0.95, 0.99)
+SAMPLE_WINDOW = int(os.environ.get('METRICS_SAMPLE_WINDOW', 2048))
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING', 'False').lower() == 'true'
+
+#per-request timings live in the WSGI environ, chat() pushes its own app context so flask.g would not survive
+TIMINGS_ENVIRON_KEY = 'asha.stage_timings'
+STARTED_ENVIRON_KEY = 'asha.request_started'
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        #recent samples for quantiles, bounded so memory stays flat
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def quantile(self, q):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def record_stage(stage, seconds):
+    endpoint = request.endpoint if has_request_context() else None
+    key = (endpoint or 'none', stage)
+    with _histograms_lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    if has_request_context():
+        request.environ.setdefault(TIMINGS_ENVIRON_KEY, []).append((stage, seconds))
+
+
+@contextmanager
+def stage_timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def render_prometheus():
+    lines = [
+        '# HELP asha_stage_duration_seconds Time spent in each request stage.',
+        '# TYPE asha_stage_duration_seconds histogram',
+    ]
+    with _histograms_lock:
+        snapshot = sorted(_histograms.items())
+        for (endpoint, stage), histogram in snapshot:
+            labels = f'endpoint="{endpoint}",stage="{stage}"'
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, histogram.bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'asha_stage_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'asha_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'asha_stage_duration_seconds_sum{{{labels}}} {histogram.total}')
+            lines.append(f'asha_stage_duration_seconds_count{{{labels}}} {histogram.count}')
+
+        lines.append('# HELP asha_stage_latency_seconds Stage latency quantiles over the most recent samples.')
+        lines.append('# TYPE asha_stage_latency_seconds summary')
+        for (endpoint, stage), histogram in snapshot:
+            labels = f'endpoint="{endpoint}",stage="{stage}"'
+            for q in LATENCY_QUANTILES:
+                lines.append(f'asha_stage_latency_seconds{{{labels},quantile="{q}"}} {histogram.quantile(q)}')
+            lines.append(f'asha_stage_latency_seconds_sum{{{labels}}} {histogram.total}')
+            lines.append(f'asha_stage_latency_seconds_count{{{labels}}} {histogram.count}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    @app.before_request
+    def _start_request_timer():
+        request.environ[STARTED_ENVIRON_KEY] = time.perf_counter()
+
+    @app.after_request
+    def _finish_request_timer(response):
+        started = request.environ.get(STARTED_ENVIRON_KEY)
+        if started is None or request.endpoint == 'metrics':
+            return response
+        record_stage('total', time.perf_counter() - started)
+
+        if SERVER_TIMING_ENABLED:
+            response.headers['Server-Timing'] = ', '.join(
+                f'{stage};dur={seconds * 1000:.2f}' for stage, seconds in request.environ.get(TIMINGS_ENVIRON_KEY, [])
+            )
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
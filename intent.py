@@ -0,0 +1,74 @@
+import logging
+from keyword_matcher import KeywordAutomaton, on_word_boundaries
+
+logger = logging.getLogger(__name__)
+
+#substring keyword sets, matched anywhere in the lower-cased message
+RESPONSE_TYPE_KEYWORDS = [
+    ('job', ['job', 'career', 'position', 'work']),
+    ('event', ['event', 'workshop', 'seminar']),
+    ('bye', ['bye', 'goodbye', 'exit', 'quit']),
+]
+EVENT_QUERY_KEYWORDS = ["event", "webinar", "workshop", "conference", "meetup", "seminar",
+                        "session", "talk", "panel", "discussion", "networking"]
+EVENT_TYPE_KEYWORDS = ["webinar", "workshop", "conference", "meetup", "networking", "panel"]
+EVENT_LOCATION_KEYWORDS = ["virtual", "online", "in-person", "remote", "hybrid"]
+SIGNUP_KEYWORDS = ['sign up', 'register', 'create account', 'create profile']
+JOB_FILTER_KEYWORDS = ["remote", "wfh", "hybrid", "in-office", "full-time", "part-time"]
+METRIC_KEYWORDS = ["job", "event", "mentor", "location"]
+
+#whole-word keyword sets, matched like a regex \b(...)\b
+EVENT_WORDS = ['event', 'webinar', 'workshop', 'conference', 'meetup', 'seminar', 'talk']
+JOB_WORDS = ['job', 'career', 'position', 'opening', 'vacancy', 'work', 'employment', 'hiring', 'opportunity']
+FAREWELL_WORDS = ['goodbye', 'bye', 'farewell', 'see you', 'talk later', 'have a good day', 'thank you', 'thanks']
+
+_SUBSTRING_KEYWORDS = set(EVENT_QUERY_KEYWORDS + EVENT_TYPE_KEYWORDS + EVENT_LOCATION_KEYWORDS +
+                          SIGNUP_KEYWORDS + JOB_FILTER_KEYWORDS + METRIC_KEYWORDS)
+for _, _keywords in RESPONSE_TYPE_KEYWORDS:
+    _SUBSTRING_KEYWORDS.update(_keywords)
+_WORD_KEYWORDS = set(EVENT_WORDS + JOB_WORDS + FAREWELL_WORDS)
+
+#built once at import over every keyword set above
+INTENT_AUTOMATON = KeywordAutomaton(sorted(_SUBSTRING_KEYWORDS | _WORD_KEYWORDS))
+
+
+def _first_in_order(keywords, found):
+    for keyword in keywords:
+        if keyword in found:
+            return keyword
+    return None
+
+
+def classify_intent(user_message):
+    lower_message = user_message.lower()
+
+    found = set()
+    found_words = set()
+    for start, end, keyword in INTENT_AUTOMATON.iter_matches(lower_message):
+        found.add(keyword)
+        if keyword in _WORD_KEYWORDS and on_word_boundaries(lower_message, start, end):
+            found_words.add(keyword)
+
+    response_type = None
+    for candidate, keywords in RESPONSE_TYPE_KEYWORDS:
+        if found.intersection(keywords):
+            response_type = candidate
+            break
+
+    intent = {
+        'message': user_message,
+        'lower_message': lower_message,
+        'keywords': found,
+        'words': found_words,
+        'response_type': response_type,
+        'is_signup': bool(found.intersection(SIGNUP_KEYWORDS)),
+        'is_event_query': bool(found.intersection(EVENT_QUERY_KEYWORDS)),
+        'event_type': _first_in_order(EVENT_TYPE_KEYWORDS, found),
+        'event_location': _first_in_order(EVENT_LOCATION_KEYWORDS, found),
+        'mentions_event_word': bool(found_words.intersection(EVENT_WORDS)),
+        'mentions_job_word': bool(found_words.intersection(JOB_WORDS)),
+        'is_farewell': bool(found_words.intersection(FAREWELL_WORDS)),
+        'has_job_filter_terms': bool(found.intersection(JOB_FILTER_KEYWORDS)),
+    }
+    logger.debug(f"Intent for '{user_message}': {response_type}, keywords={sorted(found)}")
+    return intent
@@ -1,9 +1,9 @@
 import random
  
-LOCATIONS = ["Mumbai", "Delhi", "Bangalore", "Bengaluru", "Hyderabad", "Chennai",
-    "Kolkata", "Pune", "Ahmedabad", "Jaipur", "Gurgaon", "Noida"]
+from entity_extractor import FILTER_GAZETTEERS, get_entity_extractor
+
+LOCATIONS = FILTER_GAZETTEERS['location']
 def detect_job_filters(user_message):
-    user_message = user_message.lower()
     filters = {
         "position": None,
         "company": None,
@@ -11,25 +11,17 @@ def detect_job_filters(user_message):
         "has_filters": False
     }
 
-    for location in LOCATIONS:
-        if location.lower() in user_message:
-            filters["location"] = location
-            filters["has_filters"] = True
-            break
-
-    companies = ["TechCorp", "ServiceFirst", "DataInsights", "CloudSystems", "DigitalEdge"]
-    for company in companies:
-        if company.lower() in user_message:
-            filters["company"] = company
-            filters["has_filters"] = True
-            break
-
-    positions = ["developer", "manager", "analyst", "engineer", "designer"]
-    for position in positions:
-        if position in user_message.lower():
-            filters["position"] = position.title()
-            filters["has_filters"] = True
-            break
+    #location, company and position come from one scan, each picks its highest priority match
+    detected = get_entity_extractor().detect_filters(user_message)
+    if detected.get("location"):
+        filters["location"] = detected["location"]
+        filters["has_filters"] = True
+    if detected.get("company"):
+        filters["company"] = detected["company"]
+        filters["has_filters"] = True
+    if detected.get("position"):
+        filters["position"] = detected["position"].title()
+        filters["has_filters"] = True
 
     return filters
 
@@ -0,0 +1,71 @@
+from collections import deque
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+def on_word_boundaries(text, start, end):
+    #same rule as a regex \b on both sides of text[start:end]
+    if _is_word_char(text[start]) and start > 0 and _is_word_char(text[start - 1]):
+        return False
+    if _is_word_char(text[end - 1]) and end < len(text) and _is_word_char(text[end]):
+        return False
+    return True
+
+
+class KeywordAutomaton:
+    #Aho-Corasick automaton, finds every keyword occurrence in one pass over the text
+    def __init__(self, keywords=()):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self._built = False
+        for keyword in keywords:
+            self.add(keyword)
+        self.build()
+
+    def add(self, keyword):
+        state = 0
+        for char in keyword:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        if keyword not in self.output[state]:
+            self.output[state].append(keyword)
+        self._built = False
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        for state in queue:
+            self.fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+        self._built = True
+
+    def iter_matches(self, text, whole_words=False):
+        if not self._built:
+            self.build()
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for keyword in self.output[state]:
+                start = position - len(keyword) + 1
+                end = position + 1
+                if whole_words and not on_word_boundaries(text, start, end):
+                    continue
+                yield start, end, keyword
@@ -2,10 +2,93 @@ import json
 import os
 import logging
 from security import sanitize_input, sanitize_html, detect_sql_injection, detect_xss
+from records import Record, to_record, as_dict
+from knowledge_store import iter_records, read_records, write_records, append_records, record_digest
+from response_cache import bump_knowledge_version
 
 logger = logging.getLogger(__name__)
 DATA_DIR = 'data'
-KNOWLEDGE_FILES = {'jobs': 'expanded_jobs.json'}
+KNOWLEDGE_FILES = {'jobs': 'expanded_jobs.jsonl'}
+#recent writes per knowledge file, read by workers that did not make them
+MAX_DELTA_LOG_ENTRIES = int(os.environ.get('KNOWLEDGE_DELTA_LOG_SIZE', 50))
+
+
+def knowledge_file_path(knowledge_type):
+    #the JSON Lines file, or the legacy pretty-printed JSON it replaces until the first write
+    path = os.path.join(DATA_DIR, KNOWLEDGE_FILES[knowledge_type])
+    legacy_path = os.path.splitext(path)[0] + '.json'
+    if not os.path.exists(path) and os.path.exists(legacy_path):
+        return legacy_path
+    return path
+
+
+def find_malicious_content(item):
+    #(attack type, offending value) for the first suspicious key or value, checked recursively, else None
+    if isinstance(item, dict):
+        for k, v in item.items():
+            if isinstance(k, str):
+                if detect_sql_injection(k):
+                    return "SQL Injection", k
+                elif detect_xss(k):
+                    return "XSS Attack", k
+
+            found = find_malicious_content(v)
+            if found:
+                return found
+
+    elif isinstance(item, list):
+        for elem in item:
+            found = find_malicious_content(elem)
+            if found:
+                return found
+
+    elif isinstance(item, str):
+        if detect_sql_injection(item):
+            return "SQL Injection", item
+        elif detect_xss(item):
+            return "XSS Attack", item
+
+    return None
+
+
+def _stored_digests(knowledge_type):
+    #digest per id of what is already on disk, records written earlier were validated then
+    path = knowledge_file_path(knowledge_type)
+    if not os.path.exists(path):
+        return {}
+    return {item.get('id'): record_digest(item) for item in iter_records(path)
+            if isinstance(item, dict) and item.get('id')}
+
+
+def _validate_changed_records(knowledge_type, data):
+    #only new or edited records are checked and sanitized, unchanged ones are written back as they are
+    stored = _stored_digests(knowledge_type)
+    changed = []
+    for position, item in enumerate(data):
+        item_id = item.get('id') if isinstance(item, (dict, Record)) else None
+        if item_id not in stored or stored[item_id] != record_digest(item):
+            changed.append((position, item))
+
+    #imp :: security check first!
+    for _, item in changed:
+        found = find_malicious_content(as_dict(item))
+        if found:
+            malicious_type, malicious_value = found
+            logger.warning(f"{malicious_type} detected in input: {malicious_value}")
+            return False, f"Security alert: Potentially malicious {malicious_type.lower()} detected. Please submit valid data."
+
+    #imp :: sanitization!
+    for position, item in changed:
+        if isinstance(item, Record):
+            #records are immutable, the sanitized copy takes their place in the list that gets written
+            item = data[position] = as_dict(item)
+        if isinstance(item, dict):
+            for key, value in item.items():
+                if isinstance(value, str):
+                    item[key] = sanitize_input(value)
+
+    logger.debug(f"Validated {len(changed)} new or changed {knowledge_type} records")
+    return True, None
 
 
 def update_knowledge_file(knowledge_type, data):
@@ -14,75 +97,44 @@ def update_knowledge_file(knowledge_type, data):
             logger.error(f"Invalid knowledge type: {knowledge_type}")
             return False, "Invalid knowledge type"
 
-        #imp :: security check first!
-        malicious_found = False
-        malicious_type = None
-        malicious_value = None
-
-        #check recursively for malicious content
-        def check_malicious_content(item):
-            nonlocal malicious_found, malicious_type, malicious_value
-
-            if isinstance(item, dict):
-                for k, v in item.items():
-                    if isinstance(k, str):
-                        if detect_sql_injection(k):
-                            malicious_found = True
-                            malicious_type = "SQL Injection"
-                            malicious_value = k
-                            return True
-                        elif detect_xss(k):
-                            malicious_found = True
-                            malicious_type = "XSS Attack"
-                            malicious_value = k
-                            return True
-
-                    if check_malicious_content(v):
-                        return True
-
-            elif isinstance(item, list):
-                for elem in item:
-                    if check_malicious_content(elem):
-                        return True
-
-            elif isinstance(item, str):
-                if detect_sql_injection(item):
-                    malicious_found = True
-                    malicious_type = "SQL Injection"
-                    malicious_value = item
-                    return True
-                elif detect_xss(item):
-                    malicious_found = True
-                    malicious_type = "XSS Attack"
-                    malicious_value = item
-                    return True
-
-            return False
-
-        check_malicious_content(data)
-
-        if malicious_found:
-            logger.warning(f"{malicious_type} detected in input: {malicious_value}")
-            return False, f"Security alert: Potentially malicious {malicious_type.lower()} detected. Please submit valid data."
+        success, error = _validate_changed_records(knowledge_type, data)
+        if not success:
+            return False, error
+
+        file_path = os.path.join(DATA_DIR, KNOWLEDGE_FILES[knowledge_type])
+        count = write_records(file_path, data)
 
-        #imp :: sanitization!
-        if isinstance(data, list):
-            for item in data:
-                if isinstance(item, dict):
-                    for key, value in item.items():
-                        if isinstance(value, str):
-                            item[key] = sanitize_input(value)
+        logger.info(f"Updated knowledge file: {file_path} with {count} items")
+        bump_knowledge_version(f"after writing {file_path}")
+        return True, None
+
+    except Exception as e:
+        logger.error(f"Error updating knowledge file: {e}")
+        return False, f"Error updating knowledge file: {str(e)}"
+
+
+def append_knowledge_records(knowledge_type, items):
+    #new records only, appended without rewriting the file, a legacy JSON file is converted by a full write
+    try:
+        if knowledge_type not in KNOWLEDGE_FILES:
+            logger.error(f"Invalid knowledge type: {knowledge_type}")
+            return False, "Invalid knowledge type"
 
         file_path = os.path.join(DATA_DIR, KNOWLEDGE_FILES[knowledge_type])
+        if not os.path.exists(file_path):
+            return update_knowledge_file(knowledge_type, load_knowledge(knowledge_type) + list(items))
 
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        success, error = _validate_changed_records(knowledge_type, items)
+        if not success:
+            return False, error
 
-        logger.info(f"Updated knowledge file: {file_path} with {len(data)} items")
+        count = append_records(file_path, items)
+        logger.info(f"Appended {count} items to knowledge file: {file_path}")
+        bump_knowledge_version(f"after appending to {file_path}")
         return True, None
 
     except Exception as e:
-        logger.error(f"Error updating knowledge file: {e}")
+        logger.error(f"Error appending to knowledge file: {e}")
         return False, f"Error updating knowledge file: {str(e)}"
 
 
@@ -93,8 +145,7 @@ def load_knowledge_file(file_path):
             logger.warning(f"knowledge file doesn't exist:{full_path}")
             return []
 
-        with open(full_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = read_records(full_path)
 
         logger.debug(f"loaded {len(data)} items from {file_path}")
         return data
@@ -108,12 +159,16 @@ def load_knowledge_file(file_path):
         return []
 
 
+def load_knowledge(knowledge_type):
+    return load_knowledge_file(os.path.relpath(knowledge_file_path(knowledge_type), DATA_DIR))
+
+
 def load_all_knowledge():
     knowledge_base = {}
     os.makedirs(DATA_DIR, exist_ok=True)
 
-    for knowledge_type, file_name in KNOWLEDGE_FILES.items():
-        knowledge_base[knowledge_type] = load_knowledge_file(file_name)
+    for knowledge_type in KNOWLEDGE_FILES:
+        knowledge_base[knowledge_type] = [to_record(knowledge_type, item) for item in load_knowledge(knowledge_type)]
 
     for knowledge_type, data in knowledge_base.items():
         if not data:
@@ -124,11 +179,73 @@ def load_all_knowledge():
 
 def _create_empty_knowledge_file(knowledge_type):
     file_path = os.path.join(DATA_DIR, KNOWLEDGE_FILES[knowledge_type])
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump([], f)
+    write_records(file_path, [])
     logger.info(f"created empty knowledge file:{file_path}")
 
 
+def diff_knowledge(old_items, new_items):
+    old_by_id = {item.get('id'): item for item in old_items if item.get('id')}
+    new_by_id = {item.get('id'): item for item in new_items if item.get('id')}
+
+    return {
+        'added': [item_id for item_id in new_by_id if item_id not in old_by_id],
+        'removed': [item_id for item_id in old_by_id if item_id not in new_by_id],
+        'changed': [item_id for item_id, item in new_by_id.items()
+                    if item_id in old_by_id and old_by_id[item_id] != item],
+    }
+
+
+def knowledge_file_signature(knowledge_type):
+    #(inode, mtime_ns, size), changes with every write or append
+    path = knowledge_file_path(knowledge_type)
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _delta_log_path(knowledge_type):
+    return os.path.join(DATA_DIR, f".{knowledge_type}.deltas.jsonl")
+
+
+def log_knowledge_delta(knowledge_type, from_signature, delta, items):
+    #called by the writer right after a write, the entry carries the added and changed records themselves
+    items_by_id = {item.get('id'): item for item in items}
+    entry = {'from': from_signature, 'to': knowledge_file_signature(knowledge_type),
+             'added': list(delta.get('added', [])), 'removed': list(delta.get('removed', [])),
+             'changed': list(delta.get('changed', []))}
+    entry['records'] = [as_dict(items_by_id[item_id]) for item_id in entry['added'] + entry['changed']
+                        if item_id in items_by_id]
+    path = _delta_log_path(knowledge_type)
+    try:
+        append_records(path, [entry])
+        entries = read_records(path)
+        if len(entries) > MAX_DELTA_LOG_ENTRIES:
+            write_records(path, entries[-MAX_DELTA_LOG_ENTRIES:])
+    except Exception as e:
+        logger.error(f"Error logging {knowledge_type} delta: {e}")
+    return entry
+
+
+def read_knowledge_deltas(knowledge_type, from_signature, to_signature):
+    #the logged deltas leading from one file signature to the other, None when the log does not cover the gap
+    path = _delta_log_path(knowledge_type)
+    if from_signature is None or to_signature is None or not os.path.exists(path):
+        return None
+    by_from = {tuple(entry['from']): entry for entry in iter_records(path)
+               if isinstance(entry, dict) and entry.get('from') and entry.get('to')}
+
+    chain = []
+    signature = tuple(from_signature)
+    while signature != tuple(to_signature):
+        entry = by_from.get(signature)
+        if entry is None or len(chain) >= len(by_from):
+            return None
+        chain.append(entry)
+        signature = tuple(entry['to'])
+    return chain
+
+
 def get_all_text_content(knowledge_base):
     all_texts = []
 
@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+import math
+import heapq
+import mmap
+import logging
+import tempfile
+from array import array
+from search_index import FIELD_WEIGHTS, DEFAULT_FIELD_WEIGHT, BM25_K1, BM25_B, document_type
+from records import to_record, as_dict
+
+logger = logging.getLogger(__name__)
+
+#layout, every section 8-byte aligned:
+#  header: magic, byte order, then a table of (offset, length) per section
+#  strings: u64 offsets + utf-8 blob, holding the metadata, field names, terms and one JSON blob per record
+#  records / terms: u32 string ids, fixed width so item i is found without scanning
+#  field_lengths: doc_count x field_count u32, field_totals: u64 per field
+#  term_doc_freq + term_postings: u32 per term, postings_*: parallel u32 arrays (doc, field, tf)
+SNAPSHOT_MAGIC = b'ASHAKB01'
+SNAPSHOT_SECTIONS = ('string_offsets', 'string_data', 'records', 'terms', 'field_lengths', 'field_totals',
+                     'term_doc_freq', 'term_postings', 'postings_doc', 'postings_field', 'postings_tf')
+SECTION_TYPECODES = {'string_offsets': 'Q', 'string_data': 'B', 'field_totals': 'Q'}
+_BYTE_ORDER = b'L' if sys.byteorder == 'little' else b'B'
+_HEADER_SIZE = 16 + 16 * len(SNAPSHOT_SECTIONS)
+
+
+def _typecode(section):
+    return SECTION_TYPECODES.get(section, 'I')
+
+
+def write_snapshot(path, knowledge_type, items, index, source_signature=None):
+    #index must be a freshly built SearchIndex over items, so doc id i is items[i]
+    if len(index) != len(items) or any(doc_id not in index.documents for doc_id in range(len(items))):
+        raise ValueError(f"{knowledge_type} index does not line up with its items, cannot snapshot")
+
+    strings = []
+    string_ids = {}
+
+    def intern(value):
+        string_id = string_ids.get(value)
+        if string_id is None:
+            string_id = string_ids[value] = len(strings)
+            strings.append(value.encode('utf-8'))
+        return string_id
+
+    fields = sorted(index.field_length_totals)
+    field_ids = {field: i for i, field in enumerate(fields)}
+    metadata = {
+        'knowledge_type': knowledge_type,
+        'doc_count': len(items),
+        'fields': fields,
+        'source_signature': list(source_signature) if source_signature else None,
+    }
+    intern(json.dumps(metadata))
+
+    sections = {name: array(_typecode(name)) for name in SNAPSHOT_SECTIONS}
+    for item in items:
+        sections['records'].append(intern(json.dumps(as_dict(item), separators=(',', ':'))))
+
+    for doc_id in range(len(items)):
+        lengths = index.doc_field_lengths.get(doc_id, {})
+        sections['field_lengths'].extend(lengths.get(field, 0) for field in fields)
+    sections['field_totals'].extend(index.field_length_totals[field] for field in fields)
+
+    for term in sorted(index.postings):
+        sections['terms'].append(intern(term))
+        postings = index.postings[term]
+        sections['term_doc_freq'].append(len(postings))
+        sections['term_postings'].append(len(sections['postings_doc']))
+        for doc_id in sorted(postings):
+            for field, count in postings[doc_id].items():
+                sections['postings_doc'].append(doc_id)
+                sections['postings_field'].append(field_ids[field])
+                sections['postings_tf'].append(count)
+    sections['term_postings'].append(len(sections['postings_doc']))
+
+    position = 0
+    for value in strings:
+        sections['string_offsets'].append(position)
+        position += len(value)
+    sections['string_offsets'].append(position)
+    sections['string_data'] = array('B', b''.join(strings))
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    #written next to the target and swapped in, workers mapping the old file keep a consistent view
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            table = []
+            offset = _HEADER_SIZE
+            for name in SNAPSHOT_SECTIONS:
+                size = len(sections[name]) * sections[name].itemsize
+                table.append((offset, size))
+                offset += size + (-size % 8)
+
+            f.write(SNAPSHOT_MAGIC + _BYTE_ORDER + b'\0' * 7)
+            f.write(array('Q', [value for entry in table for value in entry]).tobytes())
+            for name in SNAPSHOT_SECTIONS:
+                data = sections[name].tobytes()
+                f.write(data + b'\0' * (-len(data) % 8))
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    logger.info(f"Wrote {knowledge_type} snapshot to {path}: {len(items)} records, {len(index.postings)} terms")
+
+
+class KnowledgeSnapshot:
+    #read-only sequence of knowledge items backed by a shared mmap, items are decoded on access
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:8] != SNAPSHOT_MAGIC or self._map[8:9] != _BYTE_ORDER:
+            raise ValueError(f"{path} is not a knowledge snapshot for this platform")
+
+        view = memoryview(self._map)
+        table = view[16:_HEADER_SIZE].cast('Q')
+        for i, name in enumerate(SNAPSHOT_SECTIONS):
+            offset, size = table[2 * i], table[2 * i + 1]
+            setattr(self, name, view[offset:offset + size].cast(_typecode(name)))
+
+        self.metadata = json.loads(self.string(0))
+        self.knowledge_type = self.metadata['knowledge_type']
+        self.fields = self.metadata['fields']
+        self._index = None
+
+    def string(self, string_id):
+        return bytes(self.string_data[self.string_offsets[string_id]:self.string_offsets[string_id + 1]]).decode('utf-8')
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        return to_record(self.knowledge_type, json.loads(self.string(self.records[position])))
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def matches_source(self, source_signature):
+        return self.metadata['source_signature'] == list(source_signature)
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = SnapshotIndex(self)
+        return self._index
+
+
+class SnapshotIndex:
+    #BM25F over the prebuilt postings in the snapshot, scores match search_index.SearchIndex exactly
+    def __init__(self, snapshot, field_weights=None, k1=BM25_K1, b=BM25_B):
+        self.snapshot = snapshot
+        #doc id i is snapshot item i
+        self.documents = snapshot
+        self.doc_type = document_type(snapshot.knowledge_type)
+        field_weights = field_weights if field_weights is not None else FIELD_WEIGHTS
+        self.weights = [field_weights.get(field, DEFAULT_FIELD_WEIGHT) for field in snapshot.fields]
+        self.k1 = k1
+        self.b = b
+        self.field_count = len(snapshot.fields)
+        doc_count = len(snapshot)
+        self.averages = [(total / doc_count if doc_count else 0.0) for total in snapshot.field_totals]
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    def term_id(self, token):
+        snapshot = self.snapshot
+        terms = snapshot.terms
+        #terms are sorted, binary search by hand since bisect only takes key= from Python 3.10
+        lo, hi = 0, len(terms)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if snapshot.string(terms[mid]) < token:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(terms) and snapshot.string(terms[lo]) == token:
+            return lo
+        return None
+
+    def score(self, query_tokens):
+        snapshot = self.snapshot
+        doc_count = len(snapshot)
+        field_lengths = snapshot.field_lengths
+        scores = {}
+        for token in set(query_tokens):
+            term_id = self.term_id(token)
+            if term_id is None:
+                continue
+            doc_freq = snapshot.term_doc_freq[term_id]
+            idf = math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+            #postings are grouped by document, fold each document's fields before saturating
+            current_doc = None
+            weighted_tf = 0.0
+            for entry in range(snapshot.term_postings[term_id], snapshot.term_postings[term_id + 1]):
+                doc_id = snapshot.postings_doc[entry]
+                if doc_id != current_doc:
+                    if current_doc is not None:
+                        scores[current_doc] = scores.get(current_doc, 0.0) + idf * weighted_tf / (self.k1 + weighted_tf)
+                    current_doc = doc_id
+                    weighted_tf = 0.0
+                field = snapshot.postings_field[entry]
+                norm = 1 - self.b + self.b * field_lengths[doc_id * self.field_count + field] / self.averages[field]
+                weighted_tf += self.weights[field] * snapshot.postings_tf[entry] / norm
+            if current_doc is not None:
+                scores[current_doc] = scores.get(current_doc, 0.0) + idf * weighted_tf / (self.k1 + weighted_tf)
+
+        return scores
+
+    def top_k(self, query_tokens, k):
+        scores = self.score(query_tokens)
+        return heapq.nlargest(k, ((score, doc_id) for doc_id, score in scores.items()),
+                              key=lambda x: (x[0], -x[1]))
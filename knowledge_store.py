@@ -0,0 +1,102 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from records import as_dict
+
+logger = logging.getLogger(__name__)
+
+#one compact JSON object per line, files holding a single JSON array are still read
+_SEPARATORS = (',', ':')
+
+
+def encode_record(item):
+    return json.dumps(as_dict(item), separators=_SEPARATORS, ensure_ascii=False)
+
+
+def record_digest(item):
+    #stable across key order, used to tell which records changed since the file was written
+    canonical = json.dumps(as_dict(item), separators=_SEPARATORS, ensure_ascii=False, sort_keys=True)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).digest()
+
+
+def _is_json_array(f):
+    while True:
+        char = f.read(1)
+        if not char or not char.isspace():
+            f.seek(0)
+            return char == '['
+
+
+def iter_records(path):
+    #streams records one at a time, only legacy JSON arrays are parsed whole
+    with open(path, 'r', encoding='utf-8') as f:
+        if _is_json_array(f):
+            yield from json.load(f)
+            return
+
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                if not line.endswith('\n'):
+                    #an append cut short, the records before it are intact
+                    logger.warning(f"Ignoring incomplete last record in {path}")
+                else:
+                    logger.error(f"Skipping undecodable record at {path}:{line_number}: {e}")
+
+
+def read_records(path):
+    return list(iter_records(path))
+
+
+def write_records(path, items, json_lines=True):
+    #streams items into a temp file beside path and swaps it in, readers see the old file or the new one, never a mix
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.knowledge-')
+    count = 0
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            if not json_lines:
+                f.write('[')
+            for item in items:
+                if json_lines:
+                    f.write(encode_record(item) + '\n')
+                else:
+                    f.write((',\n' if count else '\n') + encode_record(item))
+                count += 1
+            if not json_lines:
+                f.write('\n]\n')
+            f.flush()
+            os.fsync(f.fileno())
+        #mkstemp files are private, keep the permissions the data file had
+        os.chmod(temp_path, os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return count
+
+
+def append_records(path, items):
+    #new records go on the end of a JSON Lines file in one write, without copying what is already there
+    #a crash mid-append leaves at most a torn last line, readers skip it and the next append starts on a fresh line
+    encoded = [encode_record(item) + '\n' for item in items]
+    if not encoded:
+        return 0
+    lines = ''.join(encoded)
+    with open(path, 'a+b') as f:
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                #finish a torn last line so the new records start on their own
+                lines = '\n' + lines
+        f.write(lines.encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+    return len(encoded)
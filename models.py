@@ -1,6 +1,11 @@
 from extensions import db
 
 class Interaction(db.Model):
+    __table_args__ = (
+        db.Index('idx_interaction_session_id', 'session_id'),
+        db.Index('idx_interaction_timestamp', 'timestamp'),
+    )
+
     id = db.Column(db.String(36), primary_key=True)
     session_id = db.Column(db.String(36), nullable=False)
     user_message = db.Column(db.Text, nullable=False)
@@ -9,6 +14,10 @@ class Interaction(db.Model):
     feedback = db.Column(db.String(10), nullable=True)
 
 class BiasDetection(db.Model):
+    __table_args__ = (
+        db.Index('idx_bias_detection_timestamp', 'timestamp'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     interaction_id = db.Column(db.String(36), nullable=False)
     message = db.Column(db.Text, nullable=False)
@@ -24,4 +33,20 @@ class MetricsTracker(db.Model):
     filtered_job_searches = db.Column(db.Integer, default=0)
     event_searches = db.Column(db.Integer, default=0)
     mentorship_searches = db.Column(db.Integer, default=0)
-    bias_detections = db.Column(db.Integer, default=0) #works
\ No newline at end of file
+    bias_detections = db.Column(db.Integer, default=0) #works
+
+class SessionContext(db.Model):
+    __table_args__ = (
+        db.Index('idx_session_context_updated_at', 'updated_at'),
+    )
+
+    session_id = db.Column(db.String(64), primary_key=True)
+    context = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+
+def ensure_indexes():
+    #create_all skips tables that already exist, so indexes added later are created here
+    for model in (Interaction, BiasDetection, MetricsTracker, SessionContext):
+        for index in model.__table__.indexes:
+            index.create(bind=db.engine, checkfirst=True)
@@ -0,0 +1,197 @@
+import os
+import queue
+import atexit
+import logging
+import threading
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from models import Interaction, BiasDetection, MetricsTracker
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = float(os.environ.get('PERSISTENCE_FLUSH_INTERVAL', 1.0))
+FLUSH_BATCH_SIZE = int(os.environ.get('PERSISTENCE_BATCH_SIZE', 200))
+QUEUE_MAX_SIZE = int(os.environ.get('PERSISTENCE_QUEUE_SIZE', 10000))
+WRITE_BEHIND_ENABLED = os.environ.get('PERSISTENCE_WRITE_BEHIND', 'True').lower() == 'true'
+
+METRIC_COLUMNS = ('total_interactions', 'job_searches', 'filtered_job_searches', 'event_searches',
+                  'mentorship_searches', 'bias_detections')
+
+UPSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def upsert_metrics_statement(dialect_name, metrics):
+    #INSERT ... ON CONFLICT (record_date) DO UPDATE SET col = col + excluded.col, one row per day
+    insert = UPSERT_DIALECTS.get(dialect_name)
+    if insert is None or not metrics:
+        return None
+
+    rows = [dict(totals, record_date=record_date) for record_date, totals in metrics.items()]
+    statement = insert(MetricsTracker.__table__).values(rows)
+    columns = MetricsTracker.__table__.c
+    return statement.on_conflict_do_update(
+        index_elements=[columns.record_date],
+        set_={column: func.coalesce(columns[column], 0) + statement.excluded[column]
+              for column in METRIC_COLUMNS}
+    )
+
+
+class WriteBehindQueue:
+    #chat requests enqueue rows here and a background thread writes them in batches
+    def __init__(self, app=None, flush_interval=FLUSH_INTERVAL_SECONDS, batch_size=FLUSH_BATCH_SIZE,
+                 max_size=QUEUE_MAX_SIZE, enabled=WRITE_BEHIND_ENABLED):
+        self.app = None
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.enabled = enabled
+        self.pending = queue.Queue(maxsize=max_size)
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        if not self.enabled:
+            logger.info("Write-behind persistence disabled, rows are written synchronously")
+            return
+        self._thread = threading.Thread(target=self._run, name='write-behind-flusher', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info(f"Write-behind persistence started (interval={self.flush_interval}s, batch={self.batch_size})")
+
+    def record_interaction(self, **fields):
+        self._enqueue(('interaction', fields))
+
+    def record_bias_detection(self, **fields):
+        self._enqueue(('bias_detection', fields))
+
+    def increment_metrics(self, record_date, **counts):
+        self._enqueue(('metrics', (record_date, counts)))
+
+    def _enqueue(self, item):
+        if self._thread is None:
+            self._write_batch([item])
+            return
+
+        try:
+            self.pending.put_nowait(item)
+        except queue.Full:
+            #backpressure: the request that hits a full queue pays for one flush
+            logger.warning("Write-behind queue is full, flushing inline")
+            self.flush()
+            self.pending.put(item)
+
+        if self.pending.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.pending.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        interactions = []
+        bias_detections = []
+        metrics = {}
+        for kind, payload in batch:
+            if kind == 'interaction':
+                interactions.append(payload)
+            elif kind == 'bias_detection':
+                bias_detections.append(payload)
+            else:
+                #increments for the same day are coalesced so each day row is written once per batch
+                record_date, counts = payload
+                totals = metrics.setdefault(record_date, dict.fromkeys(METRIC_COLUMNS, 0))
+                for column, amount in counts.items():
+                    totals[column] += amount
+
+        with self.app.app_context():
+            error = self._commit(lambda: self._write_all(interactions, bias_detections, metrics))
+            if error is None:
+                logger.debug(f"Flushed {len(interactions)} interactions, {len(bias_detections)} bias detections, "
+                             f"{len(metrics)} metric rows")
+                return
+
+            #one bad row fails the whole transaction, retry row by row so only the bad rows are lost
+            logger.warning(f"Error flushing {len(batch)} queued writes, retrying row by row: {error}")
+            dropped = {}
+            for kind, model, rows in (('interactions', Interaction, interactions),
+                                      ('bias detections', BiasDetection, bias_detections)):
+                for row in rows:
+                    if self._commit(lambda: db.session.bulk_insert_mappings(model, [row])) is not None:
+                        dropped[kind] = dropped.get(kind, 0) + 1
+            for record_date, totals in metrics.items():
+                if self._commit(lambda: self._apply_metrics({record_date: totals})) is not None:
+                    dropped['metric rows'] = dropped.get('metric rows', 0) + 1
+
+            if dropped:
+                logger.error("Dropped queued writes that failed on their own: "
+                             + ', '.join(f"{count} {kind}" for kind, count in dropped.items()))
+
+    def _write_all(self, interactions, bias_detections, metrics):
+        if interactions:
+            db.session.bulk_insert_mappings(Interaction, interactions)
+        if bias_detections:
+            db.session.bulk_insert_mappings(BiasDetection, bias_detections)
+        if metrics:
+            self._apply_metrics(metrics)
+
+    def _commit(self, write):
+        #None on success, otherwise the error after rolling back
+        try:
+            write()
+            db.session.commit()
+            return None
+        except Exception as e:
+            db.session.rollback()
+            return e
+
+    def _apply_metrics(self, metrics):
+        #atomic in the database, so concurrent workers flushing the same day never lose increments
+        statement = upsert_metrics_statement(db.engine.dialect.name, metrics)
+        if statement is not None:
+            db.session.execute(statement)
+            return
+
+        existing = {row.record_date: row for row in
+                    MetricsTracker.query.filter(MetricsTracker.record_date.in_(list(metrics))).all()}
+        for record_date, totals in metrics.items():
+            row = existing.get(record_date)
+            if row is None:
+                db.session.add(MetricsTracker(record_date=record_date, **totals))
+                continue
+            for column, amount in totals.items():
+                if amount:
+                    setattr(row, column, (getattr(row, column) or 0) + amount)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout=max(self.flush_interval * 2, 5))
+        self._thread = None
+        #drain whatever arrived after the last periodic flush
+        self.flush()
+        logger.info("Write-behind persistence drained and stopped")
+
+
+write_behind = WriteBehindQueue()
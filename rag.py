@@ -1,18 +1,39 @@
 import os 
 import logging
-import re
 import datetime
+import heapq
+import threading
+from collections import OrderedDict, deque
+from search_index import SearchIndex, tokenize, document_type
+from vector_search import TfidfIndex, VECTOR_BACKEND_AVAILABLE
+from knowledge_base import (DATA_DIR, KNOWLEDGE_FILES, knowledge_file_path, load_knowledge, diff_knowledge,
+                            knowledge_file_signature, read_knowledge_deltas)
+from knowledge_snapshot import KnowledgeSnapshot, write_snapshot
+from records import SearchHit, to_record, as_dict
+from response_cache import bump_knowledge_version
+from intent import classify_intent
 
 logger = logging.getLogger(__name__)
 
-user_sessions = {}
+#ordered by last activity, oldest first, so expiry and the LRU cap only ever pop from the front
+user_sessions = OrderedDict()
+user_sessions_lock = threading.RLock()
 SESSION_TIMEOUT_SECONDS = 1800
+MAX_USER_SESSIONS = int(os.environ.get('MAX_USER_SESSIONS', 10000))
+MAX_SESSION_HISTORY = int(os.environ.get('MAX_SESSION_HISTORY', 20))
+search_indexes = {}
+index_lock = threading.RLock()
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'bm25').lower()
+SNAPSHOT_DIR = os.environ.get('KNOWLEDGE_SNAPSHOT_DIR', os.path.join(DATA_DIR, 'snapshots'))
+#(inode, mtime_ns, size) of each knowledge file as last loaded by this process
+knowledge_signatures = {}
+knowledge_reload_lock = threading.Lock()
 
 
 def enhance_query_with_context(query, conversation_history, max_history=3):
     if not conversation_history:
         return query
-    recent_exchanges = conversation_history[-max_history:]
+    recent_exchanges = list(conversation_history)[-max_history:]
     context_text = " ".join([f"{exchange.get('query', '')}" for exchange in recent_exchanges])
     enhanced_query = f"{query} {context_text}"
     logger.debug(f"Enhanced query: '{query}' -> '{enhanced_query}'")
@@ -21,27 +42,33 @@ def enhance_query_with_context(query, conversation_history, max_history=3):
 
 def get_or_create_user_session(session_id):
     current_time = datetime.datetime.now()
-    clean_expired_sessions()
-    if session_id not in user_sessions:
-        user_sessions[session_id] = {
-            'conversation_history': [],
-            'last_activity': current_time
-        }
-    else:
-        user_sessions[session_id]['last_activity'] = current_time
-    return user_sessions[session_id]
+    with user_sessions_lock:
+        clean_expired_sessions(current_time)
+        session = user_sessions.get(session_id)
+        if session is None:
+            session = user_sessions[session_id] = {
+                'conversation_history': deque(maxlen=MAX_SESSION_HISTORY),
+                'last_activity': current_time
+            }
+            while len(user_sessions) > MAX_USER_SESSIONS:
+                evicted_id, _ = user_sessions.popitem(last=False)
+                logger.info(f"Session evicted (max {MAX_USER_SESSIONS} sessions): {evicted_id}")
+        else:
+            session['last_activity'] = current_time
+            user_sessions.move_to_end(session_id)
+        return session
 
 
-def clean_expired_sessions():
-    now = datetime.datetime.now()
-    expired_sessions = []
-    for session_id, session in user_sessions.items():
-        last_activity = session['last_activity']
-        if (now - last_activity).total_seconds() > SESSION_TIMEOUT_SECONDS:
-            expired_sessions.append(session_id)
-    for session_id in expired_sessions:
-        del user_sessions[session_id]
-        logger.info(f"Session expired and deleted: {session_id}")
+def clean_expired_sessions(now=None):
+    #amortized O(expired): stops at the first session that is still active
+    now = now or datetime.datetime.now()
+    with user_sessions_lock:
+        while user_sessions:
+            session_id, session = next(iter(user_sessions.items()))
+            if (now - session['last_activity']).total_seconds() <= SESSION_TIMEOUT_SECONDS:
+                break
+            del user_sessions[session_id]
+            logger.info(f"Session expired and deleted: {session_id}")
 
 
 def update_conversation_history(session_id, query):
@@ -53,77 +80,296 @@ def update_conversation_history(session_id, query):
     return session['conversation_history']
 
 
-def semantic_search(query, knowledge_base, session_id=None, top_k=5):
+def contextual_query(query, session_id=None, history_query=None):
+    #records the turn in the session history and returns the history-enhanced search query
+    if not session_id:
+        return query
+    #history keeps the raw message so context additions don't compound across turns
+    conversation_history = update_conversation_history(session_id, history_query or query)
+    return enhance_query_with_context(query, conversation_history)
+
+
+def build_search_index(knowledge_type, items, backend=None):
+    backend = backend or SEARCH_BACKEND
+    if backend == 'tfidf':
+        if VECTOR_BACKEND_AVAILABLE:
+            return TfidfIndex(knowledge_type, items)
+        logger.warning("TF-IDF backend requested but numpy/scipy are not installed, falling back to BM25")
+
+    index = SearchIndex(doc_type=document_type(knowledge_type))
+    for item in items:
+        _index_item(index, knowledge_type, item)
+    logger.info(f"Built search index for {knowledge_type}: {len(index)} documents, {len(index.postings)} terms")
+    return index
+
+
+def _index_item(index, knowledge_type, item):
+    #the index holds the record itself, the document type lives on the index
+    index.add_document(item, _get_document_fields(item, document_type(knowledge_type)), key=item.get('id'))
+
+
+def get_search_index(knowledge_type, items, backend=None):
+    #one cached index per knowledge type, rebuilt only when a different list is passed in
+    backend = backend or SEARCH_BACKEND
+    if isinstance(items, KnowledgeSnapshot) and backend != 'tfidf':
+        return items.index
+    with index_lock:
+        cached = search_indexes.get((knowledge_type, backend))
+        if cached and cached[0] is items and cached[1] == len(items):
+            return cached[2]
+        index = build_search_index(knowledge_type, items, backend)
+        search_indexes[(knowledge_type, backend)] = (items, len(items), index)
+        return index
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def build_knowledge_snapshot(knowledge_type, items, source_signature=None):
+    path = os.path.join(SNAPSHOT_DIR, f"{knowledge_type}.snapshot")
+    write_snapshot(path, knowledge_type, items, build_search_index(knowledge_type, items, 'bm25'),
+                   source_signature)
+    return KnowledgeSnapshot(path)
+
+
+def _load_knowledge_snapshot(knowledge_type):
+    source_path = knowledge_file_path(knowledge_type)
+    snapshot_path = os.path.join(SNAPSHOT_DIR, f"{knowledge_type}.snapshot")
+    source_signature = _source_signature(source_path) if os.path.exists(source_path) else (0, 0)
+    try:
+        if os.path.exists(snapshot_path):
+            snapshot = KnowledgeSnapshot(snapshot_path)
+            if snapshot.matches_source(source_signature):
+                logger.info(f"Mapped {knowledge_type} snapshot: {len(snapshot)} records")
+                return snapshot
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable {knowledge_type} snapshot: {e}")
+
+    items = load_knowledge(knowledge_type)
+    try:
+        return build_knowledge_snapshot(knowledge_type, items, source_signature)
+    except Exception as e:
+        logger.error(f"Error building {knowledge_type} snapshot, using parsed items: {e}")
+        return items
+
+
+def load_knowledge_snapshots():
+    #workers map the same snapshot file read-only, the JSON is only parsed when the snapshot is stale
+    return {knowledge_type: _load_knowledge_snapshot(knowledge_type) for knowledge_type in KNOWLEDGE_FILES}
+
+
+def mark_knowledge_current(knowledge_type=None):
+    #records the files as loaded, called before the initial load
+    for name in ([knowledge_type] if knowledge_type else KNOWLEDGE_FILES):
+        knowledge_signatures[name] = knowledge_file_signature(name)
+
+
+def apply_file_delta(knowledge_base, knowledge_type, items, delta):
+    #delta as emitted by the writer, with the file signatures before ('from') and after ('to') its write
+    #False when this process is not at 'from', the caller then follows the file through reload_changed_knowledge
+    with knowledge_reload_lock:
+        if delta.get('from') is None or tuple(delta['from']) != knowledge_signatures.get(knowledge_type):
+            return False
+        apply_knowledge_delta(knowledge_base, knowledge_type, items, delta)
+        knowledge_signatures[knowledge_type] = tuple(delta['to']) if delta.get('to') else None
+        return True
+
+
+def reload_changed_knowledge(knowledge_base):
+    #the scheduler runs in one process only, every other worker picks its writes up from the file signature
+    reloaded = []
+    for knowledge_type in KNOWLEDGE_FILES:
+        signature = knowledge_file_signature(knowledge_type)
+        if signature == knowledge_signatures.get(knowledge_type):
+            continue
+        with knowledge_reload_lock:
+            if signature == knowledge_signatures.get(knowledge_type):
+                continue
+            current = knowledge_base.get(knowledge_type)
+            if isinstance(current, KnowledgeSnapshot):
+                #the writing process rebuilt the snapshot, map it rather than building another
+                snapshot = _load_knowledge_snapshot(knowledge_type)
+                with index_lock:
+                    knowledge_base[knowledge_type] = snapshot
+                    for key in [key for key in search_indexes if key[0] == knowledge_type]:
+                        del search_indexes[key]
+                bump_knowledge_version(f"after {knowledge_type} reload")
+            else:
+                #the writer logs each delta with its records, so the catalogue is only re-read when the log has a gap
+                chain = read_knowledge_deltas(knowledge_type, knowledge_signatures.get(knowledge_type), signature)
+                if chain is not None:
+                    for entry in chain:
+                        apply_knowledge_delta(knowledge_base, knowledge_type, entry['records'], entry)
+                    logger.info(f"Applied {len(chain)} logged {knowledge_type} deltas from another process")
+                else:
+                    items = load_knowledge(knowledge_type)
+                    delta = diff_knowledge([as_dict(item) for item in current or []], items)
+                    if delta['added'] or delta['removed'] or delta['changed']:
+                        apply_knowledge_delta(knowledge_base, knowledge_type, items, delta)
+                    logger.info(f"Reloaded {knowledge_type} after the knowledge file changed on disk")
+            knowledge_signatures[knowledge_type] = signature
+            reloaded.append(knowledge_type)
+    return reloaded
+
+
+def apply_knowledge_delta(knowledge_base, knowledge_type, items, delta):
+    #delta is {'added': [ids], 'removed': [ids], 'changed': [ids]} against the new items list
+    items_by_id = {item.get('id'): item for item in items}
+    stale_ids = set(delta.get('removed', [])) | set(delta.get('changed', []))
+    fresh_items = [to_record(knowledge_type, items_by_id[item_id]) for item_id in delta.get('changed', []) + delta.get('added', [])
+                   if item_id in items_by_id]
+
+    current = knowledge_base.get(knowledge_type)
+    if isinstance(current, KnowledgeSnapshot):
+        #snapshots are immutable, so a delta costs a full rebuild (re-index and rewrite), batch changes into one call
+        #built outside index_lock so searches keep using the old snapshot until the swap
+        #workers following the file through reload_changed_knowledge map the rebuilt snapshot instead
+        source_path = knowledge_file_path(knowledge_type) if knowledge_type in KNOWLEDGE_FILES else None
+        source_signature = _source_signature(source_path) if source_path and os.path.isfile(source_path) else None
+        merged = [item for item in current if item.get('id') not in stale_ids] + fresh_items
+        snapshot = build_knowledge_snapshot(knowledge_type, merged, source_signature)
+        with index_lock:
+            knowledge_base[knowledge_type] = snapshot
+            for key in [key for key in search_indexes if key[0] == knowledge_type]:
+                del search_indexes[key]
+        bump_knowledge_version(f"after {knowledge_type} delta")
+        logger.info(f"Rebuilt {knowledge_type} snapshot after delta")
+        return
+
+    with index_lock:
+        current = knowledge_base.setdefault(knowledge_type, [])
+        #mutate in place so the cached index stays tied to the same list
+        if stale_ids:
+            current[:] = [item for item in current if item.get('id') not in stale_ids]
+        current.extend(fresh_items)
+
+        for key, (cached_items, _, index) in list(search_indexes.items()):
+            if key[0] != knowledge_type or cached_items is not current:
+                continue
+            if isinstance(index, SearchIndex):
+                for item_id in stale_ids:
+                    index.remove_by_key(item_id)
+                for item in fresh_items:
+                    _index_item(index, knowledge_type, item)
+                search_indexes[key] = (current, len(current), index)
+            else:
+                #the TF-IDF matrix is not updatable in place, rebuild it on next use
+                del search_indexes[key]
+
+    bump_knowledge_version(f"after {knowledge_type} delta")
+    logger.info(f"Applied {knowledge_type} delta: {len(delta.get('added', []))} added, "
+                f"{len(delta.get('changed', []))} changed, {len(delta.get('removed', []))} removed")
+
+
+def _merge_hits(hits_per_index, top_k):
+    scored = []
+    for type_rank, (index, hits) in enumerate(hits_per_index):
+        for score, doc_id in hits:
+            scored.append((score, -type_rank, -doc_id, index))
+
+    #partial selection instead of a full sort, ties keep catalogue order
+    top_results = heapq.nlargest(top_k, scored, key=lambda x: x[:3])
+
+    #(record, score) hits referencing the indexed records, nothing is copied per request
+    return [SearchHit(index.documents[-neg_doc_id], similarity, index.doc_type)
+            for similarity, _, neg_doc_id, index in top_results]
+
+
+def semantic_search(query, knowledge_base, session_id=None, top_k=5, history_query=None):
     try:
         logger.debug(f"RAG search query: {query}")
         logger.debug(f"Knowledge base keys: {knowledge_base.keys()}")
 
-        conversation_history = []
-        if session_id:
-            conversation_history = update_conversation_history(session_id, query)
-
-        if conversation_history:
-            enhanced_query = enhance_query_with_context(query, conversation_history)
-        else:
-            enhanced_query = query
-
-        all_documents = []
-        for knowledge_type, items in knowledge_base.items():
-            logger.debug(f"Processing knowledge type: {knowledge_type} with {len(items)} items")
-
-            for item in items:
-                item_with_type = item.copy()
-                if knowledge_type == 'events':
-                    item_with_type['type'] = 'event'
-                elif knowledge_type == 'jobs':
-                    item_with_type['type'] = 'job'
-                else:
-                    item_with_type['type'] = knowledge_type
-                all_documents.append(item_with_type)
+        enhanced_query = contextual_query(query, session_id, history_query)
 
-        logger.debug(f"All documents: {len(all_documents)}")
-        logger.debug(f"Document types: {set(item.get('type', 'unknown') for item in all_documents)}")
+        indexes = [(knowledge_type, get_search_index(knowledge_type, items))
+                   for knowledge_type, items in knowledge_base.items()]
 
-        if not all_documents:
+        if not any(len(index) for _, index in indexes):
             logger.warning("No documents in knowledge base for search")
             return []
 
-        query_keywords = set(re.findall(r'\b\w+\b', enhanced_query.lower()))
-
-        results = []
-        for doc in all_documents:
-            doc_text = _get_document_text(doc)
-            doc_keywords = set(re.findall(r'\b\w+\b', doc_text.lower()))
-            matches = len(query_keywords.intersection(doc_keywords))
+        query_tokens = tokenize(enhanced_query)
+        with index_lock:
+            results = _merge_hits([(index, index.top_k(query_tokens, top_k)) for _, index in indexes], top_k)
 
-            if matches > 0:
-                doc_with_score = doc.copy()
-                doc_with_score['similarity'] = matches / len(query_keywords) if query_keywords else 0
-                results.append(doc_with_score)
-
-        results.sort(key=lambda x: x.get('similarity', 0), reverse=True)
         logger.debug(f"Search results count: {len(results)}")
-        logger.debug(f"Result types: {[r.get('type', 'unknown') for r in results[:top_k]]}")
-        return results[:top_k]
+        logger.debug(f"Result types: {[r.get('type', 'unknown') for r in results]}")
+        return results
 
     except Exception as e:
         logger.error(f"Error in keyword search: {e}")
         return []
 
 
-def _get_document_text(doc):
-    doc_type = doc.get('type', 'unknown')
+def batch_semantic_search(queries, knowledge_base, top_k=5, backend=None):
+    try:
+        indexes = [get_search_index(knowledge_type, items, backend)
+                   for knowledge_type, items in knowledge_base.items()]
+        queries_tokens = [tokenize(query) for query in queries]
+
+        hits_per_index = []
+        with index_lock:
+            for index in indexes:
+                if hasattr(index, 'top_k_batch'):
+                    hits_per_index.append(index.top_k_batch(queries_tokens, top_k))
+                else:
+                    hits_per_index.append([index.top_k(tokens, top_k) for tokens in queries_tokens])
+
+            return [
+                _merge_hits([(index, hits[i]) for index, hits in zip(indexes, hits_per_index)], top_k)
+                for i in range(len(queries))
+            ]
+
+    except Exception as e:
+        logger.error(f"Error in batch keyword search: {e}")
+        return [[] for _ in queries]
+
+
+def _get_document_fields(doc, doc_type=None):
+    doc_type = doc_type or doc.get('type', 'unknown')
 
     if doc_type == 'job':
-        return f"Job: {doc.get('title', '')}. Company: {doc.get('company', '')}. Description: {doc.get('description', '')}. Location: {doc.get('location', '')}. Requirements: {doc.get('requirements', '')}"
+        skills = doc.get('skills', '')
+        if isinstance(skills, list):
+            skills = ' '.join(skills)
+        return {
+            'type': doc_type,
+            'title': doc.get('title', ''),
+            'company': doc.get('company', ''),
+            'skills': skills,
+            'description': doc.get('description', ''),
+            'location': doc.get('location', ''),
+            'requirements': doc.get('requirements', ''),
+        }
     elif doc_type == 'event':
-        return f"Event: {doc.get('title', '')}. Description: {doc.get('description', '')}. Date: {doc.get('date', '')}. Location: {doc.get('location', '')}"
+        return {
+            'type': doc_type,
+            'title': doc.get('title', ''),
+            'description': doc.get('description', ''),
+            'date': doc.get('date', ''),
+            'location': doc.get('location', ''),
+        }
     elif doc_type == 'mentorship':
-        return f"Mentorship: {doc.get('title', '')}. Mentor: {doc.get('mentor', '')}. Description: {doc.get('description', '')}. Expertise: {doc.get('expertise', '')}"
+        return {
+            'type': doc_type,
+            'title': doc.get('title', ''),
+            'mentor': doc.get('mentor', ''),
+            'description': doc.get('description', ''),
+            'expertise': doc.get('expertise', ''),
+        }
     elif doc_type == 'session':
-        return f"Session: {doc.get('title', '')}. Description: {doc.get('description', '')}. Date: {doc.get('date', '')}. Time: {doc.get('time', '')}"
+        return {
+            'type': doc_type,
+            'title': doc.get('title', ''),
+            'description': doc.get('description', ''),
+            'date': doc.get('date', ''),
+            'time': doc.get('time', ''),
+        }
     else:
-        return " ".join([f"{k}: {v}" for k, v in doc.items() if isinstance(v, str)]) #works
+        return {k: v for k, v in doc.items() if isinstance(v, str)}
 
 def generate_response(user_message, results, response_type):
         standard_response = ""
@@ -133,7 +379,7 @@ def generate_response(user_message, results, response_type):
             if job_listings:
                 standard_response = "Found some matching opportunities:\n\n"
                 for i, job in enumerate(job_listings[:3], 1):
-                    standard_response += f"{i}. {job.get('title', 'Position')} at {job.get('company', 'Company')} ({job.get('work_type', 'Unknown')}, {job.get('job_type', 'Unknown')}) • {job.get('experience', 'Unknown')} experience\n"
+                    standard_response += f"{i}. {job.get('title', 'Position')} at {job.get('company', 'Company')} ({job.get('work_mode', 'Unknown')}, {job.get('job_type', 'Unknown')}) • {job.get('experience', 'Unknown')} experience\n"
                     standard_response += f"Location: {job.get('location', 'Unknown')}\n"
                     standard_response += f"Skills: {', '.join(job.get('skills', ['Various skills']))}\n"
                     standard_response += f"Summary: {job.get('description', 'No description available')[:150]}...\n\n"
@@ -174,6 +420,7 @@ def generate_response(user_message, results, response_type):
             signup_encouragement = "\n\nBefore you go, <signup_trigger>create your HerKey profile</signup_trigger> to unlock personalized career resources and opportunities!"
         return standard_response + signup_encouragement
 
-def process_signup_trigger(user_message):
-    trigger_keywords = ['sign up', 'register', 'create account', 'create profile']
-    return any(keyword in user_message.lower() for keyword in trigger_keywords)
+def process_signup_trigger(user_message, intent=None):
+    if intent is None:
+        intent = classify_intent(user_message)
+    return intent['is_signup']
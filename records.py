@@ -0,0 +1,157 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class Record:
+    #immutable __slots__ record with the read-only dict API the formatters use (get, [], in, keys, iteration, len)
+    __slots__ = ('_extra',)
+    FIELDS = ()
+
+    def __init__(self, **values):
+        extra = None
+        for field in self.FIELDS:
+            object.__setattr__(self, field, values.pop(field, _MISSING))
+        if values:
+            #fields outside the schema are kept so to_dict() round-trips the source record
+            extra = values
+        object.__setattr__(self, '_extra', extra)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} records are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} records are immutable")
+
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def keys(self):
+        keys = [field for field in self.FIELDS if getattr(self, field) is not _MISSING]
+        if self._extra is not None:
+            keys.extend(self._extra)
+        return keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={self.get('id')!r}, title={self.get('title')!r})"
+
+
+class Job(Record):
+    FIELDS = ('id', 'title', 'company', 'location', 'work_mode', 'job_type', 'experience', 'skills',
+              'description', 'requirements', 'date_posted', 'type')
+    __slots__ = FIELDS
+
+
+class Event(Record):
+    FIELDS = ('id', 'title', 'date', 'date_iso', 'location', 'organizer', 'type', 'event_type', 'description',
+              'registration_required', 'registration_url', 'url', 'image')
+    __slots__ = FIELDS
+
+
+RECORD_TYPES = {'jobs': Job, 'events': Event}
+
+
+def to_record(knowledge_type, item):
+    record_type = RECORD_TYPES.get(knowledge_type)
+    if record_type is None or isinstance(item, Record) or not isinstance(item, dict):
+        return item
+    return record_type.from_dict(item)
+
+
+def as_dict(item):
+    return item.to_dict() if isinstance(item, Record) else item
+
+
+class SearchHit:
+    #a (record, score) pair, reads fall through to the record so hits format like the old copied dicts
+    __slots__ = ('record', 'score', 'doc_type')
+
+    def __init__(self, record, score, doc_type):
+        self.record = record
+        self.score = score
+        self.doc_type = doc_type
+
+    def __iter__(self):
+        yield self.record
+        yield self.score
+
+    def get(self, key, default=None):
+        if key == 'similarity':
+            return self.score
+        if key == 'type':
+            return self.doc_type
+        return self.record.get(key, default)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return key in ('similarity', 'type') or key in self.record
+
+    def keys(self):
+        return list(dict.fromkeys(list(self.record.keys()) + ['type', 'similarity']))
+
+    def to_dict(self):
+        data = dict(as_dict(self.record))
+        data['type'] = self.doc_type
+        data['similarity'] = self.score
+        return data
+
+    def __eq__(self, other):
+        if isinstance(other, SearchHit):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"SearchHit({self.record!r}, score={self.score:.4f})"
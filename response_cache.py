@@ -0,0 +1,73 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE', 'True').lower() == 'true'
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 2048))
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get('RESPONSE_CACHE_TTL', 300))
+
+
+def normalize_message(message):
+    return ' '.join((message or '').lower().split())
+
+
+class ResponseCache:
+    #bounded LRU with a TTL per entry, cached values are shared and must be treated as read-only
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+                 enabled=RESPONSE_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.enabled = enabled
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+response_cache = ResponseCache()
+
+_knowledge_version = {'value': 0}
+_version_lock = threading.Lock()
+
+
+def knowledge_version():
+    return _knowledge_version['value']
+
+
+def bump_knowledge_version(reason=''):
+    #any change to the knowledge base makes every cached answer stale
+    with _version_lock:
+        _knowledge_version['value'] += 1
+    response_cache.clear()
+    logger.info(f"Knowledge base version {_knowledge_version['value']}, response cache cleared {reason}".strip())
@@ -3,31 +3,84 @@ import os
 import time
 import json
 import threading
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit
 import requests
 
-from knowledge_base import load_all_knowledge, update_knowledge_file
-from scraper import scrape_job_listings
+from knowledge_base import (load_all_knowledge, update_knowledge_file, append_knowledge_records, diff_knowledge,
+                            knowledge_file_signature, log_knowledge_delta)
+from records import as_dict
+from scraper import scrape_job_sources
+from dedup import remove_near_duplicates
 
 logger = logging.getLogger(__name__)
 
 UPDATE_INTERVAL = 24 * 60 * 60  # 24 hours in seconds
+#scraped listings not seen for this long are dropped, 0 keeps everything
+JOB_MAX_AGE_DAYS = int(os.environ.get('JOB_MAX_AGE_DAYS', 45))
+#only the process holding this lock runs the scheduler, every gunicorn worker imports app.py
+SCHEDULER_LOCK_FILE = os.environ.get('SCHEDULER_LOCK_FILE', os.path.join('data', '.scheduler.lock'))
 SOURCES = {'jobs': ['https://www.jobsforher.com/jobs'],
     'events': ['https://www.jobsforher.com/events'],}
 
+job_update_listeners = []
+_scheduler_lock = {'file': None}
+
+
+def register_job_update_listener(listener):
+    #listener(delta, jobs) is called after every successful refresh, delta holds the added/removed/changed ids
+    #and the file signatures before ('from') and after ('to') the write
+    job_update_listeners.append(listener)
+
+
+def _notify_job_update_listeners(delta, jobs):
+    for listener in job_update_listeners:
+        try:
+            listener(delta, jobs)
+        except Exception as e:
+            logger.error(f"Error in job update listener {listener}: {e}")
+
+
+def _host(url):
+    return urlsplit(url).netloc.lower()
+
+
+def _expire_stale_jobs(jobs, live_job_ids, crawled_sources, max_age_days=JOB_MAX_AGE_DAYS, today=None):
+    #only scraped listings (those with a url) expire, and only once they have stopped showing up at the source
+    #a listing is only judged gone when its host was crawled in full this run, a failed or partial crawl proves nothing
+    crawled_hosts = {_host(url) for url in crawled_sources}
+    if max_age_days <= 0 or not crawled_hosts:
+        return jobs
+    cutoff = ((today or datetime.now()) - timedelta(days=max_age_days)).strftime("%Y-%m-%d")
+
+    kept = []
+    for job in jobs:
+        posted = job.get('date_posted') or ''
+        url = job.get('url')
+        if (url and job.get('id') not in live_job_ids and _host(url) in crawled_hosts
+                and posted and posted < cutoff):
+            continue
+        kept.append(job)
+
+    if len(kept) < len(jobs):
+        logger.info(f"Expired {len(jobs) - len(kept)} job listings posted before {cutoff}")
+    return kept
+
+
 def update_job_listings():
     try:
         logger.info("Starting job listings update")
-        all_jobs = []
-
-        for source_url in SOURCES.get('jobs', []):
-            jobs = scrape_job_listings(source_url)
-            if jobs:
-                all_jobs.extend(jobs)
-                logger.info(f"Scraped {len(jobs)} jobs from {source_url}")
+        crawled_sources = set()
+        all_jobs = scrape_job_sources(SOURCES.get('jobs', []), crawled_sources=crawled_sources)
+        logger.info(f"Scraped {len(all_jobs)} jobs from {len(SOURCES.get('jobs', []))} sources")
 
         existing_knowledge = load_all_knowledge()
-        existing_jobs = existing_knowledge.get('jobs', [])
+        existing_jobs = [as_dict(job) for job in existing_knowledge.get('jobs', [])]
+        previous_jobs = [dict(job) for job in existing_jobs]
 
         seen_job_ids = set(job.get('id') for job in existing_jobs if 'id' in job)
 
@@ -37,10 +90,35 @@ def update_job_listings():
                 existing_jobs.append(job)
                 seen_job_ids.add(job_id)
 
-        if update_knowledge_file('jobs', existing_jobs):
+        existing_jobs, duplicate_of = remove_near_duplicates(existing_jobs)
+        #a listing scraped again under another id or url still counts as live through the copy that was kept
+        live_job_ids = {job.get('id') for job in all_jobs if job.get('url')}
+        live_job_ids.update(duplicate_of[job_id] for job_id in list(live_job_ids) if job_id in duplicate_of)
+        existing_jobs = _expire_stale_jobs(existing_jobs, live_job_ids, crawled_sources)
+
+        delta = diff_knowledge(previous_jobs, existing_jobs)
+        if not (delta['added'] or delta['removed']):
+            #unchanged jobs keep their ids across runs, so nothing new means no rewrite and no re-index
+            logger.info("No new or expired jobs, job listings left unchanged")
+            return
+
+        from_signature = knowledge_file_signature('jobs')
+        if delta['removed']:
+            success, error = update_knowledge_file('jobs', existing_jobs)
+        else:
+            #additions only, so the new records are appended instead of rewriting the catalogue
+            added_ids = set(delta['added'])
+            success, error = append_knowledge_records('jobs', [job for job in existing_jobs if job.get('id') in added_ids])
+        if success:
             logger.info(f"Updated job listings with {len(existing_jobs)} jobs")
+            #diff after the write so the delta reflects the sanitized records on disk
+            delta = diff_knowledge(previous_jobs, existing_jobs)
+            if delta['added'] or delta['removed'] or delta['changed']:
+                #logged for the other workers, which patch their index from it instead of re-reading the catalogue
+                entry = log_knowledge_delta('jobs', from_signature, delta, existing_jobs)
+                _notify_job_update_listeners(dict(delta, **{'from': entry['from'], 'to': entry['to']}), existing_jobs)
         else:
-            logger.error("Failed to update job listings file")
+            logger.error(f"Failed to update job listings file: {error}")
 
     except Exception as e:
         logger.error(f"Error updating job listings: {e}")
@@ -58,7 +136,28 @@ def update_knowledge_base():
         logger.error(f"Error in knowledge base update: {e}")
 
 
+def _acquire_scheduler_lock(path=SCHEDULER_LOCK_FILE):
+    #non-blocking flock, held for the life of the process and released by the OS when it exits
+    if _scheduler_lock['file'] is not None:
+        return True
+    if fcntl is None:
+        logger.warning("fcntl is not available, starting the scheduler without electing a single process")
+        return True
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    lock_file = open(path, 'a')
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _scheduler_lock['file'] = lock_file
+    return True
+
+
 def start_scheduler():
+    if not _acquire_scheduler_lock():
+        logger.info(f"Scheduler already running in another process (lock held on {SCHEDULER_LOCK_FILE})")
+        return False
 
     def scheduler_thread():
         while True:
@@ -77,6 +176,7 @@ def start_scheduler():
     scheduler = threading.Thread(target=scheduler_thread, daemon=True)
     scheduler.start()
     logger.info("Scheduler started in background thread")
+    return True
 
 
 if __name__ == "__main__":
@@ -84,5 +184,6 @@ if __name__ == "__main__":
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
 
     update_knowledge_base()#done
\ No newline at end of file
@@ -1,86 +1,84 @@
 import logging
-import requests
 import random
-import uuid
 import json
 import re
 import os
 from datetime import datetime, timedelta
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from fetcher import fetcher, SCRAPER_MAX_PAGES
+from fetch_state import FetchState, content_hash, SCRAPER_CONDITIONAL
+from extraction import get_extractor, HTML_PARSER
+from dedup import stable_job_id
+from knowledge_store import write_records
 
 logger = logging.getLogger(__name__)
 
-USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+#fields that vary between scrapes of the same listing, left out of the job content hash
+VOLATILE_JOB_FIELDS = ("id", "date_posted")
 
 
 def get_soup(url):
-    try:
-        headers = {
-            "User-Agent": USER_AGENT,
-            "Accept": "text/html,application/xhtml+xml,application/xml",
-            "Accept-Language": "en-US,en;q=0.9",
-        }
-
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-
-        return BeautifulSoup(response.text, "html.parser")
-
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error fetching URL {url}: {e}")
+    response = fetcher.fetch(url)
+    if response is None:
         return None
 
+    try:
+        return BeautifulSoup(response.text, HTML_PARSER)
+
     except Exception as e:
         logger.error(f"Error parsing URL {url}: {e}")
         return None
 
 
-def scrape_job_listings(url):
+def _job_from_card(values, url):
+    return {
+        "id": stable_job_id(values["link"], values["title"], values["company"], values["location"]),
+        "title": values["title"] or "Position",
+        "company": values["company"] or "Company",
+        "location": values["location"] or "Various Locations",
+        "description": values["description"] or "No description provided.",
+        "requirements": "Please check the job listing for detailed requirements.",
+        "url": values["link"] or url,
+        "date_posted": datetime.now().strftime("%Y-%m-%d"),
+        "type": "job"
+    }
+
+
+def job_content_hash(job):
+    return content_hash(json.dumps({key: value for key, value in job.items() if key not in VOLATILE_JOB_FIELDS},
+                                   sort_keys=True))
+
+
+def _reuse_unchanged_jobs(jobs, previous_jobs):
+    #a job that hashes the same as last time keeps its previous record, so the merge sees no change to re-index
+    previous_by_hash = {job_content_hash(job): job for job in previous_jobs}
+    return [previous_by_hash.get(job_content_hash(job), job) for job in jobs]
+
+
+def _parse_job_page(response, previous_jobs=()):
     try:
-        logger.info(f"Scraping job listings from {url}")
+        cards, next_url = get_extractor("jobs", response.url).extract(response.text, response.url)
+    except Exception as e:
+        logger.error(f"Error parsing URL {response.url}: {e}")
+        return [], None
+    jobs = [_job_from_card(values, response.url) for values in cards]
+    return _reuse_unchanged_jobs(jobs, previous_jobs), next_url
 
-        soup = get_soup(url)
-        if not soup:
-            logger.warning(f"Failed to get page content from {url}, using fallback data")
-            return _get_fallback_job_data()
 
-        job_listings = []
-        job_elements = soup.select(".job-card, .job-listing, .job-item, article.job")
+def crawl_job_listings(url, max_pages=SCRAPER_MAX_PAGES, state=None, failed_urls=None):
+    #every page of one listing, empty when nothing could be fetched or parsed
+    logger.info(f"Scraping job listings from {url}")
+    job_listings = fetcher.crawl(url, _parse_job_page, max_pages=max_pages, state=state, failed_urls=failed_urls)
+    logger.info(f"Scraped {len(job_listings)} jobs from {url}")
+    return job_listings
 
-        if not job_elements:
-            logger.warning(f"No job elements found at {url}, using fallback data")
-            return _get_fallback_job_data()
 
-        for job_elem in job_elements:
-            try:
-                title_elem = job_elem.select_one(".job-title, h2, h3")
-                company_elem = job_elem.select_one(".company-name, .company")
-                location_elem = job_elem.select_one(".location, .job-location")
-                description_elem = job_elem.select_one(".description, .job-description, .summary")
-
-                job = {
-                    "id": str(uuid.uuid4()),
-                    "title": title_elem.text.strip() if title_elem else "Position",
-                    "company": company_elem.text.strip() if company_elem else "Company",
-                    "location": location_elem.text.strip() if location_elem else "Various Locations",
-                    "description": description_elem.text.strip() if description_elem else "No description provided.",
-                    "requirements": "Please check the job listing for detailed requirements.",
-                    "url": urljoin(url, job_elem.select_one("a")["href"]) if job_elem.select_one("a") else url,
-                    "date_posted": datetime.now().strftime("%Y-%m-%d"),
-                    "type": "job"
-                }
-
-                job_listings.append(job)
-
-            except Exception as e:
-                logger.error(f"Error extracting job data: {e}")
-                continue
-
-        logger.info(f"Scraped {len(job_listings)} jobs from {url}")
+def scrape_job_listings(url, max_pages=SCRAPER_MAX_PAGES):
+    try:
+        job_listings = crawl_job_listings(url, max_pages=max_pages)
 
         if not job_listings:
-            logger.warning("No jobs could be scraped, using fallback data")
+            logger.warning(f"No jobs could be scraped from {url}, using fallback data")
             return _get_fallback_job_data()
 
         return job_listings
@@ -90,6 +88,42 @@ def scrape_job_listings(url):
         return _get_fallback_job_data()
 
 
+def _crawl_source(url, max_pages, state):
+    failed_urls = []
+    jobs = crawl_job_listings(url, max_pages=max_pages, state=state, failed_urls=failed_urls)
+    return jobs, failed_urls
+
+
+def scrape_job_sources(urls, max_pages=SCRAPER_MAX_PAGES, state=None, crawled_sources=None):
+    #crawls every source concurrently, the pool and per-host limits keep any one board from being hammered
+    #sources whose every page was fetched and that yielded jobs are added to crawled_sources
+    urls = list(urls)
+    if state is None and SCRAPER_CONDITIONAL:
+        state = FetchState()
+    results = fetcher.map(lambda url: _crawl_source(url, max_pages, state), urls)
+    if state is not None:
+        state.save()
+
+    job_listings = []
+    for url, result in zip(urls, results):
+        #None when the crawl raised
+        jobs, failed_urls = result if result is not None else ([], [url])
+        if failed_urls:
+            logger.warning(f"Crawl of {url} stopped at {failed_urls[0]}, its listings are kept as they are")
+        elif jobs and crawled_sources is not None:
+            crawled_sources.add(url)
+        if jobs:
+            job_listings.extend(jobs)
+        else:
+            logger.warning(f"No jobs could be scraped from {url}")
+
+    if not job_listings:
+        logger.warning("No jobs could be scraped from any source, using fallback data")
+        return _get_fallback_job_data()
+
+    return job_listings
+
+
 def _get_fallback_job_data():
     return [
         {
@@ -156,8 +190,7 @@ def create_jobs_file(url=None):
         jobs = scrape_job_listings(url)
 
         file_path = os.path.join("data", "job_listings.json")
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(jobs, f, indent=2)
+        write_records(file_path, jobs, json_lines=False)
 
         logger.info(f"Created job listings file: {file_path}")
 
@@ -174,46 +207,34 @@ def scrape_events_from_herkey():
         url = "https://events.herkey.com/events"
         logger.info(f"Scraping events from {url}")
 
-        soup = get_soup(url)
-        if not soup:
+        response = fetcher.fetch(url)
+        if response is None:
             logger.warning(f"Failed to get page content from {url}, using fallback data")
             return generate_sample_events()
 
-        events = []
-        event_elements = soup.select(".event-card, .event-listing, .event-item, article.event")
+        cards, _ = get_extractor("events", url).extract(response.text, url)
 
-        if not event_elements:
+        if not cards:
             logger.warning(f"No event elements found at {url}, using fallback data")
             return generate_sample_events()
 
-        for idx, event_elem in enumerate(event_elements, 1):
-            try:
-                title_elem = event_elem.select_one(".event-title, .title, h2, h3")
-                date_elem = event_elem.select_one(".event-date, .date")
-                location_elem = event_elem.select_one(".event-location, .location")
-                description_elem = event_elem.select_one(".event-description, .description, .summary")
-                organizer_elem = event_elem.select_one(".organizer, .host")
-
-                event = {
-                    "id": f"event-{idx}",
-                    "title": title_elem.text.strip() if title_elem else f"Herkey Event {idx}",
-                    "date": date_elem.text.strip() if date_elem else "TBD",
-                    "location": location_elem.text.strip() if location_elem else "Virtual",
-                    "description": description_elem.text.strip() if description_elem else "Join this exciting event for professionals.",
-                    "organizer": organizer_elem.text.strip() if organizer_elem else "Herkey",
-                    "type": "online" if "virtual" in (location_elem.text.lower() if location_elem else "") else "in-person",
-                    "url": urljoin(url, event_elem.select_one("a")["href"]) if event_elem.select_one("a") else f"{url}/{idx}",
-                    "image": urljoin(url, event_elem.select_one("img")["src"]) if event_elem.select_one("img") else None,
-                    "registration_required": True,
-                    "registration_url": urljoin(url, event_elem.select_one(".register, .signup")["href"]) if event_elem.select_one(".register, .signup") else url,
-                    "event_type": "event"
-                }
-
-                events.append(event)
-
-            except Exception as e:
-                logger.error(f"Error extracting event data: {e}")
-                continue
+        events = []
+        for idx, values in enumerate(cards, 1):
+            location = values["location"]
+            events.append({
+                "id": f"event-{idx}",
+                "title": values["title"] or f"Herkey Event {idx}",
+                "date": values["date"] or "TBD",
+                "location": location or "Virtual",
+                "description": values["description"] or "Join this exciting event for professionals.",
+                "organizer": values["organizer"] or "Herkey",
+                "type": "online" if "virtual" in (location or "").lower() else "in-person",
+                "url": values["link"] or f"{url}/{idx}",
+                "image": values["image"],
+                "registration_required": True,
+                "registration_url": values["registration"] or url,
+                "event_type": "event"
+            })
 
         logger.info(f"Scraped {len(events)} events from {url}")
 
@@ -277,8 +298,7 @@ def create_events_file():
         events = scrape_events_from_herkey()
 
         file_path = os.path.join("data", "events.json")
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(events, f, indent=2)
+        write_records(file_path, events, json_lines=False)
 
         logger.info(f"Created events file: {file_path}")
 
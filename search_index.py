@@ -0,0 +1,150 @@
+import re
+import math
+import heapq
+import logging
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'\b\w+\b')
+
+#BM25F parameters, title/company/skills count for more than free text
+BM25_K1 = 1.2
+BM25_B = 0.75
+DEFAULT_FIELD_WEIGHT = 1.0
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'company': 2.0,
+    'skills': 2.0,
+    'expertise': 2.0,
+    'mentor': 2.0,
+    'description': 1.0,
+    'type': 0.5,
+}
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def document_type(knowledge_type):
+    if knowledge_type == 'events':
+        return 'event'
+    elif knowledge_type == 'jobs':
+        return 'job'
+    return knowledge_type
+
+
+class SearchIndex:
+    def __init__(self, field_weights=None, k1=BM25_K1, b=BM25_B, doc_type=None):
+        self.doc_type = doc_type
+        self.field_weights = field_weights if field_weights is not None else FIELD_WEIGHTS
+        self.k1 = k1
+        self.b = b
+        self.documents = {}
+        self.doc_ids_by_key = {}
+        self.doc_keys = {}
+        self.doc_terms = {}
+        self.doc_field_lengths = {}
+        self.postings = {}
+        self.field_length_totals = {}
+        self._norms = {}
+        self._next_doc_id = 0
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add_document(self, doc, fields, key=None):
+        if key is not None and key in self.doc_ids_by_key:
+            self.remove_document(self.doc_ids_by_key[key])
+
+        doc_id = self._next_doc_id
+        self._next_doc_id += 1
+
+        field_lengths = {}
+        terms = set()
+        for field, text in fields.items():
+            tokens = tokenize(text)
+            if not tokens:
+                continue
+            field_lengths[field] = len(tokens)
+            self.field_length_totals[field] = self.field_length_totals.get(field, 0) + len(tokens)
+            terms.update(tokens)
+            for token in tokens:
+                field_counts = self.postings.setdefault(token, {}).setdefault(doc_id, {})
+                field_counts[field] = field_counts.get(field, 0) + 1
+
+        self.documents[doc_id] = doc
+        self.doc_terms[doc_id] = terms
+        self.doc_field_lengths[doc_id] = field_lengths
+        if key is not None:
+            self.doc_ids_by_key[key] = doc_id
+            self.doc_keys[doc_id] = key
+        #average lengths moved, cached length norms are stale
+        self._norms.clear()
+
+        return doc_id
+
+    def remove_document(self, doc_id):
+        if doc_id not in self.documents:
+            return None
+
+        for token in self.doc_terms.pop(doc_id):
+            postings = self.postings[token]
+            del postings[doc_id]
+            if not postings:
+                del self.postings[token]
+
+        for field, length in self.doc_field_lengths.pop(doc_id).items():
+            self.field_length_totals[field] -= length
+            if not self.field_length_totals[field]:
+                del self.field_length_totals[field]
+
+        key = self.doc_keys.pop(doc_id, None)
+        if key is not None:
+            del self.doc_ids_by_key[key]
+        doc = self.documents.pop(doc_id)
+        self._norms.clear()
+        return doc
+
+    def remove_by_key(self, key):
+        doc_id = self.doc_ids_by_key.get(key)
+        if doc_id is None:
+            return None
+        return self.remove_document(doc_id)
+
+    def _field_norms(self, doc_id):
+        norms = self._norms.get(doc_id)
+        if norms is None:
+            doc_count = len(self.documents)
+            norms = {}
+            for field, length in self.doc_field_lengths[doc_id].items():
+                average = self.field_length_totals[field] / doc_count
+                norms[field] = 1 - self.b + self.b * length / average
+            self._norms[doc_id] = norms
+        return norms
+
+    def score(self, query_tokens):
+        #walk only the postings of the query tokens, never the whole catalogue
+        doc_count = len(self.documents)
+        scores = {}
+        for token in set(query_tokens):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            doc_freq = len(postings)
+            idf = math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+            for doc_id, field_counts in postings.items():
+                norms = self._field_norms(doc_id)
+                weighted_tf = 0.0
+                for field, count in field_counts.items():
+                    weight = self.field_weights.get(field, DEFAULT_FIELD_WEIGHT)
+                    weighted_tf += weight * count / norms[field]
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * weighted_tf / (self.k1 + weighted_tf)
+
+        return scores
+
+    def top_k(self, query_tokens, k):
+        scores = self.score(query_tokens)
+        return heapq.nlargest(k, ((score, doc_id) for doc_id, score in scores.items()),
+                              key=lambda x: (x[0], -x[1]))
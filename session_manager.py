@@ -1,73 +1,167 @@
+import os
+import copy
+import json
 import logging
 import uuid
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from flask import session as flask_session
+from extensions import db
+from models import SessionContext
 
 logger = logging.getLogger(__name__)
 
+#the cookie only carries session['id'], conversation context lives in a server-side store
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'memory').lower()
+SESSION_TTL_SECONDS = int(os.environ.get('SESSION_TTL_SECONDS', 3600))
+SESSION_MAX_ENTRIES = int(os.environ.get('SESSION_MAX_ENTRIES', 10000))
+SESSION_CLEANUP_INTERVAL_SECONDS = 300
+MAX_HISTORY_ITEMS = 10
+MAX_ENTITY_VALUES = 5
+#top-level lists that are not remembered entities, history has its own cap
+_UNCAPPED_CONTEXT_KEYS = {'history', 'events_shown'}
+
+
+def _empty_context():
+    return {
+        'history': [],
+        'last_message': None,
+        'entities': {}
+    }
+
+
+class MemorySessionStore:
+    #LRU with TTL, for a single worker process, contexts are copied in and out like the SQL store's JSON
+    def __init__(self, ttl_seconds=SESSION_TTL_SECONDS, max_entries=SESSION_MAX_ENTRIES):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, session_id):
+        with self.lock:
+            entry = self.entries.get(session_id)
+            if entry is None:
+                return None
+            context, updated_at = entry
+            if datetime.now() - updated_at > self.ttl:
+                del self.entries[session_id]
+                return None
+            self.entries.move_to_end(session_id)
+            return copy.deepcopy(context)
+
+    def set(self, session_id, context):
+        with self.lock:
+            self.entries[session_id] = (copy.deepcopy(context), datetime.now())
+            self.entries.move_to_end(session_id)
+            while len(self.entries) > self.max_entries:
+                evicted, _ = self.entries.popitem(last=False)
+                logger.debug(f"Evicted session context: {evicted}")
+
+    def delete(self, session_id):
+        with self.lock:
+            self.entries.pop(session_id, None)
+
+
+class SqlSessionStore:
+    #shared by every worker through the app database, needs an app context
+    def __init__(self, ttl_seconds=SESSION_TTL_SECONDS):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.last_cleanup = datetime.min
+
+    def get(self, session_id):
+        row = db.session.get(SessionContext, session_id)
+        if row is None or datetime.now() - row.updated_at > self.ttl:
+            return None
+        return json.loads(row.context)
+
+    def set(self, session_id, context):
+        now = datetime.now()
+        try:
+            db.session.merge(SessionContext(session_id=session_id, context=json.dumps(context), updated_at=now))
+            if now - self.last_cleanup > timedelta(seconds=SESSION_CLEANUP_INTERVAL_SECONDS):
+                self.last_cleanup = now
+                expired = SessionContext.query.filter(SessionContext.updated_at < now - self.ttl).delete()
+                if expired:
+                    logger.info(f"Deleted {expired} expired session contexts")
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def delete(self, session_id):
+        SessionContext.query.filter_by(session_id=session_id).delete()
+        db.session.commit()
+
+
+def _create_store(backend):
+    if backend == 'sql':
+        return SqlSessionStore()
+    if backend != 'memory':
+        logger.warning(f"Unknown SESSION_BACKEND '{backend}', using memory")
+    return MemorySessionStore()
+
+
+context_store = _create_store(SESSION_BACKEND)
+
+
+def _ensure_session_id(session):
+    if 'id' not in session:
+        session['id'] = 'temp-' + str(uuid.uuid4())
+    return session['id']
+
 
 def initialize_session(session):
     try:
         session['id'] = 'temp-' + str(uuid.uuid4())
-        session['expires'] = (datetime.now() + timedelta(hours=1)).isoformat()
-        session['context'] = {
-            'history': [],
-            'last_message': None,
-            'entities': {}
-        }
+        context_store.set(session['id'], _empty_context())
         logger.debug(f"Created new session: {session['id']}")
 
-        session['last_active'] = datetime.now().isoformat()
-
     except Exception as e:
         logger.error(f"Error initializing session: {e}")
         if 'id' not in session:
             session['id'] = str(uuid.uuid4())
-            session['context'] = {}
 
 
 def get_session_context(session):
     try:
-        if 'context' not in session:
-            session['context'] = {
-                'history': [],
-                'last_message': None,
-                'entities': {}
-            }
+        session_id = _ensure_session_id(session)
+        context = context_store.get(session_id)
+        if context is None:
+            context = _empty_context()
+            context_store.set(session_id, context)
 
-        return session['context']
+        return context
 
     except Exception as e:
         logger.error(f"Error retrieving session context: {e}")
-        return {
-            'history': [],
-            'last_message': None,
-            'entities': {}
-        }
+        return _empty_context()
 
 
 def update_session_context(session, context):
     try:
-        session['context'] = context
-        session['last_active'] = datetime.now().isoformat()
-
-        _prune_context_if_needed(session)
+        _prune_context_if_needed(context)
+        context_store.set(_ensure_session_id(session), context)
 
     except Exception as e:
         logger.error(f"Error updating session context: {e}")
 
 
-def _prune_context_if_needed(session):
+def _prune_context_if_needed(context):
     try:
-        context = session.get('context', {})
+        if 'history' in context and len(context['history']) > MAX_HISTORY_ITEMS:
+            context['history'] = context['history'][-MAX_HISTORY_ITEMS:]
 
-        if 'history' in context and len(context['history']) > 10:
-            context['history'] = context['history'][-10:]
+        #the chatbot accumulates entities as top-level lists (job_role, location, skill, ...)
+        for key, values in context.items():
+            if key not in _UNCAPPED_CONTEXT_KEYS and isinstance(values, list) and len(values) > MAX_ENTITY_VALUES:
+                context[key] = values[-MAX_ENTITY_VALUES:]
 
         if 'entities' in context:
             for entity_type, values in context['entities'].items():
-                if len(values) > 5:
-                    context['entities'][entity_type] = values[-5:]
+                if len(values) > MAX_ENTITY_VALUES:
+                    context['entities'][entity_type] = values[-MAX_ENTITY_VALUES:]
 
     except Exception as e:
         logger.error(f"Error pruning context: {e}")
@@ -75,16 +169,10 @@ def _prune_context_if_needed(session):
 
 def clear_session_context(session):
     try:
-        session_id = session.get('id', str(uuid.uuid4()))
-        session['id'] = session_id
-        session['context'] = {
-            'history': [],
-            'last_message': None,
-            'entities': {}
-        }
-        session['last_active'] = datetime.now().isoformat()
+        session_id = _ensure_session_id(session)
+        context_store.set(session_id, _empty_context())
 
         logger.debug(f"Cleared context for session: {session_id}")
 
     except Exception as e:
-        logger.error(f"Error clearing session context: {e}") #30minsexpiration
\ No newline at end of file
+        logger.error(f"Error clearing session context: {e}") #30minsexpiration
@@ -0,0 +1,66 @@
+import uuid
+from datetime import datetime
+import pytest
+from analytics import redact_query, pseudonymize_session_id
+
+app_module = pytest.importorskip('app')
+from extensions import db
+from models import Interaction
+
+ENDPOINTS = ['/api/analytics/sessions', '/api/analytics/feedback', '/api/analytics/top-queries']
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'ANALYTICS_API_TOKEN', 's3cret')
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def interaction():
+    session_id = 'temp-' + str(uuid.uuid4())
+    row_id = str(uuid.uuid4())
+    marker = 'marker' + uuid.uuid4().hex[:6]
+    with app_module.app.app_context():
+        db.session.add(Interaction(id=row_id, session_id=session_id, timestamp=datetime.now(), bot_response='ok',
+                                   user_message=f'{marker} call me on +91 98765 43210 or mail jane.doe@example.com'))
+        db.session.commit()
+    yield session_id, marker
+    with app_module.app.app_context():
+        Interaction.query.filter_by(session_id=session_id).delete()
+        db.session.commit()
+
+
+def test_endpoints_are_off_without_a_token(monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'ANALYTICS_API_TOKEN', '')
+    client = app_module.app.test_client()
+    for endpoint in ENDPOINTS:
+        assert client.get(endpoint, headers={'Authorization': 'Bearer '}).status_code == 404
+
+
+def test_endpoints_need_the_token(client):
+    for endpoint in ENDPOINTS:
+        assert client.get(endpoint).status_code == 401
+        assert client.get(endpoint, headers={'Authorization': 'Bearer wrong'}).status_code == 401
+        assert client.get(endpoint, headers={'Authorization': 'Bearer s3cret'}).status_code == 200
+
+
+def test_session_ids_and_queries_are_redacted(client, interaction):
+    session_id, marker = interaction
+    headers = {'Authorization': 'Bearer s3cret'}
+
+    sessions = client.get('/api/analytics/sessions?limit=500', headers=headers).get_json()['sessions']
+    assert session_id not in str(sessions)
+    assert pseudonymize_session_id(session_id) in [row['session'] for row in sessions]
+
+    queries = client.get('/api/analytics/top-queries?limit=100', headers=headers).get_json()['queries']
+    text = str(queries)
+    assert '98765' not in text and 'jane.doe@example.com' not in text
+    assert f'{marker} call me on [number] or mail [email]' in [row['query'] for row in queries]
+
+
+def test_redact_query():
+    assert redact_query('mail a@b.co or 022-2345 6789, see https://x.io/p?q=1') == \
+        'mail [email] or [number], see [url]'
+    assert redact_query('python jobs') == 'python jobs'
+    assert len(redact_query('x' * 500)) == 83
@@ -0,0 +1,54 @@
+import random
+import pytest
+
+app_module = pytest.importorskip('app')
+
+
+def chat(client, message):
+    random.seed(0)
+    response = client.post('/api/chat', json={'message': message})
+    assert response.status_code == 200
+    return response.get_json()['message']
+
+
+def second_turn(first, second):
+    #the first message of a session is answered with a greeting, so compare replies to the second one
+    client = app_module.app.test_client()
+    chat(client, first)
+    return chat(client, second)
+
+
+def test_previous_turn_does_not_leak_into_reply():
+    follow_up = second_turn('data scientist jobs', 'how do I prepare for an interview?')
+
+    assert 'Data Scientist' not in follow_up
+    assert follow_up == second_turn('hello', 'how do I prepare for an interview?')
+
+
+def test_small_talk_after_job_query_is_not_answered_from_history():
+    reply = second_turn('data scientist jobs', 'how are you?')
+
+    assert 'Data Scientist' not in reply
+    assert reply == second_turn('hello', 'how are you?')
+
+
+@pytest.mark.parametrize('message', ['python developer jobs', 'show me events', 'bye'])
+def test_one_search_per_chat_request(monkeypatch, message):
+    import chatbot
+    from response_cache import response_cache
+    queries = []
+
+    def counting_search(query, knowledge_base, *args, **kwargs):
+        queries.append(query)
+        return search(query, knowledge_base, *args, **kwargs)
+
+    search = app_module.semantic_search
+    monkeypatch.setattr(app_module, 'semantic_search', counting_search)
+    monkeypatch.setattr(chatbot, 'semantic_search', counting_search)
+    client = app_module.app.test_client()
+    chat(client, 'hello')
+    for _ in range(2):
+        response_cache.clear()
+        queries.clear()
+        chat(client, message)
+        assert len(queries) == 1, queries
@@ -0,0 +1,54 @@
+import pytest
+import entity_extractor
+from entity_extractor import (EntityExtractor, configure_entity_extractor, gazetteers_from_knowledge,
+                              entity_extractor_version)
+
+
+KNOWLEDGE = {'jobs': [
+    {'id': 'j1', 'title': 'Position', 'company': 'Company', 'location': 'Various Locations',
+     'description': 'No description provided.', 'skills': []},
+    {'id': 'j2', 'title': 'Research Analyst', 'company': 'Zeta', 'location': 'Indore, Madhya Pradesh',
+     'skills': ['Research', 'Excel', 'Express', 'Kubernetes', 'Financial Modeling', 'AWS', 'Node.js', 'CI/CD']},
+]}
+
+
+@pytest.fixture(autouse=True)
+def keep_global_extractor(monkeypatch):
+    monkeypatch.setattr(entity_extractor, '_extractor', dict(entity_extractor._extractor))
+
+
+def test_placeholders_and_generic_skills_are_not_catalogue_terms():
+    terms = gazetteers_from_knowledge(KNOWLEDGE)
+    assert terms == {'company': ['Zeta'], 'location': ['Indore', 'Madhya Pradesh'],
+                     'skill': ['Financial Modeling', 'AWS', 'Node.js', 'CI/CD']}
+
+
+def test_everyday_messages_do_not_pick_up_catalogue_entities():
+    extractor = configure_entity_extractor(KNOWLEDGE)
+    entities = extractor.extract("which company should I research? I want to excel and express myself")
+    assert 'company' not in entities
+    assert 'skill' not in entities
+    assert extractor.extract("jobs needing financial modeling, node.js and aws")['skill'] == [
+        'financial modeling', 'node.js', 'aws']
+
+
+def test_catalogue_filters_need_whole_words():
+    extractor = configure_entity_extractor(KNOWLEDGE)
+    assert extractor.detect_filters("any openings at a company near me?")['company'] is None
+    assert extractor.detect_filters("roles with zetaflow or in indoreville")['company'] is None
+    assert extractor.detect_filters("roles with zetaflow or in indoreville")['location'] is None
+    assert extractor.detect_filters("analyst roles at Zeta in Indore") == {
+        'location': 'Indore', 'company': 'Zeta', 'position': 'analyst'}
+
+
+def test_built_in_filters_still_match_substrings():
+    #unchanged behaviour for the hand-written lists, "developers" still means the developer position
+    filters = EntityExtractor().detect_filters("developers in Bangalore")
+    assert filters['position'] == 'developer' and filters['location'] == 'Bangalore'
+
+
+def test_every_rebuild_gets_a_new_version():
+    before = entity_extractor_version()
+    configure_entity_extractor(KNOWLEDGE)
+    configure_entity_extractor(KNOWLEDGE)
+    assert entity_extractor_version() == before + 2
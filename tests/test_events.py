@@ -0,0 +1,54 @@
+from events import EventIndex, query_events, filter_events
+
+
+EVENTS = [
+    {'title': 'Resume Clinic', 'type': 'workshop', 'location': 'Bangalore', 'organizer': 'HerKey', 'date': '2026-01-10'},
+    {'title': 'Python for Data', 'type': 'webinar', 'location': 'Online', 'organizer': 'PyLadies', 'date': '2026-01-12'},
+    {'title': 'Leadership Summit', 'type': 'conference', 'location': 'Bangalore, Karnataka', 'organizer': 'HerKey', 'date': '2026-02-01'},
+    {'title': 'Interview Prep', 'type': 'workshop', 'location': 'Pune', 'organizer': 'HerKey', 'date': 'sometime'},
+    {'title': 'Data Careers', 'type': 'webinar', 'location': 'Online', 'organizer': 'HerKey', 'description': 'python and sql'},
+]
+
+
+def titles(events):
+    return [event['title'] for event in events]
+
+
+def test_filters_combine_and_keep_file_order():
+    page = query_events(EVENTS, event_type='webinar', organizer='herkey')
+    assert titles(page['events']) == ['Data Careers']
+    assert titles(query_events(EVENTS, query='python')['events']) == ['Python for Data', 'Data Careers']
+
+
+def test_filters_match_substrings_even_when_a_key_matches_exactly():
+    #"bangalore" is a key of its own and also part of "bangalore, karnataka", like the old filter_events both match
+    assert titles(query_events(EVENTS, location='Bangalore')['events']) == ['Resume Clinic', 'Leadership Summit']
+    assert titles(query_events(EVENTS, location='karnataka')['events']) == ['Leadership Summit']
+    assert titles(query_events(EVENTS, organizer='herkey')['events']) == [
+        'Resume Clinic', 'Leadership Summit', 'Interview Prep', 'Data Careers']
+    assert titles(query_events(EVENTS, event_type='shop')['events']) == ['Resume Clinic', 'Interview Prep']
+
+
+def test_lookup_results_are_cached_per_value():
+    index = EventIndex(EVENTS)
+    first = index._lookup(index.by_location, 'karnataka')
+    assert index._lookup(index.by_location, 'karnataka') is first
+    assert index._lookup(index.by_type, 'karnataka') == frozenset()
+
+
+def test_offset_and_cursor_pagination_walk_the_same_results():
+    first = query_events(EVENTS, organizer='herkey', limit=2)
+    assert first['total'] == 4
+    assert titles(first['events']) == ['Resume Clinic', 'Leadership Summit']
+
+    by_cursor = query_events(EVENTS, organizer='herkey', limit=2, cursor=first['next_cursor'])
+    by_offset = query_events(EVENTS, organizer='herkey', limit=2, offset=2)
+    assert titles(by_cursor['events']) == titles(by_offset['events']) == ['Interview Prep', 'Data Careers']
+    assert by_cursor['next_cursor'] is None
+
+
+def test_filter_events_rejects_markup_and_pages_unfiltered_lists():
+    events, message = filter_events(EVENTS, query='<script>')
+    assert events == [] and message
+    events, message = filter_events(EVENTS, limit=2, offset=3)
+    assert titles(events) == ['Interview Prep', 'Data Careers'] and message is None
@@ -0,0 +1,25 @@
+import pytest
+import extraction
+from extraction import ListingExtractor, SITE_SELECTORS
+
+PAGE = ('<html><body><div class="job-card"><h2>Data Analyst</h2><span class="company">Acme</span>'
+        '<a href="/jobs/1">apply</a></div><a rel="next" href="?page=2">next</a></body></html>')
+
+
+def test_lxml_parse_errors_fall_back_to_beautifulsoup(monkeypatch):
+    pytest.importorskip('lxml')
+    extractor = ListingExtractor(SITE_SELECTORS['jobs']['default'])
+    assert extractor.xpaths is not None
+    expected = extractor.extract(PAGE, 'https://board.example/jobs')
+
+    def refuse(html):
+        #str input fails like a document with an encoding declaration, the bytes retry fails to parse
+        if isinstance(html, str):
+            raise ValueError('Unicode strings with encoding declaration are not supported')
+        raise extraction.etree.ParserError('Document is empty')
+
+    monkeypatch.setattr(extraction.lxml.html, 'fromstring', refuse)
+    cards, next_url = extractor.extract(PAGE, 'https://board.example/jobs')
+    assert (cards, next_url) == expected
+    assert cards[0]['title'] == 'Data Analyst' and cards[0]['link'] == 'https://board.example/jobs/1'
+    assert next_url == 'https://board.example/jobs?page=2'
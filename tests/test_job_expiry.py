@@ -0,0 +1,60 @@
+from datetime import datetime
+import scheduler
+import scraper
+from scheduler import _expire_stale_jobs
+
+
+TODAY = datetime(2026, 10, 17)
+
+
+def job(job_id, url, date_posted):
+    return {'id': job_id, 'title': job_id, 'url': url, 'date_posted': date_posted}
+
+
+CATALOGUE = [
+    job('seen', 'https://board.example/jobs/1', '2026-01-01'),
+    job('gone', 'https://board.example/jobs/2', '2026-01-01'),
+    job('recent', 'https://board.example/jobs/3', '2026-10-01'),
+    job('other-board', 'https://other.example/jobs/4', '2026-01-01'),
+    {'id': 'curated', 'title': 'curated', 'date_posted': '2025-01-01'},
+]
+
+
+def ids(jobs):
+    return [item['id'] for item in jobs]
+
+
+def test_only_old_unseen_listings_from_crawled_hosts_expire():
+    kept = _expire_stale_jobs(CATALOGUE, {'seen'}, {'https://board.example/jobs'}, 45, TODAY)
+    assert ids(kept) == ['seen', 'recent', 'other-board', 'curated']
+
+
+def test_nothing_expires_without_a_successful_crawl():
+    assert _expire_stale_jobs(CATALOGUE, {'seen'}, set(), 45, TODAY) == CATALOGUE
+    assert _expire_stale_jobs(CATALOGUE, {'seen'}, {'https://board.example/jobs'}, 0, TODAY) == CATALOGUE
+
+
+def test_failed_and_partial_crawls_are_not_recorded(monkeypatch):
+    def crawl(url, max_pages, state, failed_urls):
+        if 'partial' in url:
+            failed_urls.append(url + '?page=2')
+        if 'down' in url:
+            raise ConnectionError('unreachable')
+        return [job('x-' + url, url + '/1', '2026-10-17')]
+
+    monkeypatch.setattr(scraper, 'crawl_job_listings', crawl)
+    monkeypatch.setattr(scraper, 'SCRAPER_CONDITIONAL', False)
+    crawled = set()
+    jobs = scraper.scrape_job_sources(['https://ok.example/jobs', 'https://partial.example/jobs',
+                                       'https://down.example/jobs'], crawled_sources=crawled)
+    assert crawled == {'https://ok.example/jobs'}
+    assert len(jobs) == 2
+
+
+def test_scheduler_keeps_listings_when_the_crawl_failed(monkeypatch):
+    written = []
+    monkeypatch.setattr(scheduler, 'scrape_job_sources', lambda urls, crawled_sources: [])
+    monkeypatch.setattr(scheduler, 'load_all_knowledge', lambda: {'jobs': list(CATALOGUE)})
+    monkeypatch.setattr(scheduler, 'update_knowledge_file', lambda kind, jobs: written.append(jobs) or (True, None))
+    scheduler.update_job_listings()
+    assert written == []
@@ -0,0 +1,23 @@
+from records import SearchHit, to_record
+from rag import generate_response
+
+
+JOB = {'id': 'j1', 'title': 'Data Analyst', 'company': 'Acme', 'location': 'Pune', 'work_mode': 'Hybrid',
+       'job_type': 'Full-time', 'experience': '2 years', 'skills': ['SQL', 'Excel'],
+       'description': 'Build dashboards for the sales team.'}
+
+
+def test_job_reply_lists_work_mode_and_job_type():
+    hit = SearchHit(to_record('jobs', JOB), 1.0, 'job')
+    response = generate_response('analyst jobs', [hit], 'job')
+    assert response.startswith("Found some matching opportunities:\n\n"
+                               "1. Data Analyst at Acme (Hybrid, Full-time) • 2 years experience\n"
+                               "Location: Pune\n"
+                               "Skills: SQL, Excel\n")
+
+
+def test_job_reply_without_a_work_mode_says_unknown():
+    job = dict(JOB)
+    del job['work_mode']
+    response = generate_response('analyst jobs', [SearchHit(to_record('jobs', job), 1.0, 'job')], 'job')
+    assert '(Unknown, Full-time)' in response
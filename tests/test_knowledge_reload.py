@@ -0,0 +1,92 @@
+import os
+import fcntl
+import pytest
+import knowledge_base
+import rag
+import scheduler
+from knowledge_store import write_records, append_records
+
+
+def job(job_id, title):
+    return {'id': job_id, 'title': title, 'company': 'Acme', 'location': 'Pune', 'description': f'{title} role'}
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(knowledge_base, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(rag, 'knowledge_signatures', {})
+    monkeypatch.setattr(rag, 'search_indexes', {})
+    return tmp_path
+
+
+def titles(results):
+    return [hit.get('title') for hit in results]
+
+
+def test_worker_picks_up_a_write_from_another_process(data_dir):
+    path = os.path.join(str(data_dir), 'expanded_jobs.jsonl')
+    write_records(path, [job('a', 'Data Scientist')])
+    rag.mark_knowledge_current()
+    kb = knowledge_base.load_all_knowledge()
+    assert titles(rag.semantic_search('nurse', kb)) == []
+
+    #the scheduler process appends, this one only sees the file change
+    append_records(path, [job('b', 'Staff Nurse')])
+    assert rag.reload_changed_knowledge(kb) == ['jobs']
+    assert titles(rag.semantic_search('nurse', kb)) == ['Staff Nurse']
+    assert rag.reload_changed_knowledge(kb) == []
+
+
+def test_worker_applies_the_logged_delta_without_reading_the_catalogue(data_dir, monkeypatch):
+    path = os.path.join(str(data_dir), 'expanded_jobs.jsonl')
+    write_records(path, [job('a', 'Data Scientist'), job('b', 'Staff Nurse')])
+    rag.mark_knowledge_current()
+    kb = knowledge_base.load_all_knowledge()
+
+    #what the scheduler does: write, then log the delta with the records it touched
+    before = knowledge_base.knowledge_file_signature('jobs')
+    jobs = [job('b', 'Head Nurse'), job('c', 'Python Developer')]
+    knowledge_base.update_knowledge_file('jobs', jobs)
+    knowledge_base.log_knowledge_delta('jobs', before, {'added': ['c'], 'removed': ['a'], 'changed': ['b']}, jobs)
+
+    monkeypatch.setattr(rag, 'load_knowledge', lambda knowledge_type: pytest.fail('re-read the catalogue'))
+    assert rag.reload_changed_knowledge(kb) == ['jobs']
+    assert sorted(item['title'] for item in kb['jobs']) == ['Head Nurse', 'Python Developer']
+    assert titles(rag.semantic_search('nurse', kb)) == ['Head Nurse']
+
+
+def test_writer_applies_its_own_delta_once(data_dir):
+    path = os.path.join(str(data_dir), 'expanded_jobs.jsonl')
+    write_records(path, [job('a', 'Data Scientist')])
+    rag.mark_knowledge_current()
+    kb = knowledge_base.load_all_knowledge()
+
+    before = knowledge_base.knowledge_file_signature('jobs')
+    append_records(path, [job('b', 'Staff Nurse')])
+    delta = {'added': ['b'], 'removed': [], 'changed': [], 'from': before,
+             'to': knowledge_base.knowledge_file_signature('jobs')}
+    jobs = [job('a', 'Data Scientist'), job('b', 'Staff Nurse')]
+    assert rag.apply_file_delta(kb, 'jobs', jobs, delta)
+    assert not rag.apply_file_delta(kb, 'jobs', jobs, delta)
+    assert rag.reload_changed_knowledge(kb) == []
+    assert titles(rag.semantic_search('nurse', kb)) == ['Staff Nurse']
+
+
+def test_unchanged_file_is_not_reloaded(data_dir, monkeypatch):
+    write_records(os.path.join(str(data_dir), 'expanded_jobs.jsonl'), [job('a', 'Data Scientist')])
+    rag.mark_knowledge_current()
+    kb = knowledge_base.load_all_knowledge()
+    monkeypatch.setattr(rag, 'load_knowledge', lambda knowledge_type: pytest.fail('reloaded an unchanged file'))
+    assert rag.reload_changed_knowledge(kb) == []
+
+
+def test_only_one_process_wins_the_scheduler_lock(tmp_path, monkeypatch):
+    lock_path = str(tmp_path / 'scheduler.lock')
+    with open(lock_path, 'a') as other_worker:
+        fcntl.flock(other_worker.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        monkeypatch.setattr(scheduler, '_scheduler_lock', {'file': None})
+        assert not scheduler._acquire_scheduler_lock(lock_path)
+        fcntl.flock(other_worker.fileno(), fcntl.LOCK_UN)
+
+    assert scheduler._acquire_scheduler_lock(lock_path)
+    scheduler._scheduler_lock['file'].close()
@@ -0,0 +1,38 @@
+import pytest
+import rag
+from knowledge_snapshot import KnowledgeSnapshot, write_snapshot
+from search_index import tokenize
+
+
+JOBS = [
+    {'id': 'j1', 'title': 'Data Scientist', 'company': 'Acme', 'location': 'Pune', 'description': 'python models'},
+    {'id': 'j2', 'title': 'Staff Nurse', 'company': 'CarePlus', 'location': 'Delhi', 'description': 'ward care'},
+    {'id': 'j3', 'title': 'Python Developer', 'company': 'Acme', 'location': 'Remote', 'description': 'python apis'},
+]
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = str(tmp_path / 'jobs.snapshot')
+    index = rag.build_search_index('jobs', JOBS, 'bm25')
+    write_snapshot(path, 'jobs', JOBS, index)
+    return KnowledgeSnapshot(path), index
+
+
+def test_term_id_finds_every_term_and_nothing_else(snapshot):
+    mapped, _ = snapshot
+    index = mapped.index
+    terms = [mapped.string(term) for term in mapped.terms]
+    assert terms == sorted(terms)
+    for term_id, term in enumerate(terms):
+        assert index.term_id(term) == term_id
+    for missing in ('', 'aaa', 'zzzz', 'pythons', 'nurs'):
+        assert index.term_id(missing) is None
+
+
+def test_snapshot_ranks_like_the_in_memory_index(snapshot):
+    mapped, index = snapshot
+    for query in ('python developer', 'nurse delhi', 'acme'):
+        tokens = tokenize(query)
+        expected = [(round(score, 9), doc_id) for score, doc_id in index.top_k(tokens, 5)]
+        assert [(round(score, 9), doc_id) for score, doc_id in mapped.index.top_k(tokens, 5)] == expected
@@ -0,0 +1,64 @@
+import os
+import pytest
+import knowledge_store
+from knowledge_store import write_records, append_records, read_records
+
+
+RECORDS = [{'id': 'a', 'title': 'Data Scientist'}, {'id': 'b', 'title': 'Staff Nurse'}]
+
+
+def test_write_and_append_round_trip(tmp_path):
+    path = str(tmp_path / 'jobs.jsonl')
+    assert write_records(path, RECORDS[:1]) == 1
+    inode = os.stat(path).st_ino
+    assert append_records(path, RECORDS[1:]) == 1
+    assert read_records(path) == RECORDS
+    #appends go on the end of the same file, nothing already there is copied
+    assert os.stat(path).st_ino == inode
+    assert os.listdir(str(tmp_path)) == ['jobs.jsonl']
+
+
+def test_readers_skip_a_torn_append(tmp_path):
+    path = str(tmp_path / 'jobs.jsonl')
+    write_records(path, RECORDS)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"id":"c","title":"Hal')
+    assert read_records(path) == RECORDS
+
+
+def test_append_finishes_a_torn_last_line(tmp_path):
+    path = str(tmp_path / 'jobs.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"id":"a"}\n{"id":"b","ti')
+    append_records(path, [{'id': 'c'}])
+    assert read_records(path) == [{'id': 'a'}, {'id': 'c'}]
+
+
+@pytest.mark.parametrize('write', [
+    lambda path: write_records(path, RECORDS + [object()]),
+    lambda path: write_records(path, RECORDS),
+])
+def test_failed_rewrites_leave_the_file_untouched(tmp_path, monkeypatch, write):
+    path = str(tmp_path / 'jobs.jsonl')
+    write_records(path, RECORDS[:1])
+    with open(path, 'rb') as f:
+        before = f.read()
+
+    monkeypatch.setattr(knowledge_store.os, 'fsync', lambda fd: (_ for _ in ()).throw(OSError('disk full')))
+    with pytest.raises((OSError, TypeError)):
+        write(path)
+
+    with open(path, 'rb') as f:
+        assert f.read() == before
+    assert os.listdir(str(tmp_path)) == ['jobs.jsonl']
+
+
+def test_changed_records_are_sanitized_whatever_their_type(tmp_path, monkeypatch):
+    import knowledge_base
+    from records import to_record
+    monkeypatch.setattr(knowledge_base, 'DATA_DIR', str(tmp_path))
+    data = [to_record('jobs', {'id': 'a', 'title': "Women's Lead; Ops"}), {'id': 'b', 'title': "Nurse's Aide"}]
+
+    assert knowledge_base.update_knowledge_file('jobs', data) == (True, None)
+    assert [item['title'] for item in read_records(str(tmp_path / 'expanded_jobs.jsonl'))] == [
+        "Women''s Lead Ops", "Nurse''s Aide"]
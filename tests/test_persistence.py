@@ -0,0 +1,63 @@
+import logging
+from datetime import datetime
+import pytest
+from flask import Flask
+from extensions import db
+from models import Interaction, BiasDetection, MetricsTracker
+from persistence import WriteBehindQueue
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def interaction(interaction_id, message='hi'):
+    return ('interaction', {'id': interaction_id, 'session_id': 's1', 'user_message': message,
+                            'bot_response': 'hello', 'timestamp': datetime(2026, 1, 1)})
+
+
+def metrics(record_date, **counts):
+    return ('metrics', (record_date, counts))
+
+
+def day_row(app, record_date):
+    with app.app_context():
+        row = MetricsTracker.query.filter_by(record_date=record_date).one()
+        return row.total_interactions, row.job_searches
+
+
+def test_metrics_upsert_adds_to_existing_day_rows(app):
+    writer = WriteBehindQueue(app, enabled=False)
+    writer._write_batch([metrics('2026-01-01', total_interactions=1, job_searches=1),
+                         metrics('2026-01-01', total_interactions=1)])
+    assert day_row(app, '2026-01-01') == (2, 1)
+
+    #a second flush, as from another worker, increments the same row instead of inserting a new one
+    writer._write_batch([metrics('2026-01-01', total_interactions=3)])
+    assert day_row(app, '2026-01-01') == (5, 1)
+    with app.app_context():
+        assert MetricsTracker.query.count() == 1
+
+
+def test_one_bad_row_only_drops_itself(app, caplog):
+    writer = WriteBehindQueue(app, enabled=False)
+    writer._write_batch([interaction('dup')])
+
+    with caplog.at_level(logging.ERROR, logger='persistence'):
+        writer._write_batch([interaction('a'), interaction('dup'), interaction('b'),
+                             ('bias_detection', {'interaction_id': 'a', 'message': 'm', 'bias_score': 0.9,
+                                                 'bias_type': 'gender', 'timestamp': datetime(2026, 1, 1)}),
+                             metrics('2026-01-02', total_interactions=2)])
+
+    with app.app_context():
+        assert sorted(row.id for row in Interaction.query.all()) == ['a', 'b', 'dup']
+        assert BiasDetection.query.count() == 1
+    assert day_row(app, '2026-01-02') == (2, 0)
+    assert '1 interactions' in caplog.text
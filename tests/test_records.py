@@ -0,0 +1,20 @@
+import pytest
+from records import Job, to_record, as_dict
+
+
+JOB = {'id': 'j1', 'title': 'Data Analyst', 'company': 'Acme', 'location': 'Pune', 'work_mode': 'Hybrid',
+       'job_type': 'Full-time', 'experience': '2 years', 'skills': ['SQL'], 'description': 'dashboards',
+       'source': 'herkey'}
+
+
+def test_record_behaves_like_a_read_only_mapping():
+    job = to_record('jobs', JOB)
+    assert isinstance(job, Job)
+    assert list(job) == list(job.keys())
+    assert len(job) == len(JOB)
+    assert dict(job) == JOB == as_dict(job)
+    assert {**job} == JOB
+    assert job['source'] == 'herkey' and 'requirements' not in job
+    with pytest.raises(AttributeError):
+        job.title = 'changed'
+
@@ -0,0 +1,77 @@
+import re
+import pytest
+import rag
+from rag import build_search_index, semantic_search
+from records import to_record
+from search_index import tokenize
+
+
+JOBS = [to_record('jobs', job) for job in [
+    {'id': 'j1', 'title': 'Office Manager', 'company': 'Acme', 'location': 'Pune',
+     'description': 'Run the office. Reports to the data team lead.'},
+    {'id': 'j2', 'title': 'Data Scientist', 'company': 'Zeta', 'location': 'Delhi',
+     'description': 'Build models in python with the analytics team.'},
+    {'id': 'j3', 'title': 'Python Developer', 'company': 'Acme', 'location': 'Remote',
+     'description': 'Backend services and data pipelines for the team.'},
+    {'id': 'j4', 'title': 'Staff Nurse', 'company': 'CarePlus', 'location': 'Pune',
+     'description': 'Ward care for the surgical team.'},
+]]
+
+
+@pytest.fixture(autouse=True)
+def bm25(monkeypatch):
+    monkeypatch.setattr(rag, 'SEARCH_BACKEND', 'bm25')
+    monkeypatch.setattr(rag, 'search_indexes', {})
+
+
+def baseline_search(query, jobs):
+    #the keyword-overlap ranking semantic_search used before BM25: share of query words found anywhere
+    query_words = set(re.findall(r'\b\w+\b', query.lower()))
+    scored = []
+    for job in jobs:
+        text = ' '.join(str(value) for value in job.values()).lower()
+        matches = len(query_words & set(re.findall(r'\b\w+\b', text)))
+        if matches:
+            scored.append((matches / len(query_words), job['id']))
+    return scored
+
+
+def ids(results):
+    return [hit.get('id') for hit in results]
+
+
+def test_bm25_finds_the_same_jobs_as_the_baseline():
+    for query in ('data scientist', 'python', 'pune nurse', 'acme office'):
+        expected = {job_id for _, job_id in baseline_search(query, JOBS)}
+        assert set(ids(semantic_search(query, {'jobs': JOBS}, top_k=10))) == expected
+
+
+def test_bm25_breaks_the_baseline_ties_by_field_and_rarity():
+    #"data" appears in three jobs and "scientist" in one, the baseline scores the Data Scientist no higher than a passing mention
+    baseline = dict((job_id, score) for score, job_id in baseline_search('data scientist', JOBS))
+    assert baseline['j2'] == 1.0 and baseline['j1'] == baseline['j3'] == 0.5
+    assert ids(semantic_search('data scientist', {'jobs': JOBS}))[0] == 'j2'
+
+    #a title match outranks the same word in a description
+    assert ids(semantic_search('python', {'jobs': JOBS})) == ['j3', 'j2']
+
+
+def test_top_k_matches_a_full_sort():
+    index = build_search_index('jobs', JOBS)
+    for query in ('team', 'data python pune', 'acme'):
+        scores = index.score(tokenize(query))
+        expected = sorted(((score, doc_id) for doc_id, score in scores.items()), key=lambda x: (-x[0], x[1]))
+        assert index.top_k(tokenize(query), 2) == expected[:2]
+
+
+def test_incremental_updates_score_like_a_fresh_index():
+    index = build_search_index('jobs', JOBS[:2])
+    for job in JOBS[2:]:
+        rag._index_item(index, 'jobs', job)
+    index.remove_by_key('j1')
+    fresh = build_search_index('jobs', JOBS[1:])
+
+    for query in ('data team', 'pune', 'python developer'):
+        tokens = tokenize(query)
+        by_key = lambda idx: {idx.doc_keys[doc_id]: round(score, 9) for doc_id, score in idx.score(tokens).items()}
+        assert by_key(index) == by_key(fresh)
@@ -0,0 +1,27 @@
+from session_manager import MemorySessionStore, _prune_context_if_needed, MAX_ENTITY_VALUES
+
+
+def test_prune_caps_top_level_entity_lists():
+    context = {'history': [{'role': 'user', 'content': str(i)} for i in range(14)],
+               'job_role': [f'role {i}' for i in range(8)],
+               'skill': ['python'],
+               'events_shown': list(range(8)),
+               'entities': {'location': [f'city {i}' for i in range(7)]}}
+    _prune_context_if_needed(context)
+
+    assert len(context['history']) == 10
+    assert context['job_role'] == [f'role {i}' for i in range(3, 8)]
+    assert context['skill'] == ['python']
+    assert len(context['events_shown']) == 8
+    assert len(context['entities']['location']) == MAX_ENTITY_VALUES
+
+
+def test_memory_store_hands_out_copies():
+    store = MemorySessionStore()
+    context = {'history': [], 'job_role': ['analyst']}
+    store.set('s1', context)
+    context['job_role'].append('changed after set')
+
+    loaded = store.get('s1')
+    loaded['job_role'].append('changed after get')
+    assert store.get('s1') == {'history': [], 'job_role': ['analyst']}
@@ -0,0 +1,102 @@
+import logging
+
+from knowledge_base import get_all_text_content
+from search_index import tokenize, document_type
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  #optional backend, the BM25 index works without it
+    np = None
+    sparse = None
+
+logger = logging.getLogger(__name__)
+
+VECTOR_BACKEND_AVAILABLE = np is not None
+
+
+class TfidfIndex:
+    def __init__(self, knowledge_type, items):
+        if not VECTOR_BACKEND_AVAILABLE:
+            raise RuntimeError("numpy and scipy are required for the TF-IDF backend")
+
+        self.doc_type = document_type(knowledge_type)
+        self.documents = list(items)
+
+        #get_all_text_content is the feature pipeline, one text per item in order
+        texts = get_all_text_content({knowledge_type: items})
+
+        self.vocabulary = {}
+        indptr = [0]
+        indices = []
+        for text in texts:
+            for token in tokenize(text):
+                indices.append(self.vocabulary.setdefault(token, len(self.vocabulary)))
+            indptr.append(len(indices))
+
+        shape = (len(texts), len(self.vocabulary))
+        counts = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr)),
+            shape=shape
+        )
+        counts.sum_duplicates()
+
+        doc_freq = np.bincount(counts.indices, minlength=shape[1])
+        self.idf = (np.log((1 + shape[0]) / (1 + doc_freq)) + 1).astype(np.float32)
+
+        matrix = counts.multiply(self.idf).tocsr()
+        row_norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        row_norms[row_norms == 0] = 1
+        self.matrix = sparse.csr_matrix(sparse.diags(1 / row_norms) @ matrix)
+
+        logger.info(f"Built TF-IDF matrix for {knowledge_type}: {shape[0]} x {shape[1]}, {self.matrix.nnz} non-zeros")
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _query_matrix(self, queries_tokens):
+        indptr = [0]
+        indices = []
+        for tokens in queries_tokens:
+            indices.extend(self.vocabulary[token] for token in tokens if token in self.vocabulary)
+            indptr.append(len(indices))
+
+        queries = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr)),
+            shape=(len(queries_tokens), len(self.vocabulary))
+        )
+        queries.sum_duplicates()
+        queries = queries.multiply(self.idf).tocsr()
+        norms = np.sqrt(np.asarray(queries.multiply(queries).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.csr_matrix(sparse.diags(1 / norms) @ queries)
+
+    @staticmethod
+    def _select_top(doc_ids, scores, k):
+        if len(scores) > k:
+            keep = np.argpartition(-scores, k - 1)[:k]
+            doc_ids, scores = doc_ids[keep], scores[keep]
+        #highest score first, ties keep catalogue order
+        order = np.lexsort((doc_ids, -scores))
+        return [(float(scores[i]), int(doc_ids[i])) for i in order]
+
+    def top_k(self, query_tokens, k):
+        if not k or not self.documents:
+            return []
+        query_vector = self._query_matrix([query_tokens]).toarray().ravel()
+        scores = self.matrix.dot(query_vector)
+        doc_ids = np.flatnonzero(scores > 0)
+        return self._select_top(doc_ids, scores[doc_ids], k)
+
+    def top_k_batch(self, queries_tokens, k):
+        if not k or not self.documents:
+            return [[] for _ in queries_tokens]
+        #one sparse product scores every query against every document
+        scores = (self._query_matrix(queries_tokens) @ self.matrix.T).tocsr()
+        results = []
+        for row in range(scores.shape[0]):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            row_scores = scores.data[start:end]
+            positive = row_scores > 0
+            results.append(self._select_top(scores.indices[start:end][positive], row_scores[positive], k))
+        return results